@@ -24,6 +24,8 @@ from flask_jwt_oidc import JwtManager
 
 from colin_api import config
 from colin_api.resources import API_BLUEPRINT, OPS_BLUEPRINT
+from colin_api.resources.cache import FILING_CACHE
+from colin_api.resources.db import DB
 from colin_api.utils.logging import setup_logging
 from colin_api.utils.run_version import get_run_version
 # noqa: I003; the sentry import creates a bad line count in isort
@@ -44,6 +46,8 @@ def create_app(run_mode=os.getenv('FLASK_ENV', 'production')):
             dsn=app.config.get('SENTRY_DSN'),
             integrations=[FlaskIntegration()]
         )
+    DB.init_app(app)
+    FILING_CACHE.init_app(app)
     app.register_blueprint(API_BLUEPRINT)
     app.register_blueprint(OPS_BLUEPRINT)
     # setup_jwt_manager(app, jwt)
@@ -71,6 +71,18 @@ class _Config:  # pylint: disable=too-few-public-methods
     ORACLE_HOST = os.getenv('ORACLE_HOST', '')
     ORACLE_PORT = int(os.getenv('ORACLE_PORT', '1521'))
 
+    # ORACLE - session pool, one per worker process
+    ORACLE_POOL_MIN = int(os.getenv('ORACLE_POOL_MIN', '1'))
+    ORACLE_POOL_MAX = int(os.getenv('ORACLE_POOL_MAX', '10'))
+    ORACLE_POOL_INCREMENT = int(os.getenv('ORACLE_POOL_INCREMENT', '1'))
+    ORACLE_POOL_WAIT_TIMEOUT = int(os.getenv('ORACLE_POOL_WAIT_TIMEOUT', '1500'))  # milliseconds
+    ORACLE_POOL_PING_INTERVAL = int(os.getenv('ORACLE_POOL_PING_INTERVAL', '60'))  # seconds
+    ORACLE_STMT_CACHE_SIZE = int(os.getenv('ORACLE_STMT_CACHE_SIZE', '50'))
+
+    # the filings from before the bob-date, cached in memory and, if the dir is set, on disk
+    FILING_CACHE_SIZE = int(os.getenv('FILING_CACHE_SIZE', '10000'))
+    FILING_CACHE_DIR = os.getenv('FILING_CACHE_DIR', None)
+
     TESTING = False
     DEBUG = False
 
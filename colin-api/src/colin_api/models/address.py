@@ -15,12 +15,14 @@
 
 Currently this only provides API versioning information
 """
+from typing import Dict, List
+
 import pycountry
 from flask import current_app
 
 from colin_api.exceptions import AddressNotFoundException
 from colin_api.resources.db import DB
-from colin_api.utils import stringify_list
+from colin_api.utils import get_next_ids, stringify_list
 
 
 class Address:  # pylint: disable=too-many-instance-attributes; need all these fields
@@ -114,59 +116,90 @@ class Address:  # pylint: disable=too-many-instance-attributes; need all these f
             current_app.logger.error(err.with_traceback(None))
             raise AddressNotFoundException(address_id=address_id)
 
+    @classmethod
+    def get_by_address_ids(cls, cursor, address_ids: List) -> Dict:
+        """Return the addresses associated with the given addr_ids, by addr_id, in as few queries as possible."""
+        address_ids = list(dict.fromkeys(address_id for address_id in address_ids if address_id))
+        addresses = {}
+        try:
+            if not cursor:
+                cursor = DB.connection.cursor()
+            # oracle allows up to 1000 items in a list
+            for i in range(0, len(address_ids), 1000):
+                binds = {f'address_id_{j}': address_id for j, address_id in enumerate(address_ids[i:i + 1000])}
+                cursor.execute(f"""
+                    select ADDR_ID, ADDR_LINE_1, ADDR_LINE_2, ADDR_LINE_3, CITY, PROVINCE, COUNTRY_TYPE.FULL_DESC,
+                    POSTAL_CD, DELIVERY_INSTRUCTIONS
+                    from ADDRESS
+                    join COUNTRY_TYPE on ADDRESS.COUNTRY_TYP_CD = COUNTRY_TYPE.COUNTRY_TYP_CD
+                    where ADDR_ID in ({', '.join(f':{bind}' for bind in binds)})
+                    """,
+                               **binds
+                               )
+                description = cursor.description
+                for row in cursor.fetchall():
+                    address = dict(zip([x[0].lower() for x in description], row))
+                    addresses[address['addr_id']] = cls._build_address_obj(address)
+
+        except Exception as err:
+            current_app.logger.error(err.with_traceback(None))
+            raise AddressNotFoundException(address_id=address_ids)
+
+        if missing := [address_id for address_id in address_ids if address_id not in addresses]:
+            raise AddressNotFoundException(address_id=missing[0])
+        return addresses
+
     @classmethod
     def create_new_address(cls, cursor, address_info: dict = None, corp_num: str = None):
         """Get new address id and insert address into address table."""
+        return cls.create_new_addresses(cursor, [address_info], corp_num)[0]
+
+    @classmethod
+    def create_new_addresses(cls, cursor, address_infos: List[dict], corp_num: str = None) -> List[int]:
+        """Get new address ids and insert the addresses into address table, all at once, and return their ids."""
+        if not address_infos:
+            return []
         try:
             if corp_num[:2] == 'CP':
-                cursor.execute("""select noncorp_address_seq.NEXTVAL from dual""")
-                row = cursor.fetchone()
-                addr_id = int(row[0])
+                addr_ids = get_next_ids(cursor, len(address_infos), sequence='noncorp_address_seq')
             else:
-                cursor.execute("""
-                    SELECT id_num
-                    FROM system_id
-                    WHERE id_typ_cd = 'ADD'
-                    FOR UPDATE
-                """)
-
-                addr_id = int(cursor.fetchone()[0])
-
-                if addr_id:
-                    cursor.execute("""
-                        UPDATE system_id
-                        SET id_num = :new_num
-                        WHERE id_typ_cd = 'ADD'
-                    """, new_num=addr_id+1)
-
-            country_typ_cd = pycountry.countries.search_fuzzy(address_info.get('addressCountry'))[0].alpha_2
+                addr_ids = get_next_ids(cursor, len(address_infos), id_typ_cd='ADD')
+
+            # the fuzzy search is slow, so it is only done once for each country
+            country_typ_cds = {country: pycountry.countries.search_fuzzy(country)[0].alpha_2
+                               for country in {address_info.get('addressCountry') for address_info in address_infos}}
+            rows = []
+            for addr_id, address_info in zip(addr_ids, address_infos):
+                rows.append({
+                    'addr_id': addr_id,
+                    'province': address_info['addressRegion'].upper(),
+                    'country_typ_cd': country_typ_cds[address_info.get('addressCountry')],
+                    'postal_cd': address_info['postalCode'].upper(),
+                    'addr_line_1': address_info['streetAddress'].upper(),
+                    'addr_line_2': address_info['streetAddressAdditional'].upper()
+                    if 'streetAddressAdditional' in address_info.keys() else '',
+                    'city': address_info['addressCity'].upper(),
+                    'delivery_instructions': address_info['deliveryInstructions'].upper()
+                    if 'deliveryInstructions' in address_info.keys() else ''
+                })
         except Exception as err:
             current_app.logger.error(err.with_traceback(None))
             raise err
 
         try:
-            cursor.execute("""
+            cursor.executemany("""
                             INSERT INTO address (addr_id, province, country_typ_cd, postal_cd, addr_line_1, addr_line_2,
                              city, delivery_instructions)
                             VALUES (:addr_id, :province, :country_typ_cd, :postal_cd, :addr_line_1, :addr_line_2, :city,
                                 :delivery_instructions)
                             """,
-                           addr_id=addr_id,
-                           province=address_info['addressRegion'].upper(),
-                           country_typ_cd=country_typ_cd,
-                           postal_cd=address_info['postalCode'].upper(),
-                           addr_line_1=address_info['streetAddress'].upper(),
-                           addr_line_2=address_info['streetAddressAdditional'].upper()
-                           if 'streetAddressAdditional' in address_info.keys() else '',
-                           city=address_info['addressCity'].upper(),
-                           delivery_instructions=address_info['deliveryInstructions'].upper()
-                           if 'deliveryInstructions' in address_info.keys() else ''
-                           )
+                               rows
+                               )
         except Exception as err:
-            current_app.logger.error(f'Error in address: failed to insert new address: {address_info}')
+            current_app.logger.error(f'Error in address: failed to insert new addresses: {address_infos}')
             raise err
 
-        return addr_id
+        return addr_ids
 
     @classmethod
     def get_addresses_by_event(cls, cursor, event_ids: list, table: str):
@@ -208,6 +208,18 @@ class CorpName:
             current_app.logger.error(f'error getting corp name for {corp_num} by event {event_id}')
             raise err
 
+    @classmethod
+    def get_changed_by_event(cls, cursor, corp_num: str, event_id: str) -> List:
+        """Get the entity names, of all types, started or ended by the given event id."""
+        try:
+            querystring = cls.NAME_QUERY + ' and (start_event_id=:event_id or end_event_id=:event_id)'
+            cursor.execute(querystring, corp_num=corp_num, event_id=event_id)
+            return cls._create_name_objs(cursor=cursor)
+
+        except Exception as err:
+            current_app.logger.error(f'error getting corp names changed for {corp_num} by event {event_id}')
+            raise err
+
     @classmethod
     def get_current(cls, cursor, corp_num: str) -> List:
         """Get current entity names."""
@@ -26,7 +26,7 @@ from flask import current_app
 from colin_api.exceptions import PartiesNotFoundException
 from colin_api.models import Address, Business  # pylint: disable=cyclic-import
 from colin_api.resources.db import DB
-from colin_api.utils import convert_to_json_date, delete_from_table_by_event_ids, stringify_list
+from colin_api.utils import convert_to_json_date, delete_from_table_by_event_ids, get_next_ids, stringify_list
 
 
 class Party:  # pylint: disable=too-many-instance-attributes; need all these fields
@@ -93,20 +93,25 @@ class Party:  # pylint: disable=too-many-instance-attributes; need all these fie
         completing_parties = {}
         party_list = []
         description = cursor.description
-        for row in parties:
+        rows = [dict(zip([x[0].lower() for x in description], row)) for row in parties]
+        # get the addresses of all the parties, and the founding date, at once
+        addresses = Address.get_by_address_ids(cursor, [row[key] for row in rows if row['delivery_addr_id']
+                                                        for key in ['delivery_addr_id', 'mailing_addr_id']])
+        founding_date = Business.get_founding_date(cursor=cursor, corp_num=corp_num) \
+            if any(not row['appointment_dt'] for row in rows) else None
+        for row in rows:
             party = Party()
             party.title = ''
-            row = dict(zip([x[0].lower() for x in description], row))
             if not row['appointment_dt']:
-                row['appointment_dt'] = Business.get_founding_date(cursor=cursor, corp_num=corp_num)
+                row['appointment_dt'] = founding_date
             party.officer = cls._get_officer(row)
             if not row['delivery_addr_id']:
                 current_app.logger.error(
                     f"Bad director data for {party.officer.get('firstName')} {party.officer.get('lastName')} {corp_num}"
                 )
             else:
-                party.delivery_address = Address.get_by_address_id(cursor, row['delivery_addr_id']).as_dict()
-                party.mailing_address = Address.get_by_address_id(cursor, row['mailing_addr_id']).as_dict() \
+                party.delivery_address = addresses[row['delivery_addr_id']].as_dict()
+                party.mailing_address = addresses[row['mailing_addr_id']].as_dict() \
                     if row['mailing_addr_id'] else party.delivery_address
                 party.appointment_date =\
                     convert_to_json_date(row.get('appointment_dt', None))
@@ -318,9 +323,17 @@ class Party:  # pylint: disable=too-many-instance-attributes; need all these fie
             raise err
 
     @classmethod
-    # pylint: disable=too-many-locals; one extra
     def create_new_corp_party(cls, cursor, event_id: int, party: Dict, business: Dict):
         """Insert new party into the corp_party table."""
+        return cls.create_new_corp_parties(cursor, event_id, [party], business)[0]
+
+    @classmethod
+    # pylint: disable=too-many-locals,too-many-branches; all the party columns
+    def create_new_corp_parties(cls, cursor, event_id: int, parties: List[Dict], business: Dict) -> List:
+        """Insert the new parties into the corp_party table, array bound, and return their ids.
+
+        The completing party, which goes in the completing_party table instead, gets an id of None.
+        """
         query = \
             """
             insert into corp_party (corp_party_id, mailing_addr_id, delivery_addr_id, corp_num, party_typ_cd,
@@ -345,114 +358,87 @@ class Party:  # pylint: disable=too-many-instance-attributes; need all these fie
             where event_id=:event_id
             """
 
-        # create new corp party entry
+        # create new corp party entries
         corp_num = business['business']['identifier']
+        corp_parties = [party for party in parties if party.get('role_type', 'DIR') != 'CPRTY']
         try:
             if corp_num == 'CP':
-                cursor.execute("""select noncorp_party_seq.NEXTVAL from dual""")
-                row = cursor.fetchone()
-                corp_party_id = int(row[0])
+                corp_party_ids = get_next_ids(cursor, len(corp_parties), sequence='noncorp_party_seq')
             else:
-                cursor.execute("""
-                    SELECT id_num
-                    FROM system_id
-                    WHERE id_typ_cd = 'CP'
-                    FOR UPDATE
-                """)
-
-                corp_party_id = int(cursor.fetchone()[0])
-
-                if corp_party_id:
-                    cursor.execute("""
-                        UPDATE system_id
-                        SET id_num = :new_num
-                        WHERE id_typ_cd = 'CP'
-                    """, new_num=corp_party_id+1)
+                corp_party_ids = get_next_ids(cursor, len(corp_parties), id_typ_cd='CP')
 
         except Exception as err:
-            current_app.logger.error('Error in corp_party: Failed to get next corp_party_id.')
+            current_app.logger.error('Error in corp_party: Failed to get next corp_party_ids.')
             raise err
         try:
-            role_type = party.get('role_type', 'DIR')
-
-            delivery_info = party['deliveryAddress'] if 'deliveryAddress' in party else party['mailingAddress']
-            # create new address
-            delivery_addr_id = Address.create_new_address(cursor=cursor, address_info=delivery_info, corp_num=corp_num)
-            mailing_addr_id = delivery_addr_id
-
-            if 'mailingAddress' in party:
-                mailing_addr_id = Address.create_new_address(
-                    cursor=cursor, address_info=party['mailingAddress'], corp_num=corp_num)
-            if role_type == 'CPRTY':
-                if party.get('prev_event_id'):
-                    # update old completing party entry instead of creating a new one
-                    cursor.execute(
-                        completing_party_update_query,
-                        event_id=party['prev_event_id'],
-                        mailing_addr_id=mailing_addr_id,
-                        last_nme=party['officer']['lastName'],
-                        middle_nme=party['officer'].get('middleInitial', ''),
-                        first_nme=party['officer']['firstName'],
-                        email=party['officer']['email']
-                    )
-                else:
-                    cursor.execute(
-                        completing_party_query,
-                        event_id=event_id,
-                        mailing_addr_id=mailing_addr_id,
-                        last_nme=party['officer']['lastName'],
-                        middle_nme=party['officer'].get('middleInitial', ''),
-                        first_nme=party['officer']['firstName'],
-                        email=party['officer']['email']
-                    )
-            else:
-                date_format = '%Y-%m-%d'
+            # create the new addresses of all the parties at once, delivery (or mailing) then mailing if given
+            address_infos = []
+            for party in parties:
+                address_infos.append(party.get('deliveryAddress') or party['mailingAddress'])
+                if 'mailingAddress' in party:
+                    address_infos.append(party['mailingAddress'])
+            addr_ids = iter(Address.create_new_addresses(cursor=cursor, address_infos=address_infos, corp_num=corp_num))
+
+            date_format = '%Y-%m-%d'
+            party_ids = []
+            corp_party_ids = iter(corp_party_ids)
+            rows = []
+            rows_without_prev = []
+            for party in parties:
+                role_type = party.get('role_type', 'DIR')
+                delivery_addr_id = next(addr_ids)
+                mailing_addr_id = next(addr_ids) if 'mailingAddress' in party else delivery_addr_id
+                if role_type == 'CPRTY':
+                    completing_party = {
+                        'mailing_addr_id': mailing_addr_id,
+                        'last_nme': party['officer']['lastName'],
+                        'middle_nme': party['officer'].get('middleInitial', ''),
+                        'first_nme': party['officer']['firstName'],
+                        'email': party['officer']['email']
+                    }
+                    if party.get('prev_event_id'):
+                        # update old completing party entry instead of creating a new one
+                        cursor.execute(completing_party_update_query, event_id=party['prev_event_id'],
+                                       **completing_party)
+                    else:
+                        cursor.execute(completing_party_query, event_id=event_id, **completing_party)
+                    party_ids.append(None)
+                    continue
+
+                row = {
+                    'corp_party_id': next(corp_party_ids),
+                    'mailing_addr_id': mailing_addr_id,
+                    'delivery_addr_id': delivery_addr_id,
+                    'corp_num': corp_num,
+                    'party_typ_cd': role_type,
+                    'start_event_id': event_id,
+                    'end_event_id': event_id if party.get('cessationDate', '') else None,
+                    'appointment_dt': str(datetime.datetime.strptime(party['appointmentDate'], date_format))[:10],
+                    'cessation_dt': str(datetime.datetime.strptime(party['cessationDate'], date_format))[:10]
+                    if party.get('cessationDate', None) else None,
+                    'last_nme': party['officer']['lastName'],
+                    'middle_nme': party['officer'].get('middleInitial', ''),
+                    'first_nme': party['officer']['firstName'],
+                    'bus_company_num': business['business'].get('businessNumber', None),
+                    'business_name': party['officer'].get('orgName', '')
+                }
                 if party.get('prev_id'):
-                    cursor.execute(
-                        query,
-                        corp_party_id=corp_party_id,
-                        mailing_addr_id=mailing_addr_id,
-                        delivery_addr_id=delivery_addr_id,
-                        corp_num=corp_num,
-                        party_typ_cd=role_type,
-                        start_event_id=event_id,
-                        end_event_id=event_id if party.get('cessationDate', '') else None,
-                        appointment_dt=str(datetime.datetime.strptime(party['appointmentDate'], date_format))[:10],
-                        cessation_dt=str(datetime.datetime.strptime(party['cessationDate'], date_format))[:10]
-                        if party.get('cessationDate', None) else None,
-                        last_nme=party['officer']['lastName'],
-                        middle_nme=party['officer'].get('middleInitial', ''),
-                        first_nme=party['officer']['firstName'],
-                        bus_company_num=business['business'].get('businessNumber', None),
-                        business_name=party['officer'].get('orgName', ''),
-                        prev_party_id=party['prev_id']
-                    )
+                    rows.append({**row, 'prev_party_id': party['prev_id']})
                 else:
-                    query = query.replace(', prev_party_id', '').replace(', :prev_party_id', '')
-                    cursor.execute(
-                        query,
-                        corp_party_id=corp_party_id,
-                        mailing_addr_id=mailing_addr_id,
-                        delivery_addr_id=delivery_addr_id,
-                        corp_num=corp_num,
-                        party_typ_cd=role_type,
-                        start_event_id=event_id,
-                        end_event_id=event_id if party.get('cessationDate', '') else None,
-                        appointment_dt=str(datetime.datetime.strptime(party['appointmentDate'], date_format))[:10],
-                        cessation_dt=str(datetime.datetime.strptime(party['cessationDate'], date_format))[:10]
-                        if party.get('cessationDate', None) else None,
-                        last_nme=party['officer']['lastName'],
-                        middle_nme=party['officer'].get('middleInitial', ''),
-                        first_nme=party['officer']['firstName'],
-                        bus_company_num=business['business'].get('businessNumber', None),
-                        business_name=party['officer'].get('orgName', '')
-                    )
+                    rows_without_prev.append(row)
+                party_ids.append(row['corp_party_id'])
+
+            if rows:
+                cursor.executemany(query, rows)
+            if rows_without_prev:
+                query = query.replace(', prev_party_id', '').replace(', :prev_party_id', '')
+                cursor.executemany(query, rows_without_prev)
 
         except Exception as err:
-            current_app.logger.error(f'Error in corp_party: Failed create new party for {corp_num}')
+            current_app.logger.error(f'Error in corp_party: Failed create new parties for {corp_num}')
             raise err
 
-        return corp_party_id
+        return party_ids
 
     @classmethod
     def compare_parties(cls, party: Party, officer_json: Dict):
@@ -34,6 +34,7 @@ from colin_api.exceptions import (  # noqa: I001
     PartiesNotFoundException,  # noqa: I001
 )  # noqa: I001
 from colin_api.models import Business, CorpName, Office, Party, ShareObject
+from colin_api.resources.cache import FILING_CACHE
 from colin_api.resources.db import DB
 from colin_api.utils import convert_to_json_date, convert_to_json_datetime, convert_to_snake
 
@@ -133,6 +134,9 @@ class Filing:
         }
     }
 
+    # the filings from before the bob-date were made in COLIN, and can no longer change
+    BOB_DATE = '2019-03-08'
+
     USERS = {
         Business.TypeCodes.COOP.value: 'COOPER',
         Business.TypeCodes.BCOMP.value: 'BCOMPS',
@@ -242,30 +246,31 @@ class Filing:
         return event_id
 
     @classmethod
-    def _get_events(cls, cursor, corp_num: str, filing_type_code: str) -> List:
-        """Get all event ids of filings for given filing type for this corp."""
+    def _get_events(cls, cursor, corp_num: str, filing_type_codes: List) -> List:
+        """Get all event ids of filings for given filing types for this corp, in one query."""
+        binds = {f'filing_type_{i}': filing_type_code for i, filing_type_code in enumerate(filing_type_codes)}
         try:
             if not cursor:
                 cursor = DB.connection.cursor()
             cursor.execute(
-                """
-                select event.event_id, event.event_timestmp, filing.period_end_dt
+                f"""
+                select event.event_id, event.event_timestmp, filing.period_end_dt, filing.filing_typ_cd
                 from event
                 left join filing on event.event_id = filing.event_id
-                where corp_num=:corp_num and filing_typ_cd=:filing_type
+                where corp_num=:corp_num and filing_typ_cd in ({', '.join(f':{bind}' for bind in binds)})
                 """,
-                filing_type=filing_type_code,
-                corp_num=corp_num
+                corp_num=corp_num,
+                **binds
             )
 
             events = cursor.fetchall()
             event_list = []
             for row in events:
                 row = dict(zip([x[0].lower() for x in cursor.description], row))
-                item = {'id': row['event_id'], 'date': row['event_timestmp']}
+                item = {'id': row['event_id'], 'date': row['event_timestmp'], 'type_code': row['filing_typ_cd']}
 
                 # if filing type is an AR include the period_end_dt info
-                if filing_type_code in cls.FILING_TYPES['annualReport']['type_code_list']:
+                if row['filing_typ_cd'] in cls.FILING_TYPES['annualReport']['type_code_list']:
                     item['annualReportDate'] = row['period_end_dt']
 
                 event_list.append(item)
@@ -276,6 +281,29 @@ class Filing:
 
         return event_list
 
+    @classmethod
+    def get_filing_events(cls, cursor, event_ids: List[int]) -> List[Dict]:
+        """Get the corp_num and filing type code of each of the filing events, in one query, in event id order."""
+        if not event_ids:
+            return []
+        try:
+            binds = {f'event_id_{i}': int(event_id) for i, event_id in enumerate(event_ids)}
+            cursor.execute(
+                f"""
+                select event.event_id, event.corp_num, filing.filing_typ_cd
+                from event
+                join filing on event.event_id = filing.event_id
+                where event.event_id in ({', '.join(f':{bind}' for bind in binds)})
+                order by event.event_id
+                """,
+                **binds
+            )
+            return [dict(zip([x[0].lower() for x in cursor.description], row)) for row in cursor.fetchall()]
+
+        except Exception as err:  # pylint: disable=broad-except; want to catch all errors
+            current_app.logger.error(f'error getting filing events {event_ids}')
+            raise err
+
     @classmethod
     def _get_filing_type(cls, filing_type_code: str) -> Optional[str]:
         for filing_type in cls.FILING_TYPES:
@@ -521,32 +549,54 @@ class Filing:
 
     @classmethod
     # pylint: disable=too-many-arguments; one extra
-    def _create_party_roles(cls, cursor, party: Dict, business: Dict, event_id: str, corrected_id: str = None):
-        """Create a corp_party for each role."""
-        for role in party['roles']:
-            party['role_type'] = Party.role_types[(role['roleType'])]
-            if party['role_type'] == 'CPRTY' and corrected_id:
-                # set to old event id for update
-                party['prev_event_id'] = corrected_id
-            party['appointmentDate'] = role['appointmentDate']
-            Party.create_new_corp_party(cursor, event_id, party, business)
+    def _create_party_roles(cls, cursor, parties: List[Dict], business: Dict, event_id: str, corrected_id: str = None):
+        """Create a corp_party for each role of the parties, all at once."""
+        party_roles = []
+        for party in parties:
+            for role in party['roles']:
+                party_role = {
+                    **party,
+                    'role_type': Party.role_types[(role['roleType'])],
+                    'appointmentDate': role['appointmentDate']
+                }
+                if party_role['role_type'] == 'CPRTY' and corrected_id:
+                    # set to old event id for update
+                    party_role['prev_event_id'] = corrected_id
+                party_roles.append(party_role)
+        Party.create_new_corp_parties(cursor, event_id, party_roles, business)
 
     @classmethod
-    def _get_ar_component_event(cls, cursor, corp_num: str, type_code: str, ar_filing_event_info: Dict) -> str:
-        """Get the event id for the corresponding component included in the AR."""
-        events = cls._get_events(cursor=cursor, corp_num=corp_num, filing_type_code=type_code)
-        event_id = None
-        tmp_timestamp = datetime.datetime.fromtimestamp(0)
-        for event in events:
-            if ar_filing_event_info['event_timestmp'] >= event['date'] > tmp_timestamp:
-                event_id = event['id']
-                tmp_timestamp = event['date']
-        return event_id if event_id else ar_filing_event_info['event_id']
+    def _get_ar_component_events(cls, cursor, corp_num: str, type_codes: List, ar_filing_event_info: Dict) -> Dict:
+        """Get the event id, by type code, for the corresponding components included in the AR."""
+        event_ids = {type_code: ar_filing_event_info['event_id'] for type_code in type_codes}
+        if not type_codes:
+            return event_ids
+        events = cls._get_events(cursor=cursor, corp_num=corp_num, filing_type_codes=type_codes)
+        for type_code in type_codes:
+            tmp_timestamp = datetime.datetime.fromtimestamp(0)
+            for event in events:
+                if event['type_code'] == type_code and \
+                        ar_filing_event_info['event_timestmp'] >= event['date'] > tmp_timestamp:
+                    event_ids[type_code] = event['id']
+                    tmp_timestamp = event['date']
+        return event_ids
 
     # pylint: disable=too-many-branches, too-many-locals, too-many-statements;
     @classmethod
     def get_filing(cls, filing: Filing, con=None, year: int = None) -> Dict:
-        """Get a Filing."""
+        """Get a Filing.
+
+        The filings from before the bob-date are cached, by event id, once assembled, unless they are only
+        available on paper, or are made up from the current data, which can still change.
+        """
+        cacheable = filing.event_id and not year
+        if cacheable and (cached := FILING_CACHE.get(filing.filing_type, filing.event_id)) and \
+                cached['corpNum'] == filing.business.corp_num:
+            filing.header = cached['header']
+            filing.body = cached['body']
+            filing.paper_only = filing.header['availableOnPaperOnly']
+            return filing
+
         try:
             if not con:
                 con = DB.connection
@@ -561,6 +611,7 @@ class Filing:
                     filing_type=filing.filing_type
                 )
             filing.paper_only = False
+            from_current_data = False
             filing.effective_date = filing_event_info['event_timestmp']
             filing.body = {
                 'eventId': filing_event_info['event_id']
@@ -582,32 +633,37 @@ class Filing:
             if 'annualGeneralMeetingDate' in components:
                 filing.body['annualGeneralMeetingDate'] = convert_to_json_date(filing_event_info.get('agm_date', None))
 
+            # special rules for ARs with offices or directors included, their events are looked up at once
+            ar_component_events = {}
+            if filing.filing_type == 'annualReport':
+                ar_component_events = cls._get_ar_component_events(
+                    cursor=cursor,
+                    corp_num=corp_num,
+                    type_codes=[type_code for component, type_code in [('offices', 'OTADD'), ('directors', 'OTCDR')]
+                                if component in components],
+                    ar_filing_event_info=filing_event_info
+                )
+
             if 'offices' in components:
-                event_id = filing_event_info['event_id']
-                # special rules for ARs with offices included
-                if filing.filing_type == 'annualReport':
-                    event_id = cls._get_ar_component_event(
-                        cursor=cursor, corp_num=corp_num, type_code='OTADD', ar_filing_event_info=filing_event_info)
+                event_id = ar_component_events.get('OTADD', filing_event_info['event_id'])
                 office_obj_list = Office.get_by_event(cursor=cursor, event_id=event_id)
                 if not office_obj_list:
                     if filing.filing_type != 'annualReport':
                         raise OfficeNotFoundException(identifier=corp_num)
                     filing.paper_only = True
+                    from_current_data = True
                     office_obj_list = Office.get_current(identifier=corp_num, cursor=cursor)
 
                 filing.body['offices'] = Office.convert_obj_list(office_obj_list)
 
             if 'directors' in components:
-                event_id = filing_event_info['event_id']
-                # special rules for coop ARs with directors included
-                if filing.filing_type == 'annualReport':
-                    event_id = cls._get_ar_component_event(
-                        cursor=cursor, corp_num=corp_num, type_code='OTCDR', ar_filing_event_info=filing_event_info)
+                event_id = ar_component_events.get('OTCDR', filing_event_info['event_id'])
                 directors = Party.get_by_event(cursor=cursor, corp_num=corp_num, event_id=event_id)
                 if not directors:
                     if filing.filing_type != 'annualReport':
                         raise PartiesNotFoundException(identifier=corp_num)
                     filing.paper_only = True
+                    from_current_data = True
                     directors = Party.get_current(corp_num=corp_num, cursor=cursor)
 
                 filing.body['directors'] = [x.as_dict() for x in directors]
@@ -624,13 +680,14 @@ class Filing:
                 if share_structure:
                     filing.body['shareStructure'] = share_structure.to_dict()
 
+            # the names and translations changed by the event are read in one query
+            changed_names = []
+            if {'nameTranslations', 'nameRequest', 'legalName'} & set(components):
+                changed_names = CorpName.get_changed_by_event(
+                    cursor=cursor, corp_num=corp_num, event_id=filing_event_info['event_id'])
+
             if 'nameTranslations' in components:
-                translations = CorpName.get_by_event(
-                    cursor=cursor,
-                    corp_num=corp_num,
-                    event_id=filing_event_info['event_id'],
-                    type_code='TR'
-                )
+                translations = [x for x in changed_names if x.type_code == CorpName.TypeCodes.TRANSLATION.value]
                 filing.body['nameTranslations'] = []
                 for translation in translations:
                     if translation.event_id == filing_event_info['event_id']:
@@ -641,7 +698,7 @@ class Filing:
                     del filing.body['nameTranslations']
 
             if 'nameRequest' in components or 'legalName' in components:
-                names = CorpName.get_by_event(corp_num=corp_num, event_id=filing_event_info['event_id'], cursor=cursor)
+                names = [x for x in changed_names if x.type_code != CorpName.TypeCodes.TRANSLATION.value]
                 for name in names:
                     if name.event_id == filing_event_info['event_id']:
                         if 'nameRequest' in components:
@@ -664,20 +721,18 @@ class Filing:
                     raise InvalidFilingTypeException(filing_type=filing_event_info['filing_type_code'])
                 filing.body['business']['identifier'] = f'BC{filing.business.corp_num}'
 
-            if 'provisionsRemoved' in components:
+            provisions = None
+            if 'provisionsRemoved' in components or 'hasProvisions' in components:
                 provisions = Business.get_corp_restriction(
                     cursor=cursor, event_id=filing_event_info['event_id'], corp_num=corp_num)
+
+            if 'provisionsRemoved' in components:
                 if provisions and provisions['end_event_id'] == filing_event_info['event_id']:
                     filing.body['provisionsRemoved'] = provisions['restriction_ind'] == 'Y'
                 else:
                     filing.body['provisionsRemoved'] = False
 
             if 'hasProvisions' in components:
-                provisions = Business.get_corp_restriction(
-                    cursor=cursor,
-                    event_id=filing_event_info['event_id'],
-                    corp_num=corp_num
-                )
                 if provisions and provisions['restriction_ind'] == 'Y':
                     filing.body['hasProvisions'] = True
                 else:
@@ -719,6 +774,11 @@ class Filing:
                 'source': cls.LearSource.COLIN.value
             }
 
+            if cacheable and not (filing.paper_only or from_current_data) and \
+                    convert_to_json_date(filing_event_info['event_timestmp']) < cls.BOB_DATE:
+                FILING_CACHE.put(filing.filing_type, filing.event_id,
+                                 {'corpNum': corp_num, 'header': filing.header, 'body': filing.body})
+
             return filing
 
         except FilingNotFoundException as err:
@@ -732,47 +792,26 @@ class Filing:
 
     @classmethod
     def get_historic_filings(cls, business: Business) -> List:
-        """Get list all filings from before the bob-date=2019-03-08."""
+        """Get list all filings from before the bob-date=2019-03-08.
+
+        Those of a coop can no longer change, so they are cached, by corp num, once assembled.
+        """
+        legal_type = business.corp_type
+        cacheable = legal_type == Business.TypeCodes.COOP.value
         try:
-            historic_filings = []
-            cursor = DB.connection.cursor()
-            cursor.execute(
-                """
-                select event.event_id, event_timestmp, filing_typ_cd, effective_dt, period_end_dt, agm_date
-                from event join filing on event.event_id = filing.event_id
-                where corp_num=:identifier
-                order by event_timestmp
-                """,
-                identifier=business.corp_num
-            )
-            filings_info_list = []
-
-            legal_type = business.corp_type
-
-            for filing_info in cursor:
-                filings_info_list.append(dict(zip([x[0].lower() for x in cursor.description], filing_info)))
-            for filing_info in filings_info_list:
-                filing_info['filing_type'] = cls._get_filing_type(filing_info['filing_typ_cd'])
-                date = convert_to_json_date(filing_info['event_timestmp'])
-                if date < '2019-03-08' or legal_type != Business.TypeCodes.COOP.value:
-                    filing = Filing()
-                    filing.business = business
-                    filing.header = {
-                        'date': date,
-                        'name': filing_info['filing_type'],
-                        'effectiveDate': convert_to_json_date(filing_info['effective_dt']),
-                        'historic': True,
-                        'availableOnPaperOnly': True,
-                        'colinIds': [filing_info['event_id']]
-                    }
-                    filing.body = {
-                        filing_info['filing_type']: {
-                            'annualReportDate': convert_to_json_date(filing_info['period_end_dt']),
-                            'annualGeneralMeetingDate': convert_to_json_date(filing_info['agm_date'])
-                        }
-                    }
-                    historic_filings.append(filing.as_dict())
-            return historic_filings
+            if not cacheable or (historic_filings := FILING_CACHE.get('historic', business.corp_num)) is None:
+                historic_filings = cls._get_historic_filings(business)
+                if cacheable:
+                    FILING_CACHE.put('historic', business.corp_num, historic_filings)
+
+            filings = []
+            for historic_filing in historic_filings:
+                filing = Filing()
+                filing.business = business
+                filing.header = historic_filing['header']
+                filing.body = historic_filing['body']
+                filings.append(filing.as_dict())
+            return filings
 
         except InvalidFilingTypeException as err:
             current_app.logger.error('Unknown filing type found when getting historic filings for '
@@ -787,6 +826,48 @@ class Filing:
             # pass through exception to caller
             raise err
 
+    @classmethod
+    def _get_historic_filings(cls, business: Business) -> List:
+        """Return the header and body of each of the historic filings of the business."""
+        historic_filings = []
+        cursor = DB.connection.cursor()
+        cursor.execute(
+            """
+            select event.event_id, event_timestmp, filing_typ_cd, effective_dt, period_end_dt, agm_date
+            from event join filing on event.event_id = filing.event_id
+            where corp_num=:identifier
+            order by event_timestmp
+            """,
+            identifier=business.corp_num
+        )
+        filings_info_list = []
+
+        legal_type = business.corp_type
+
+        for filing_info in cursor:
+            filings_info_list.append(dict(zip([x[0].lower() for x in cursor.description], filing_info)))
+        for filing_info in filings_info_list:
+            filing_info['filing_type'] = cls._get_filing_type(filing_info['filing_typ_cd'])
+            date = convert_to_json_date(filing_info['event_timestmp'])
+            if date < cls.BOB_DATE or legal_type != Business.TypeCodes.COOP.value:
+                historic_filings.append({
+                    'header': {
+                        'date': date,
+                        'name': filing_info['filing_type'],
+                        'effectiveDate': convert_to_json_date(filing_info['effective_dt']),
+                        'historic': True,
+                        'availableOnPaperOnly': True,
+                        'colinIds': [filing_info['event_id']]
+                    },
+                    'body': {
+                        filing_info['filing_type']: {
+                            'annualReportDate': convert_to_json_date(filing_info['period_end_dt']),
+                            'annualGeneralMeetingDate': convert_to_json_date(filing_info['agm_date'])
+                        }
+                    }
+                })
+        return historic_filings
+
     # pylint: disable=too-many-locals,too-many-statements,too-many-branches,too-many-nested-blocks;
     @classmethod
     def add_filing(cls, con, filing: Filing) -> int:
@@ -821,11 +902,10 @@ class Filing:
                 office_text = cls._process_office(cursor=cursor, filing=filing)
 
                 if parties := filing.body.get('parties', []):
-                    for party in parties:
-                        cls._create_party_roles(cursor=cursor,
-                                                party=party,
-                                                business=business,
-                                                event_id=filing.event_id)
+                    cls._create_party_roles(cursor=cursor,
+                                            parties=parties,
+                                            business=business,
+                                            event_id=filing.event_id)
                 # add shares if not coop
                 cls._process_share_structure(cursor, filing, corp_num)
                 if filing.body.get('nameRequest'):
@@ -898,14 +978,15 @@ class Filing:
         if filing.filing_type != 'annualReport':
             corp_num = filing.get_corp_num()
 
-            for office_type in filing.body.get('offices', []):
-                Office.create_new_office(
+            offices = filing.body.get('offices', {})
+            if offices:
+                Office.create_new_offices(
                     cursor=cursor,
-                    addresses=filing.body['offices'][office_type],
+                    offices=offices,
                     event_id=filing.event_id,
-                    corp_num=corp_num,
-                    office_type=office_type
+                    corp_num=corp_num
                 )
+            for office_type in offices:
                 # create new ledger text for address change
                 if filing.filing_type != 'incorporationApplication':
                     office_desc = (office_type.replace('O', ' O')).title()
@@ -924,10 +1005,6 @@ class Filing:
             # create, cease, change directors
             changed_dirs = []
             for director in filing.body.get('directors', []):
-                if 'appointed' in director['actions']:
-                    Party.create_new_corp_party(cursor=cursor, event_id=filing.event_id, party=director,
-                                                business=business)
-
                 if 'ceased' in director['actions'] and not any(elem in ['nameChanged', 'addressChanged']
                                                                for elem in director['actions']):
                     Party.end_director_by_name(
@@ -958,11 +1035,16 @@ class Filing:
                             status_code=HTTPStatus.NOT_FOUND
                         )
 
-            # add back changed directors as new row - if ceased director with changes this will add them with
-            # cessation date + end event id filled
-            for director in changed_dirs:
-                Party.create_new_corp_party(cursor=cursor, event_id=filing.event_id, party=director,
-                                            business=business)
+            # add the appointed directors, and add back changed directors as new row - if ceased director with
+            # changes this will add them with cessation date + end event id filled. They are added after the
+            # ceased and changed directors are ended, as those are ended by name.
+            Party.create_new_corp_parties(
+                cursor=cursor,
+                event_id=filing.event_id,
+                parties=[director for director in filing.body['directors'] if 'appointed' in director['actions']] +
+                changed_dirs,
+                business=business
+            )
 
             # create new ledger text for address change
             text = 'Director change.'
@@ -1128,7 +1210,7 @@ class Filing:
                     # this is a new director
                     cls._create_party_roles(
                         cursor=cursor,
-                        party=change['newValue'],
+                        parties=[change['newValue']],
                         business=business,
                         event_id=filing.event_id,
                         corrected_id=corrected_event_id
@@ -1160,7 +1242,7 @@ class Filing:
                             if change['newValue']:
                                 cls._create_party_roles(
                                     cursor=cursor,
-                                    party=change['newValue'],
+                                    parties=[change['newValue']],
                                     business=business,
                                     event_id=filing.event_id,
                                     corrected_id=corrected_event_id
@@ -71,17 +71,21 @@ class Office:
             return None
 
         description = cursor.description
-        for office_item in office_info:
-            office = dict(zip([x[0].lower() for x in description], office_item))
+        office_info = [dict(zip([x[0].lower() for x in description], office_item)) for office_item in office_info]
+        # get the addresses of all the offices at once
+        addresses = Address.get_by_address_ids(cursor, [office[key] for office in office_info
+                                                        if cls.OFFICE_TYPES_CODES.get(office['office_typ_cd'])
+                                                        for key in ['delivery_addr_id', 'mailing_addr_id']])
+        for office in office_info:
             office_obj = Office()
             office_obj.office_type = cls.OFFICE_TYPES_CODES.get(office['office_typ_cd'], None)
             if office_obj.office_type:
                 office_obj.event_id = office['start_event_id']
                 office_obj.end_event_id = office['end_event_id']
-                office_obj.delivery_address = Address.get_by_address_id(cursor, office['delivery_addr_id']).as_dict()
+                office_obj.delivery_address = addresses[office['delivery_addr_id']].as_dict()
                 office_obj.office_code = office['office_typ_cd']
                 if office['mailing_addr_id']:
-                    office_obj.mailing_address = Address.get_by_address_id(cursor, office['mailing_addr_id']).as_dict()
+                    office_obj.mailing_address = addresses[office['mailing_addr_id']].as_dict()
                 else:
                     office_obj.mailing_address = office_obj.delivery_address
                 offices.append(office_obj)
@@ -109,19 +113,31 @@ class Office:
 
         addresses.keys() = ['deliveryAddress', 'mailingAddress']
         """
-        delivery_addr_id = Address.create_new_address(cursor, addresses['deliveryAddress'], corp_num=corp_num)
-        mailing_addr_id = Address.create_new_address(cursor, addresses['mailingAddress'], corp_num=corp_num)
-        office_code = Office.OFFICE_TYPES_CODES[office_type]
-
-        # update office table to include new addresses and end old office
-        update_dict = {
-            'new_event_id': event_id,
-            'corp_num': corp_num,
-            'new_delivery_addr_id': delivery_addr_id,
-            'new_mailing_addr_id': mailing_addr_id,
-            'office_code': office_code
-        }
-        Office.update_office(cursor=cursor, office_info=update_dict)
+        cls.create_new_offices(cursor, {office_type: addresses}, event_id=event_id, corp_num=corp_num)
+
+    @classmethod
+    def create_new_offices(cls, cursor, offices: Dict, event_id: str, corp_num: str):
+        """Create rows for the new offices and end the old ones, with one statement per table.
+
+        offices = {office_type: {'deliveryAddress': ..., 'mailingAddress': ...}}
+        """
+        addr_ids = Address.create_new_addresses(
+            cursor,
+            [addresses[key] for addresses in offices.values() for key in ['deliveryAddress', 'mailingAddress']],
+            corp_num=corp_num
+        )
+
+        # update office table to include new addresses and end old offices
+        Office.update_offices(cursor=cursor, office_infos=[
+            {
+                'new_event_id': event_id,
+                'corp_num': corp_num,
+                'new_delivery_addr_id': addr_ids[2 * index],
+                'new_mailing_addr_id': addr_ids[2 * index + 1],
+                'office_code': Office.OFFICE_TYPES_CODES[office_type]
+            }
+            for index, office_type in enumerate(offices)
+        ])
 
     @classmethod
     def get_current(cls, cursor, identifier: str = None):
@@ -169,16 +185,23 @@ class Office:
 
         office_info.keys() = ['new_event_id', 'corp_num', 'new_delivery_addr_id', 'new_mailing_addr_id', 'office_code']
         """
+        cls.update_offices(cursor=cursor, office_infos=[office_info])
+
+    @classmethod
+    def update_offices(cls, cursor, office_infos: List[Dict]):
+        """Update old offices end event id and insert the new rows into office table, array bound."""
         try:
-            cursor.execute(
+            cursor.executemany(
                 """
                 UPDATE office
                 SET end_event_id = :event_id
                 WHERE corp_num = :corp_num and office_typ_cd = :office_typ_cd and end_event_id is null
                 """,
-                event_id=office_info['new_event_id'],
-                corp_num=office_info['corp_num'],
-                office_typ_cd=office_info['office_code']
+                [{
+                    'event_id': office_info['new_event_id'],
+                    'corp_num': office_info['corp_num'],
+                    'office_typ_cd': office_info['office_code']
+                } for office_info in office_infos]
             )
 
         except Exception as err:  # pylint: disable=broad-except; want to catch all errs
@@ -186,17 +209,19 @@ class Office:
             raise err
 
         try:
-            cursor.execute(
+            cursor.executemany(
                 """
                 INSERT INTO office (corp_num, office_typ_cd, start_event_id, end_event_id, mailing_addr_id,
                     delivery_addr_id)
                 VALUES (:corp_num, :office_typ_cd, :start_event_id, null, :mailing_addr_id, :delivery_addr_id)
                 """,
-                corp_num=office_info['corp_num'],
-                office_typ_cd=office_info['office_code'],
-                start_event_id=office_info['new_event_id'],
-                mailing_addr_id=office_info['new_mailing_addr_id'],
-                delivery_addr_id=office_info['new_delivery_addr_id']
+                [{
+                    'corp_num': office_info['corp_num'],
+                    'office_typ_cd': office_info['office_code'],
+                    'start_event_id': office_info['new_event_id'],
+                    'mailing_addr_id': office_info['new_mailing_addr_id'],
+                    'delivery_addr_id': office_info['new_delivery_addr_id']
+                } for office_info in office_infos]
             )
 
         except Exception as err:  # pylint: disable=broad-except; want to catch all errs
@@ -17,7 +17,7 @@ Currently this only provides API versioning information
 """
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from flask import current_app
 
@@ -107,7 +107,7 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
 
     @classmethod
     def _build_shares_list(cls, cursor, corp_num: str) -> List:
-        """Build and format the share structure for corp."""
+        """Build and format the share structure for corp, with the classes and series of all structures at once."""
         to_return = []
 
         share_structs = cursor.fetchall()
@@ -115,27 +115,34 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
             share_structure = ShareObject()
             share_structure.start_event_id = row[0]
             share_structure.end_event_id = row[1]
-            share_structure.share_classes = cls._get_share_classes(cursor, share_structure.start_event_id, corp_num)
             to_return.append(share_structure)
 
+        share_classes = cls._get_share_classes(cursor, [x.start_event_id for x in to_return], corp_num)
+        for share_structure in to_return:
+            share_structure.share_classes = share_classes.get(share_structure.start_event_id, [])
+
         return to_return
 
     @classmethod
-    def _get_share_classes(cls, cursor, event_id, corp_num):
-        """Retrieve Share Classes for Corp."""
-        query = """select share_class_id, currency_typ_cd, max_share_ind, share_quantity, spec_rights_ind,
-                   par_value_ind, par_value_amt, class_nme, other_currency from share_struct_cls
-                   where start_event_id=:event_id and corp_num=:corp_num"""
+    def _get_share_classes(cls, cursor, event_ids: List, corp_num: str) -> Dict:
+        """Retrieve the Share Classes for Corp, by start event id, in one query."""
+        if not event_ids:
+            return {}
+        binds = {f'event_id_{i}': event_id for i, event_id in enumerate(dict.fromkeys(event_ids))}
+        query = f"""select start_event_id, share_class_id, currency_typ_cd, max_share_ind, share_quantity,
+                   spec_rights_ind, par_value_ind, par_value_amt, class_nme, other_currency from share_struct_cls
+                   where start_event_id in ({', '.join(f':{bind}' for bind in binds)}) and corp_num=:corp_num"""
 
-        share_classes = []
+        share_classes = {}
 
         try:
             cursor.execute(query,
-                           corp_num=corp_num, event_id=event_id)
+                           corp_num=corp_num, **binds)
             class_arr = cursor.fetchall()
 
             description = cursor.description
 
+            classes = []
             for row in class_arr:
                 row = dict(zip([x[0].lower() for x in description], row))
                 share_class = ShareClass()
@@ -147,27 +154,34 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
                 share_class.share_name = row['class_nme']
                 share_class.par_value_amt = row['par_value_amt']
                 share_class.max_number_shares = row['share_quantity']
-                share_class.series = cls._get_share_series(cursor, share_class, corp_num)
-                share_classes.append(share_class)
+                share_classes.setdefault(row['start_event_id'], []).append(share_class)
+                classes.append(share_class)
 
         except Exception as err:
             current_app.logger.error(f'Error in Share Structure: Failed to retrieve Share Classes for {corp_num}')
             raise err
 
+        share_series = cls._get_share_series(cursor, [x.share_id for x in classes], corp_num)
+        for share_class in classes:
+            share_class.series = share_series.get(share_class.share_id, [])
+
         return share_classes
 
     @classmethod
-    def _get_share_series(cls, cursor, share_class, identifier):
-        """Retrieve Share Series for Corp."""
-        query = """select series_id, max_share_ind, share_quantity, spec_right_ind,
-                    series_nme from share_series where share_class_id=:class_id and
-                    corp_num=:identifier"""
-
-        share_series = []
+    def _get_share_series(cls, cursor, class_ids: List, identifier: str) -> Dict:
+        """Retrieve the Share Series for Corp, by share class id, in one query."""
+        if not class_ids:
+            return {}
+        binds = {f'class_id_{i}': class_id for i, class_id in enumerate(dict.fromkeys(class_ids))}
+        query = f"""select share_class_id, series_id, max_share_ind, share_quantity, spec_right_ind,
+                    series_nme from share_series where share_class_id in ({', '.join(f':{bind}' for bind in binds)})
+                    and corp_num=:identifier"""
+
+        share_series = {}
         try:
             cursor.execute(query,
-                           class_id=share_class.share_id,
-                           identifier=identifier
+                           identifier=identifier,
+                           **binds
                            )
 
             series_arr = cursor.fetchall()
@@ -182,7 +196,7 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
                 series.max_number_shares = row['share_quantity']
                 series.share_id = row['series_id']
                 series.share_name = row['series_nme']
-                share_series.append(series)
+                share_series.setdefault(row['share_class_id'], []).append(series)
 
         except Exception as err:
             current_app.logger.error(f'Error in Share Structure: Failed to retrieve Share Series for {identifier}')
@@ -192,12 +206,17 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
 
     @classmethod
     def get_all(cls, cursor, corp_num: str, event_id: str = None) -> Optional[List, ShareObject]:
-        """Return all share structure entries for this business (Optional: return all for specific share structure)."""
+        """Return all share structure entries for this business (Optional: return all for specific share structure).
+
+        The structures, their classes and the series of the classes are each read in one query.
+        """
         # Add business NME to all queries
         query = 'select start_event_id, end_event_id from share_struct where corp_num=:corp_num'
+        binds = {'corp_num': corp_num}
 
         if event_id:
-            query += f' and start_event_id={event_id}'
+            query += ' and start_event_id=:event_id'
+            binds['event_id'] = event_id
         else:
             query += ' and end_event_id is null'
         try:
@@ -205,7 +224,7 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
                 cursor = DB.connection.cursor()
             cursor.execute(
                 query,
-                corp_num=corp_num
+                **binds
             )
             share_list = cls._build_shares_list(cursor, corp_num)
             if not share_list:
@@ -243,15 +262,12 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
             raise err
 
         max_class_id = get_max_value(cursor, corp_num=corp_num, table='share_struct_cls', column='share_class_id')
-        class_id = max_class_id + 1 if max_class_id else 0
-        for share_class in shares_list:
-            cls.create_share_class(cursor, event_id, corp_num, class_id, share_class)
-            class_id = class_id + 1
+        cls.create_share_classes(cursor, event_id, corp_num, max_class_id + 1 if max_class_id else 0, shares_list)
 
     @classmethod
-    def create_share_class(cls, cursor, event_id: str, corp_num: str, class_id: int, class_dict: dict):
+    def create_share_classes(cls, cursor, event_id: str, corp_num: str, first_class_id: int, classes: list):
         # pylint: disable=too-many-arguments
-        """Create Share Classes for corp."""
+        """Create Share Classes, and their series, for corp, array bound."""
         query = (
             """
             insert into share_struct_cls (corp_num, share_class_id, start_event_id, currency_typ_cd, max_share_ind,
@@ -260,34 +276,37 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
                 :par_value, :name)
             """
         )
+        if not classes:
+            return
         try:
-            cursor.execute(
+            cursor.executemany(
                 query,
-                corp_num=corp_num,
-                class_id=class_id,
-                event_id=event_id,
-                currency=class_dict['currency'],
-                has_max_share='N' if class_dict['hasMaximumShares'] else 'Y',
-                qty=class_dict['maxNumberOfShares'],
-                has_spec_rights='Y' if class_dict['hasRightsOrRestrictions'] else 'N',
-                has_par_value='Y' if class_dict['hasParValue'] else 'N',
-                par_value=class_dict['parValue'],
-                name=class_dict['name']
+                [{
+                    'corp_num': corp_num,
+                    'class_id': class_id,
+                    'event_id': event_id,
+                    'currency': class_dict['currency'],
+                    'has_max_share': 'N' if class_dict['hasMaximumShares'] else 'Y',
+                    'qty': class_dict['maxNumberOfShares'],
+                    'has_spec_rights': 'Y' if class_dict['hasRightsOrRestrictions'] else 'N',
+                    'has_par_value': 'Y' if class_dict['hasParValue'] else 'N',
+                    'par_value': class_dict['parValue'],
+                    'name': class_dict['name']
+                } for class_id, class_dict in enumerate(classes, start=first_class_id)]
             )
         except Exception as err:
             current_app.logger.error(f'Error in Share Structure: Failed to create Share Classes for {corp_num}')
             raise err
 
-        series_id = 0
-        for share_series in class_dict.get('series', []):
-            cls.create_share_series(cursor, event_id, corp_num, class_id, series_id, share_series)
-            series_id = series_id + 1
+        cls.create_share_series(cursor, event_id, corp_num, [
+            (class_id, series_id, series_dict)
+            for class_id, class_dict in enumerate(classes, start=first_class_id)
+            for series_id, series_dict in enumerate(class_dict.get('series', []))
+        ])
 
     @classmethod
-    def create_share_series(
-            cls, cursor, event_id: str, corp_num: str, class_id: str, series_id: int, series_dict: dict):
-        # pylint: disable=too-many-arguments
-        """Insert Share Series for Share Class and Corp."""
+    def create_share_series(cls, cursor, event_id: str, corp_num: str, series_list: list):
+        """Insert Share Series, given as (class id, series id, series dict), for Corp, array bound."""
         query = (
             """
             insert into share_series (corp_num, share_class_id, series_id, start_event_id, max_share_ind,
@@ -295,17 +314,21 @@ class ShareObject:  # pylint: disable=too-many-instance-attributes;
             values (:corp_num, :class_id, :series_id, :event_id, :has_max_share, :qty, :has_spec_rights, :name)
             """
         )
+        if not series_list:
+            return
         try:
-            cursor.execute(
+            cursor.executemany(
                 query,
-                corp_num=corp_num,
-                class_id=class_id,
-                series_id=series_id,
-                event_id=event_id,
-                has_max_share='N' if series_dict['hasMaximumShares'] else 'Y',
-                qty=series_dict['maxNumberOfShares'],
-                has_spec_rights='Y' if series_dict['hasRightsOrRestrictions'] else 'N',
-                name=series_dict['name']
+                [{
+                    'corp_num': corp_num,
+                    'class_id': class_id,
+                    'series_id': series_id,
+                    'event_id': event_id,
+                    'has_max_share': 'N' if series_dict['hasMaximumShares'] else 'Y',
+                    'qty': series_dict['maxNumberOfShares'],
+                    'has_spec_rights': 'Y' if series_dict['hasRightsOrRestrictions'] else 'N',
+                    'name': series_dict['name']
+                } for class_id, series_id, series_dict in series_list]
             )
         except Exception as err:
             current_app.logger.error(f'Error in Share Structure: Failed to create Share Series for {corp_num}')
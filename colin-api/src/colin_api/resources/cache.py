@@ -0,0 +1,170 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cache of the COLIN filings that can no longer change.
+
+These will get initialized by the application.
+"""
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import current_app, json
+
+
+class FilingCache:
+    """Cache of the assembled filings from before the LEAR cut-over, which can never change.
+
+    The entries are kept, as json, in an in-memory LRU of each worker process and, if FILING_CACHE_DIR
+    is set, in files that are shared by the workers and kept across restarts. They never expire, and
+    are only removed by a purge.
+    """
+
+    PURGED_MARKER = '.purged'
+
+    def __init__(self, app=None):
+        """initializer, supports setting the app context on instantiation."""
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create setup for the extension.
+
+        :param app: Flask app
+        :return: naked
+        """
+        self.app = app
+        app.extensions['filing_cache'] = {'entries': OrderedDict(), 'purged_at': 0,
+                                          'hits': 0, 'disk_hits': 0, 'misses': 0, 'puts': 0, 'purges': 0}
+
+    @staticmethod
+    def _path(filing_type: str, key: str) -> Optional[str]:
+        """Return the file of the entry in the disk tier, or None if there is no disk tier."""
+        cache_dir = current_app.config.get('FILING_CACHE_DIR')
+        if not cache_dir or not re.fullmatch(r'\w+', filing_type) or not re.fullmatch(r'\w+', key):
+            return None
+        return os.path.join(cache_dir, filing_type, f'{key}.json')
+
+    def _check_purged(self, state: dict):
+        """Drop the memory tier if another worker purged the disk tier since it was last checked."""
+        cache_dir = current_app.config.get('FILING_CACHE_DIR')
+        try:
+            purged_at = os.stat(os.path.join(cache_dir, self.PURGED_MARKER)).st_mtime if cache_dir else 0
+        except FileNotFoundError:
+            return
+        if purged_at > state['purged_at']:
+            state['entries'].clear()
+            state['purged_at'] = purged_at
+
+    def _remember(self, state: dict, entry_key: tuple, value: str):
+        """Put the entry in the memory tier, evicting the least recently used ones if it is full."""
+        state['entries'][entry_key] = value
+        state['entries'].move_to_end(entry_key)
+        while len(state['entries']) > current_app.config.get('FILING_CACHE_SIZE'):
+            state['entries'].popitem(last=False)
+
+    def get(self, filing_type: str, key) -> Optional[dict]:
+        """Return a copy of the cached filing of the type for the key, ie. event id or corp num, or None."""
+        state = current_app.extensions['filing_cache']
+        entry_key = (filing_type, str(key))
+        with self._lock:
+            self._check_purged(state)
+            value = state['entries'].get(entry_key)
+            if value is not None:
+                state['entries'].move_to_end(entry_key)
+                state['hits'] += 1
+                return json.loads(value)
+
+        value = None
+        if path := self._path(*entry_key):
+            try:
+                with open(path) as cached_file:
+                    value = cached_file.read()
+            except OSError:
+                pass
+        if value is None:
+            with self._lock:
+                state['misses'] += 1
+            return None
+
+        with self._lock:
+            self._remember(state, entry_key, value)
+            state['disk_hits'] += 1
+        return json.loads(value)
+
+    def put(self, filing_type: str, key, filing: dict):
+        """Cache the filing of the type for the key, for good."""
+        state = current_app.extensions['filing_cache']
+        entry_key = (filing_type, str(key))
+        # serialized the way the responses are, so a filing is the same whether or not it is from the cache
+        value = json.dumps(filing)
+        with self._lock:
+            self._remember(state, entry_key, value)
+            state['puts'] += 1
+
+        if path := self._path(*entry_key):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # written to a temp file first, so the other workers never read part of it
+                with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), delete=False) as temp_file:
+                    temp_file.write(value)
+                os.replace(temp_file.name, path)
+            except OSError as err:
+                current_app.logger.warning(f'Failed to write {filing_type} {key} to the filing cache: {err}')
+
+    def purge(self, filing_type: str = None, key=None) -> int:
+        """Remove the cached filings, of the type and key if given, and return the number removed from memory."""
+        state = current_app.extensions['filing_cache']
+        with self._lock:
+            purged = [entry_key for entry_key in state['entries']
+                      if filing_type in (None, entry_key[0]) and key in (None, entry_key[1])]
+            for entry_key in purged:
+                del state['entries'][entry_key]
+            state['purges'] += 1
+
+        if cache_dir := current_app.config.get('FILING_CACHE_DIR'):
+            for root, _, files in os.walk(cache_dir):
+                for name in files:
+                    if name != self.PURGED_MARKER and \
+                            filing_type in (None, os.path.basename(root)) and key in (None, name[:-len('.json')]):
+                        os.remove(os.path.join(root, name))
+            # tells the other workers to drop their memory tier
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(os.path.join(cache_dir, self.PURGED_MARKER), 'w'):
+                pass
+            state['purged_at'] = os.stat(os.path.join(cache_dir, self.PURGED_MARKER)).st_mtime
+        return len(purged)
+
+    def stats(self) -> dict:
+        """Return the stats of the cache of this process."""
+        state = current_app.extensions['filing_cache']
+        lookups = state['hits'] + state['disk_hits'] + state['misses']
+        return {
+            'size': len(state['entries']),
+            'maxSize': current_app.config.get('FILING_CACHE_SIZE'),
+            'disk': bool(current_app.config.get('FILING_CACHE_DIR')),
+            'hits': state['hits'],
+            'diskHits': state['disk_hits'],
+            'misses': state['misses'],
+            'puts': state['puts'],
+            'purges': state['purges'],
+            'hitRate': round((state['hits'] + state['disk_hits']) / lookups, 4) if lookups else 0
+        }
+
+
+# export instance of this class
+FILING_CACHE = FilingCache()
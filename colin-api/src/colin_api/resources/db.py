@@ -15,33 +15,40 @@
 
 These will get initialized by the application.
 """
+import os
+import threading
+
 import cx_Oracle
 from flask import _app_ctx_stack, current_app
 
 
 class OracleDB:
-    """Oracle database connection object for re-use in application."""
+    """Oracle database connection object for re-use in application.
+
+    Each worker process has a single session pool, created at app start. The connections are acquired
+    from it as they are asked for, and go back to it once they are no longer referenced.
+    """
 
     def __init__(self, app=None):
         """initializer, supports setting the app context on instantiation."""
+        self._lock = threading.Lock()
         if app is not None:
             self.init_app(app)
 
     def init_app(self, app):
-        """Create setup for the extension.
+        """Create setup for the extension, and create the session pool.
 
+        If the database can't be reached, the pool is created when a connection is first asked for.
         :param app: Flask app
         :return: naked
         """
         self.app = app
-        app.teardown_appcontext(self.teardown)
-
-    @staticmethod
-    def teardown():
-        """Oracle session pool cleans up after itself."""
-        ctx = _app_ctx_stack.top
-        if hasattr(ctx, 'oracle_pool'):
-            ctx.oracle_pool.close()
+        app.extensions['oracle_db'] = {'pool': None, 'pid': None, 'acquires': 0, 'waits': 0, 'failures': 0}
+        with app.app_context():
+            try:
+                self._get_pool()
+            except cx_Oracle.DatabaseError as err:  # pylint:disable=c-extension-no-member
+                app.logger.warning(f'Oracle session pool not created at start: {err}')
 
     @staticmethod
     def _create_pool():
@@ -57,37 +64,77 @@ class OracleDB:
         def init_session(conn, *args):  # pylint: disable=unused-argument; Extra var being passed with call
             cursor = conn.cursor()
             cursor.execute("alter session set TIME_ZONE = 'America/Vancouver'")
-        return cx_Oracle.SessionPool(user=current_app.config.get('ORACLE_USER'),  # pylint:disable=c-extension-no-member
+        pool = cx_Oracle.SessionPool(user=current_app.config.get('ORACLE_USER'),  # pylint:disable=c-extension-no-member
                                      password=current_app.config.get('ORACLE_PASSWORD'),
                                      dsn='{0}:{1}/{2}'.format(current_app.config.get('ORACLE_HOST'),
                                                               current_app.config.get('ORACLE_PORT'),
                                                               current_app.config.get('ORACLE_DB_NAME')),
-                                     min=1,
-                                     max=10,
-                                     increment=1,
+                                     min=current_app.config.get('ORACLE_POOL_MIN'),
+                                     max=current_app.config.get('ORACLE_POOL_MAX'),
+                                     increment=current_app.config.get('ORACLE_POOL_INCREMENT'),
                                      connectiontype=cx_Oracle.Connection,  # pylint:disable=c-extension-no-member
                                      threaded=True,
-                                     getmode=cx_Oracle.SPOOL_ATTRVAL_NOWAIT,  # pylint:disable=c-extension-no-member
-                                     waitTimeout=1500,
+                                     getmode=cx_Oracle.SPOOL_ATTRVAL_TIMEDWAIT,  # pylint:disable=c-extension-no-member
+                                     waitTimeout=current_app.config.get('ORACLE_POOL_WAIT_TIMEOUT'),
                                      timeout=3600,
                                      sessionCallback=init_session,
                                      encoding='UTF-8',
                                      nencoding='UTF-8')
+        pool.stmtcachesize = current_app.config.get('ORACLE_STMT_CACHE_SIZE')
+        if hasattr(pool, 'ping_interval'):
+            # otherwise the Oracle Client pings the sessions that have been idle for 60 seconds when acquired
+            pool.ping_interval = current_app.config.get('ORACLE_POOL_PING_INTERVAL')
+        return pool
+
+    def _get_pool(self):
+        """Return the session pool of this process, creating it if needed, eg. in a newly forked worker."""
+        state = current_app.extensions['oracle_db']
+        if state['pool'] is None or state['pid'] != os.getpid():
+            with self._lock:
+                if state['pool'] is None or state['pid'] != os.getpid():
+                    state['pool'] = self._create_pool()
+                    state['pid'] = os.getpid()
+        return state['pool']
+
+    def _acquire(self):
+        """Acquire a session from the pool of this process."""
+        state = current_app.extensions['oracle_db']
+        pool = self._get_pool()
+        state['acquires'] += 1
+        if pool.busy >= pool.opened:
+            # every open session is in use, so the pool has to grow or wait for one to come back
+            state['waits'] += 1
+        try:
+            return pool.acquire()
+        except cx_Oracle.DatabaseError:  # pylint:disable=c-extension-no-member
+            state['failures'] += 1
+            raise
+
+    def pool_stats(self) -> dict:
+        """Return the stats of the session pool of this process."""
+        state = current_app.extensions['oracle_db']
+        pool = state['pool']
+        return {
+            'open': pool.opened if pool else 0,
+            'busy': pool.busy if pool else 0,
+            'min': pool.min if pool else 0,
+            'max': pool.max if pool else 0,
+            'stmtCacheSize': pool.stmtcachesize if pool else 0,
+            'acquires': state['acquires'],
+            'waits': state['waits'],
+            'failures': state['failures']
+        }
 
     @property
     def connection(self):  # pylint: disable=inconsistent-return-statements
         """Create connection property for the NROService.
 
-        If this is running in a Flask context,
-        then either get the existing connection pool or create a new one
-        and then return an acquired session
+        If this is running in a Flask context, then acquire a session from the pool of this process
         :return: cx_Oracle.connection type
         """
         ctx = _app_ctx_stack.top
         if ctx is not None:
-            if not hasattr(ctx, 'oracle_pool'):
-                ctx._oracle_pool = self._create_pool()  # pylint: disable = protected-access; need this method
-            return ctx._oracle_pool.acquire()  # pylint: disable = protected-access; need this method
+            return self._acquire()
 
 
 # export instance of this class
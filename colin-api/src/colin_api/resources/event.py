@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Event info endpoint for colin db."""
-from flask import current_app, jsonify
+from http import HTTPStatus
+
+from flask import current_app, jsonify, request
 from flask_restplus import Resource, cors
 
 from colin_api.resources.business import API
@@ -21,36 +23,66 @@ from colin_api.utils.util import cors_preflight
 
 
 @cors_preflight('GET, POST')
-@API.route('/event/<string:corp_type>/<string:event_id>')
+@API.route('/event/<string:corp_type>/<string:event_id>', '/event/<string:event_id>')
 class EventInfo(Resource):
     """Meta information about the overall service."""
 
+    MAX_PAGE_SIZE = 1000
+
     @staticmethod
     @cors.crossdomain(origin='*')
-    def get(corp_type, event_id):
-        """Return all event_ids of the corp_type that are greater than the given event_id."""
-        querystring = ("""
-            select event.event_id, corp_num, filing.filing_typ_cd
-            from event
-            join filing on event.event_id = filing.event_id
-            where corp_num like :corp_type
+    def get(event_id, corp_type=None):
+        """Return a page of the event_ids, of the corp_type if given, that are greater than the given event_id.
+
+        The events are in event id order, and up to the limit query parameter of them are returned at a time.
+        The next event_id to page from is returned as next, or None once the last page has been returned.
+        """
+        try:
+            limit = min(int(request.args.get('limit', EventInfo.MAX_PAGE_SIZE)), EventInfo.MAX_PAGE_SIZE)
+            if event_id != 'earliest':
+                event_id = int(event_id)
+        except ValueError:
+            return jsonify({'message': 'event_id and limit must be integers.'}), HTTPStatus.BAD_REQUEST
+        if limit < 1:
+            return jsonify({'message': 'limit must be positive.'}), HTTPStatus.BAD_REQUEST
+
+        conditions = []
+        binds = {'limit': limit}
+        if event_id != 'earliest':
+            conditions.append('event.event_id > :max_event_id')
+            binds['max_event_id'] = event_id
+        else:
+            conditions.append("event_timestmp > TO_DATE('2019-03-08', 'yyyy-mm-dd')")
+        if corp_type:
+            # the range of corp nums starting with the corp type, unlike a like, can use the corp num index
+            conditions.append('event.corp_num >= :corp_num_from and event.corp_num < :corp_num_to')
+            binds['corp_num_from'] = corp_type
+            binds['corp_num_to'] = corp_type[:-1] + chr(ord(corp_type[-1]) + 1)
+
+        querystring = (f"""
+            select * from (
+                select event.event_id, corp_num, filing.filing_typ_cd
+                from event
+                join filing on event.event_id = filing.event_id
+                where {' and '.join(conditions)}
+                order by event.event_id asc
+            )
+            where rownum <= :limit
             """)
 
         try:
             cursor = DB.connection.cursor()
-            if event_id != 'earliest':
-                querystring += 'and event.event_id > :max_event_id'
-                cursor.execute(querystring, max_event_id=event_id, corp_type=corp_type + '%')
-            else:
-                querystring += "and event_timestmp > TO_DATE('2019-03-08', 'yyyy-mm-dd') order by event.event_id asc"
-                cursor.execute(querystring, corp_type=corp_type + '%')
+            cursor.execute(querystring, **binds)
 
             event_info = cursor.fetchall()
             event_list = []
             for event in event_info:
                 event = dict(zip([x[0].lower() for x in cursor.description], event))
                 event_list.append(event)
-            return jsonify({'events': event_list})
+            return jsonify({
+                'events': event_list,
+                'next': event_list[-1]['event_id'] if len(event_list) == limit else None
+            })
 
         except Exception as err:  # pylint: disable=broad-except; want to catch all errors
             current_app.logger.error(err.with_traceback(None))
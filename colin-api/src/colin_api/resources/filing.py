@@ -25,6 +25,7 @@ from colin_api.exceptions import GenericException
 from colin_api.models import Business
 from colin_api.models.filing import DB, Filing
 from colin_api.resources.business import API
+from colin_api.resources.cache import FILING_CACHE
 from colin_api.utils import convert_to_pacific_time
 from colin_api.utils.util import cors_preflight
 
@@ -114,20 +115,7 @@ class FilingInfo(Resource):
                 identifier = identifier[-7:]
 
             corp_types = Business.CORP_TYPE_CONVERSION[legal_type]
-            if json_data.get('correction', None):
-                filing_list = {'correction': json_data['correction']}
-            else:
-                filing_list = {
-                    'changeOfAddress': json_data.get('changeOfAddress', None),
-                    'changeOfDirectors': json_data.get('changeOfDirectors', None),
-                    'annualReport': json_data.get('annualReport', None),
-                    'incorporationApplication': json_data.get('incorporationApplication', None),
-                    'alteration': json_data.get('alteration', None),
-                    'transition': json_data.get('transition', None)
-                }
-
-            # Filter out null-values in the filing_list dictionary
-            filing_list = {k: v for k, v in filing_list.items() if filing_list[k]}
+            filing_list = FilingInfo._get_filing_list(json_data)
             try:
                 # get db connection and start a session, in case we need to roll back
                 con = DB.connection
@@ -135,25 +123,7 @@ class FilingInfo(Resource):
                 filings_added = FilingInfo._add_filings(con, json_data, filing_list, identifier, corp_types)
 
                 # return the completed filing data
-                completed_filing = Filing()
-                # get business info again - could have changed since filings were applied
-                completed_filing.business = Business.find_by_identifier(identifier, corp_types, con)
-                completed_filing.body = {}
-                for filing_info in filings_added:
-                    sub_filing = Filing()
-                    sub_filing.business = completed_filing.business
-                    sub_filing.filing_type = filing_info['filing_type']
-                    sub_filing.event_id = filing_info['event_id']
-                    sub_filing = Filing.get_filing(filing=sub_filing, con=con)
-
-                    if completed_filing.header:
-                        completed_filing.header['colinIds'].append(sub_filing.event_id)
-                        # annual report is the only filing with sub filings underneath it
-                        if sub_filing.filing_type == 'annualReport':
-                            completed_filing.header['name'] = 'annualReport'
-                    else:
-                        completed_filing.header = sub_filing.header
-                    completed_filing.body.update({sub_filing.filing_type: sub_filing.body})
+                completed_filing = FilingInfo._get_completed_filing(con, identifier, corp_types, filings_added)
 
                 # success! commit the db changes
                 con.commit()
@@ -172,6 +142,48 @@ class FilingInfo(Resource):
                 {'message': f'Error when trying to file for business {identifier}'}
             ), HTTPStatus.INTERNAL_SERVER_ERROR
 
+    @staticmethod
+    def _get_filing_list(json_data: dict) -> dict:
+        """Return the parts of the filing to add, by filing type."""
+        if json_data.get('correction', None):
+            filing_list = {'correction': json_data['correction']}
+        else:
+            filing_list = {
+                'changeOfAddress': json_data.get('changeOfAddress', None),
+                'changeOfDirectors': json_data.get('changeOfDirectors', None),
+                'annualReport': json_data.get('annualReport', None),
+                'incorporationApplication': json_data.get('incorporationApplication', None),
+                'alteration': json_data.get('alteration', None),
+                'transition': json_data.get('transition', None)
+            }
+
+        # Filter out null-values in the filing_list dictionary
+        return {k: v for k, v in filing_list.items() if filing_list[k]}
+
+    @staticmethod
+    def _get_completed_filing(con, identifier: str, corp_types: list, filings_added: list) -> Filing:
+        """Return the completed filing, read back from the db, with the colin ids of all its parts."""
+        completed_filing = Filing()
+        # get business info again - could have changed since filings were applied
+        completed_filing.business = Business.find_by_identifier(identifier, corp_types, con)
+        completed_filing.body = {}
+        for filing_info in filings_added:
+            sub_filing = Filing()
+            sub_filing.business = completed_filing.business
+            sub_filing.filing_type = filing_info['filing_type']
+            sub_filing.event_id = filing_info['event_id']
+            sub_filing = Filing.get_filing(filing=sub_filing, con=con)
+
+            if completed_filing.header:
+                completed_filing.header['colinIds'].append(sub_filing.event_id)
+                # annual report is the only filing with sub filings underneath it
+                if sub_filing.filing_type == 'annualReport':
+                    completed_filing.header['name'] = 'annualReport'
+            else:
+                completed_filing.header = sub_filing.header
+            completed_filing.body.update({sub_filing.filing_type: sub_filing.body})
+        return completed_filing
+
     @staticmethod
     def _add_filings(con, json_data: dict, filing_list: list, identifier: str, corp_types: list) -> list:
         """Process all parts of the filing."""
@@ -193,3 +205,151 @@ class FilingInfo(Resource):
             event_id = Filing.add_filing(con, filing)
             filings_added.append({'event_id': event_id, 'filing_type': filing_type})
         return filings_added
+
+
+@cors_preflight('GET, POST')
+@API.route('/<string:legal_type>/filings', methods=['GET', 'POST'])
+class BulkFilingInfo(Resource):
+    """Gets or adds a batch of filings."""
+
+    MAX_FILINGS = 100
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def get(legal_type):
+        """Return the filings of the event ids given as eventId query parameters, in event id order.
+
+        Each item has the eventId and either the filing or its errors, and event ids with no filing are left out.
+        """
+        if legal_type not in [x.value for x in Business.LearBusinessTypes]:
+            return jsonify({'message': 'Must provide a valid legal type.'}), HTTPStatus.BAD_REQUEST
+        try:
+            event_ids = [int(event_id) for event_id in request.args.getlist('eventId')]
+        except ValueError:
+            return jsonify({'message': 'eventId must be an integer.'}), HTTPStatus.BAD_REQUEST
+        if len(event_ids) > BulkFilingInfo.MAX_FILINGS:
+            return jsonify(
+                {'message': f'No more than {BulkFilingInfo.MAX_FILINGS} filings can be fetched at a time.'}
+            ), HTTPStatus.BAD_REQUEST
+
+        corp_types = Business.CORP_TYPE_CONVERSION[legal_type]
+        results = []
+        businesses = {}
+        try:
+            con = DB.connection
+            con.begin()
+            for event in Filing.get_filing_events(con.cursor(), event_ids):
+                result = {'eventId': event['event_id']}
+                results.append(result)
+                try:
+                    if event['corp_num'] not in businesses:
+                        businesses[event['corp_num']] = Business.find_by_identifier(event['corp_num'], corp_types, con)
+                    filing = Filing()
+                    filing.business = businesses[event['corp_num']]
+                    # pylint: disable=protected-access
+                    filing.filing_type = Filing._get_filing_type(event['filing_typ_cd'])
+                    filing.event_id = event['event_id']
+                    result['filing'] = Filing.get_filing(filing=filing, con=con).as_dict()['filing']
+                except GenericException as err:
+                    result['errors'] = [{'message': err.error}]
+
+        except Exception as err:  # pylint: disable=broad-except; want to catch all errors
+            current_app.logger.error(err.with_traceback(None))
+            return jsonify(
+                {'message': 'Error when trying to retrieve filings from COLIN'}
+            ), HTTPStatus.INTERNAL_SERVER_ERROR
+
+        return jsonify({'filings': results})
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def post(legal_type):
+        """Add an ordered array of filings in one transaction, each one in its own savepoint.
+
+        The body is {'filings': [...]}, and the response has an item for each filing, in the same order,
+        with either its colinIds, and the completed filing unless the fetch query parameter is false,
+        or its errors. The filings of a business after one that failed are skipped, so they are never
+        applied out of order.
+        """
+        if legal_type not in [x.value for x in Business.LearBusinessTypes]:
+            return jsonify({'message': 'Must provide a valid legal type.'}), HTTPStatus.BAD_REQUEST
+
+        json_data = request.get_json()
+        if not json_data or not isinstance(json_data.get('filings'), list):
+            return jsonify({'message': 'No filings provided'}), HTTPStatus.BAD_REQUEST
+        if len(json_data['filings']) > BulkFilingInfo.MAX_FILINGS:
+            return jsonify({'message': f'No more than {BulkFilingInfo.MAX_FILINGS} filings can be added at a time.'}), \
+                HTTPStatus.BAD_REQUEST
+        fetch = request.args.get('fetch', 'true').lower() != 'false'
+
+        corp_types = Business.CORP_TYPE_CONVERSION[legal_type]
+        results = []
+        failed_identifiers = set()
+        con = None
+        try:
+            con = DB.connection
+            con.begin()
+            cursor = con.cursor()
+            for filing_json in json_data['filings']:
+                result = {'filingId': filing_json.get('filingId')}
+                results.append(result)
+                is_valid, errors = validate(filing_json, 'filing', validate_schema=True)
+                if not is_valid:
+                    result['errors'] = [{'message': err.message} for err in errors]
+                    failed_identifiers.add(filing_json.get('filing', {}).get('business', {}).get('identifier'))
+                    continue
+
+                filing_json = filing_json['filing']
+                identifier = filing_json['business']['identifier']
+                if identifier in failed_identifiers:
+                    result['errors'] = [{'message': f'Skipped after an earlier filing for {identifier} failed.'}]
+                    continue
+                # convert identifier if BC legal_type
+                if legal_type in Business.CORP_TYPE_CONVERSION[Business.LearBusinessTypes.BCOMP.value]:
+                    identifier = identifier[-7:]
+
+                cursor.execute('SAVEPOINT bulk_filing')
+                try:
+                    filings_added = FilingInfo._add_filings(  # pylint: disable=protected-access
+                        con, filing_json, FilingInfo._get_filing_list(filing_json),  # pylint: disable=protected-access
+                        identifier, corp_types)
+                    result['colinIds'] = [filing_info['event_id'] for filing_info in filings_added]
+                    if fetch:
+                        result['filing'] = FilingInfo._get_completed_filing(  # pylint: disable=protected-access
+                            con, identifier, corp_types, filings_added).as_dict()['filing']
+                except Exception as err:  # pylint: disable=broad-except; the filing is rolled back and reported
+                    current_app.logger.error(f'failed to file for business {identifier} - rolling back its changes.')
+                    current_app.logger.error(err.with_traceback(None))
+                    cursor.execute('ROLLBACK TO SAVEPOINT bulk_filing')
+                    result.pop('colinIds', None)
+                    result['errors'] = [{'message': getattr(err, 'error', None) or
+                                         f'Error when trying to file for business {identifier}'}]
+                    failed_identifiers.add(filing_json['business']['identifier'])
+
+            # commit the filings that were added
+            con.commit()
+        except Exception as err:  # pylint: disable=broad-except; want to catch all errors
+            current_app.logger.error('failed to file the batch - rolling back all of its db changes.')
+            current_app.logger.error(err.with_traceback(None))
+            if con:
+                con.rollback()
+            return jsonify(
+                {'message': 'Error when trying to file the batch of filings'}
+            ), HTTPStatus.INTERNAL_SERVER_ERROR
+
+        status = HTTPStatus.CREATED if all('colinIds' in result for result in results) else HTTPStatus.MULTI_STATUS
+        return jsonify({'filings': results}), status
+
+
+@cors_preflight('DELETE')
+@API.route('/internal/filings/cache', methods=['DELETE'])
+class FilingCacheInfo(Resource):
+    """Purges the cache of the filings from before the bob-date."""
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def delete():
+        """Purge the cached filings, or only those of the filingType and key (event id or corp num) if given."""
+        purged = FILING_CACHE.purge(filing_type=request.args.get('filingType', None),
+                                    key=request.args.get('key', None))
+        return jsonify({'purged': purged}), HTTPStatus.OK
@@ -16,6 +16,7 @@ import cx_Oracle
 from flask import current_app
 from flask_restplus import Namespace, Resource
 
+from colin_api.resources.cache import FILING_CACHE
 from colin_api.resources.db import DB
 
 
@@ -48,6 +49,16 @@ class Healthz(Resource):
         return {'message': 'api is healthy'}, 200
 
 
+@API.route('metricz')
+class Metricz(Resource):
+    """Exposes the metrics of the service."""
+
+    @staticmethod
+    def get():
+        """Return a JSON object with the stats of the Oracle session pool and filing cache of this worker process."""
+        return {'oraclePool': DB.pool_stats(), 'filingCache': FILING_CACHE.stats()}, 200
+
+
 @API.route('readyz')
 class Readyz(Resource):
     """Determines if the service is ready to respond."""
@@ -101,6 +101,39 @@ def get_max_value(cursor, corp_num: str, table: str, column: str):
         raise err
 
 
+def get_next_ids(cursor, count: int, sequence: str = None, id_typ_cd: str = None) -> list:
+    """Get count new ids, in one round trip from the sequence, or in two from the system_id row of the id_typ_cd."""
+    if not count:
+        return []
+    try:
+        if sequence:
+            # sequence is a value set by the code: not possible to be sql injected from a request
+            cursor.execute(f"""
+                select {sequence}.NEXTVAL from dual connect by level <= :count
+            """, count=count)
+            return [int(row[0]) for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT id_num
+            FROM system_id
+            WHERE id_typ_cd = :id_typ_cd
+            FOR UPDATE
+        """, id_typ_cd=id_typ_cd)
+        next_id = int(cursor.fetchone()[0])
+
+        if next_id:
+            cursor.execute("""
+                UPDATE system_id
+                SET id_num = :new_num
+                WHERE id_typ_cd = :id_typ_cd
+            """, new_num=next_id + count, id_typ_cd=id_typ_cd)
+        return list(range(next_id, next_id + count))
+
+    except Exception as err:
+        current_app.logger.error(f'Error getting {count} new ids from {sequence or id_typ_cd}.')
+        raise err
+
+
 def convert_to_snake(inputstring: str):
     """Convert inputstring from camel case to snake case."""
     return ''.join('_' + char.lower() if char.isupper() else char for char in inputstring).lstrip('_')
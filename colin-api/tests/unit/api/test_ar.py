@@ -17,6 +17,7 @@
 Test-Suite to ensure that the /ops endpoint is working as expected.
 """
 
+import copy
 import json
 
 from registry_schemas import validate
@@ -242,3 +243,43 @@ def test_post_ar_with_mismatched_identifer(client):
 
     assert 400 == rv.status_code
     assert 'Error: Identifier in URL does not match identifier in filing data' == rv.json['message']
+
+
+@oracle_integration
+def test_post_ar_bulk(client):
+    """Assert that a batch of filings is added, and that the filings after a failed one of the same business are not."""
+    headers = {'content-type': 'application/json'}
+    fake_filing = copy.deepcopy(ANNUAL_REPORT)
+    fake_filing['filing'].pop('changeOfAddress', None)
+    fake_filing['filing'].pop('changeOfDirectors', None)
+    fake_filing['filing']['header']['learEffectiveDate'] = \
+        f'{fake_filing["filing"]["header"]["date"]}T15:22:39.868757+00:00'
+    fake_filing['filing']['business']['identifier'] = 'CP0001965'
+    fake_filing['filing']['annualReport']['annualGeneralMeetingDate'] = '2020-04-08'
+    fake_filing['filing']['annualReport']['annualReportDate'] = '2020-04-08'
+    invalid_filing = copy.deepcopy(fake_filing)
+    del invalid_filing['filing']['header']
+
+    rv = client.post('/api/v1/businesses/CP/filings?fetch=false',
+                     data=json.dumps({'filings': [fake_filing, invalid_filing]}), headers=headers)
+
+    assert 207 == rv.status_code
+    assert len(rv.json['filings']) == 2
+    assert rv.json['filings'][0]['colinIds']
+    assert 'filing' not in rv.json['filings'][0]
+    assert rv.json['filings'][1]['errors']
+
+    rv = client.get(f'/api/v1/businesses/CP/CP0001965/filings/annualReport'
+                    f'?eventId={rv.json["filings"][0]["colinIds"][0]}')
+    assert 200 == rv.status_code
+
+
+@oracle_integration
+def test_get_ar_bulk(client):
+    """Assert that the filings of a list of event ids are fetched at once."""
+    rv = client.get('/api/v1/businesses/CP/filings?' + '&'.join(f'eventId={event_id}' for event_id in ar_ids))
+
+    assert 200 == rv.status_code
+    assert [str(filing['eventId']) for filing in rv.json['filings']] == sorted(ar_ids, key=int)
+    for filing in rv.json['filings']:
+        assert str(filing['filing']['annualReport']['eventId']) == str(filing['eventId'])
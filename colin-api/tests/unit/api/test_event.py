@@ -0,0 +1,46 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests to assure the event end-point.
+
+Test-Suite to ensure that the /event endpoint is working as expected.
+"""
+from tests import oracle_integration
+
+
+@oracle_integration
+def test_get_events_paged(client):
+    """Assert that the events are paged through in event id order."""
+    rv = client.get('/api/v1/businesses/event/CP/earliest?limit=2')
+
+    assert 200 == rv.status_code
+    events = rv.json['events']
+    assert len(events) <= 2
+    assert [event['event_id'] for event in events] == sorted(event['event_id'] for event in events)
+    assert all(event['corp_num'].startswith('CP') for event in events)
+    if rv.json['next']:
+        assert rv.json['next'] == events[-1]['event_id']
+        rv = client.get(f'/api/v1/businesses/event/CP/{rv.json["next"]}?limit=2')
+
+        assert 200 == rv.status_code
+        assert all(event['event_id'] > events[-1]['event_id'] for event in rv.json['events'])
+
+
+def test_get_events_invalid(client):
+    """Assert that an invalid event id or limit is rejected."""
+    rv = client.get('/api/v1/businesses/event/CP/notanid')
+    assert 400 == rv.status_code
+
+    rv = client.get('/api/v1/businesses/event/CP/earliest?limit=0')
+    assert 400 == rv.status_code
@@ -0,0 +1,68 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests to assure the cache of the filings from before the bob-date.
+
+Test-Suite to ensure that the cache, and its purge and stats, are working as expected.
+"""
+from colin_api import create_app
+from colin_api.resources.cache import FILING_CACHE
+
+
+def test_filing_cache_tiers(tmp_path):
+    """Assert that the least recently used filings are dropped from memory, but are still on disk for all workers."""
+    worker, other_worker = create_app('testing'), create_app('testing')
+    for app in [worker, other_worker]:
+        app.config['FILING_CACHE_SIZE'] = 2
+        app.config['FILING_CACHE_DIR'] = str(tmp_path)
+
+    with worker.app_context():
+        for event_id in [1, 2, 3]:
+            FILING_CACHE.put('annualReport', event_id, {'header': {'colinIds': [event_id]}})
+        assert FILING_CACHE.get('annualReport', 3) == {'header': {'colinIds': [3]}}
+        # dropped from memory, but not from disk
+        assert FILING_CACHE.get('annualReport', 1) == {'header': {'colinIds': [1]}}
+        assert FILING_CACHE.get('changeOfAddress', 1) is None
+        stats = FILING_CACHE.stats()
+        assert (stats['size'], stats['hits'], stats['diskHits'], stats['misses']) == (2, 1, 1, 1)
+
+    with other_worker.app_context():
+        assert FILING_CACHE.get('annualReport', 2) == {'header': {'colinIds': [2]}}
+        assert FILING_CACHE.purge('annualReport', '2') == 1
+        assert FILING_CACHE.get('annualReport', 2) is None
+
+    with worker.app_context():
+        # purged by the other worker
+        assert FILING_CACHE.get('annualReport', 2) is None
+        assert FILING_CACHE.get('annualReport', 3) == {'header': {'colinIds': [3]}}
+
+
+def test_filing_cache_purge(app_request):
+    """Assert that the cache is purged, and its stats are exposed."""
+    with app_request.app_context():
+        FILING_CACHE.put('historic', 'CP0000001', [])
+        assert FILING_CACHE.get('historic', 'CP0000001') == []
+
+    with app_request.test_client() as client:
+        rv = client.delete('/api/v1/businesses/internal/filings/cache?filingType=historic')
+
+        assert 200 == rv.status_code
+        assert rv.json == {'purged': 1}
+
+        rv = client.get('/ops/metricz')
+
+        assert 200 == rv.status_code
+        assert rv.json['filingCache']['size'] == 0
+        assert rv.json['filingCache']['hits'] == 1
+        assert rv.json['filingCache']['purges'] == 1
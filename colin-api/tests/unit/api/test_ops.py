@@ -16,6 +16,7 @@
 
 Test-Suite to ensure that the /ops endpoint is working as expected.
 """
+from colin_api import config, create_app
 from tests import oracle_integration
 
 
@@ -28,16 +29,26 @@ def test_ops_healthz_success(client):
     assert {'message': 'api is healthy'} == rv.json
 
 
-def test_ops_healthz_fail(app_request):
+def test_ops_healthz_fail(monkeypatch):
     """Assert that the service is unhealthy if a connection toThe database cannot be made."""
-    app_request.config['ORACLE_DB_NAME'] = 'somethingnotreal'
-    with app_request.test_client() as client:
+    # the session pool is created at app start
+    monkeypatch.setattr(config.TestConfig, 'ORACLE_DB_NAME', 'somethingnotreal')
+    app = create_app('testing')
+    with app.test_client() as client:
         rv = client.get('/ops/healthz')
 
         assert 500 == rv.status_code
         assert 'api is down' in rv.json.values()
 
 
+def test_ops_metricz(client):
+    """Assert that the stats of the session pool are returned."""
+    rv = client.get('/ops/metricz')
+
+    assert 200 == rv.status_code
+    assert {'open', 'busy', 'acquires', 'waits', 'failures'} <= rv.json['oraclePool'].keys()
+
+
 def test_ops_readyz(client):
     """Asserts that the service is ready to serve."""
     rv = client.get('/ops/readyz')
@@ -0,0 +1,376 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests to assure the filings, and their parties and offices, are loaded in a fixed number of round trips.
+
+The queries are answered by a fake cursor, so these run without a database.
+"""
+import datetime
+
+import pytest
+
+from colin_api.models import Business, Office, Party
+from colin_api.models.filing import Filing
+
+
+EVENT_DATE = datetime.datetime(2021, 3, 1)
+
+
+def event_row(filing_type_code: str, corp_num: str, event_date: datetime.datetime = EVENT_DATE):
+    """Return the row of the filing event."""
+    return (100, event_date, 'JOE', None, 'SMITH', 'joe@example.com', datetime.datetime(2020, 12, 31),
+            datetime.datetime(2020, 6, 1), None, corp_num, None, filing_type_code, None, None)
+
+
+def party_rows(count: int, role: str):
+    """Return the rows of count parties with the role."""
+    return [(f'FIRST{i}', '', f'LAST{i}', 1000 + i, 2000 + i, datetime.datetime(2010, 1, 1), None, 90, None, None,
+             role, i) for i in range(count)]
+
+
+def share_rows(classes: int, series: int):
+    """Return the rows of a share structure with the classes, each with the series."""
+    return {
+        'share_structs': [(100, None)],
+        'share_classes': [(100, i, 'CAD', 'Y', 1000, 'Y', 'N', None, f'CLASS {i}', None) for i in range(classes)],
+        'share_series': [(i, j, 'Y', 100, 'N', f'SERIES {i}-{j}') for i in range(classes) for j in range(series)],
+    }
+
+
+class FakeConnection:
+    """A connection that hands out the fake cursor."""
+
+    def __init__(self, cursor):
+        """Initialize the connection with the cursor."""
+        self._cursor = cursor
+
+    def cursor(self):
+        """Return the fake cursor."""
+        return self._cursor
+
+
+class FakeCursor:
+    """A cursor that answers the queries of the filing loaders from canned rows, and counts them."""
+
+    ADDRESS_COLUMNS = ['addr_id', 'addr_line_1', 'addr_line_2', 'addr_line_3', 'city', 'province', 'full_desc',
+                       'postal_cd', 'delivery_instructions']
+    # the tables are matched in order, on a part of their query
+    TABLES = [
+        ('filing_user', 'events', ['event_id', 'event_timestmp', 'first_nme', 'middle_nme', 'last_nme', 'email_addr',
+                                   'period_end_dt', 'agm_date', 'effective_dt', 'corp_num', 'user_id',
+                                   'filing_typ_cd', 'arrangement_ind', 'court_order_num']),
+        ('filing_typ_cd in', 'component_events', ['event_id', 'event_timestmp', 'period_end_dt', 'filing_typ_cd']),
+        ('completing_party', 'completing_parties', ['first_nme', 'middle_nme', 'last_nme', 'recognition_dts']),
+        ('from corp_party', 'parties', ['first_nme', 'middle_nme', 'last_nme', 'delivery_addr_id', 'mailing_addr_id',
+                                        'appointment_dt', 'cessation_dt', 'start_event_id', 'end_event_id',
+                                        'business_nme', 'party_typ_cd', 'corp_party_id']),
+        ('from office', 'offices', ['start_event_id', 'end_event_id', 'mailing_addr_id', 'delivery_addr_id',
+                                    'office_typ_cd']),
+        ('from share_struct_cls', 'share_classes', ['start_event_id', 'share_class_id', 'currency_typ_cd',
+                                                    'max_share_ind', 'share_quantity', 'spec_rights_ind',
+                                                    'par_value_ind', 'par_value_amt', 'class_nme', 'other_currency']),
+        ('from share_series', 'share_series', ['share_class_id', 'series_id', 'max_share_ind', 'share_quantity',
+                                               'spec_right_ind', 'series_nme']),
+        ('from share_struct', 'share_structs', ['start_event_id', 'end_event_id']),
+        ('from corp_name', 'names', ['start_event_id', 'corp_nme', 'corp_name_typ_cd', 'corp_num', 'end_event_id']),
+        ('FROM corp_restriction', 'restrictions', ['corp_num', 'start_event_id', 'end_event_id', 'restriction_ind']),
+        ('FROM corporation', 'corporation', ['recognition_dts']),
+    ]
+
+    def __init__(self, **rows):
+        """Initialize the cursor with the rows of each table."""
+        self.rows = {'corporation': [(datetime.datetime(2000, 1, 1),)], **rows}
+        self.executed = []
+        self.description = None
+        self._rows = []
+
+    def execute(self, query: str, **kwargs):
+        """Record the query, and get its result ready."""
+        self.executed.append(query)
+        if 'from ADDRESS' in query:
+            self._set_result(self.ADDRESS_COLUMNS, [
+                (address_id, f'{address_id} MAIN ST', None, None, 'VICTORIA', 'BC', 'CANADA', 'V8W 1A1', None)
+                for address_id in kwargs.values()
+            ])
+            return
+        for marker, table, columns in self.TABLES:
+            if marker in query:
+                self._set_result(columns, self.rows.get(table, []))
+                return
+        raise AssertionError(f'unexpected query {query}')
+
+    def _set_result(self, columns, rows):
+        self.description = [(column.upper(),) for column in columns]
+        self._rows = list(rows)
+
+    def fetchall(self):
+        """Return the rows of the last query."""
+        return self._rows
+
+    def fetchone(self):
+        """Return the first row of the last query."""
+        return self._rows[0] if self._rows else None
+
+
+def test_parties_round_trips(app):
+    """Assert that the parties are loaded in 3 queries, however many there are."""
+    parties = [(f'FIRST{i}', '', f'LAST{i}', 1000 + i, 2000 + i, None if i % 2 else datetime.datetime(2010, 1, 1),
+                None, 1, None, None, 'DIR', i) for i in range(40)]
+    cursor = FakeCursor(parties=parties)
+
+    with app.app_context():
+        directors = Party.get_current(cursor, 'CP0000001')
+
+    # parties, addresses and founding date
+    assert len(cursor.executed) == 3
+    assert len(directors) == 40
+    assert directors[0].delivery_address['addressId'] == 1000
+    assert directors[0].mailing_address['addressId'] == 2000
+    assert directors[1].appointment_date == '2000-01-01'
+
+
+def test_offices_round_trips(app):
+    """Assert that the offices are loaded in 2 queries."""
+    cursor = FakeCursor(offices=[(1, None, 11, 12, 'RG'), (1, None, None, 21, 'RC')])
+
+    with app.app_context():
+        offices = Office.convert_obj_list(Office.get_current(cursor, 'CP0000001'))
+
+    # offices and addresses
+    assert len(cursor.executed) == 2
+    assert offices['registeredOffice']['deliveryAddress']['addressId'] == 12
+    assert offices['registeredOffice']['mailingAddress']['addressId'] == 11
+    assert offices['recordsOffice']['mailingAddress'] == offices['recordsOffice']['deliveryAddress']
+
+
+@pytest.mark.parametrize('filing_type, corp_num, corp_type, rows, budget', [
+    ('annualReport', 'CP0000001', 'CP', {
+        'events': [event_row('OTANN', 'CP0000001')],
+        'component_events': [(90, datetime.datetime(2021, 1, 1), None, 'OTADD'),
+                             (95, datetime.datetime(2021, 2, 1), None, 'OTCDR')],
+        'offices': [(90, None, 11, 12, 'RG')],
+        'parties': party_rows(20, 'DIR'),
+    }, 7),
+    ('changeOfDirectors', 'CP0000001', 'CP', {
+        'events': [event_row('OTCDR', 'CP0000001')],
+        'parties': party_rows(20, 'DIR'),
+    }, 4),
+    ('changeOfAddress', 'CP0000001', 'CP', {
+        'events': [event_row('OTADD', 'CP0000001')],
+        'offices': [(100, None, 11, 12, 'RG'), (100, None, 21, 22, 'RC')],
+    }, 3),
+    ('incorporationApplication', '0000001', 'BEN', {
+        'events': [event_row('BEINC', '0000001')],
+        'offices': [(100, None, 11, 12, 'RG'), (100, None, 21, 22, 'RC')],
+        'parties': party_rows(10, 'DIR') + party_rows(2, 'INC'),
+        'names': [(100, 'ACME LTD.', 'CO', '0000001', None), (100, 'ACME LTEE', 'TR', '0000001', None)],
+        **share_rows(classes=5, series=3),
+    }, 10),
+    ('alteration', '0000001', 'BC', {
+        'events': [event_row('NOALE', '0000001')],
+        'names': [(100, 'ACME LTD.', 'CO', '0000001', None), (100, 'ACME LTEE', 'TR', '0000001', None)],
+        'restrictions': [('0000001', 90, 100, 'Y')],
+        **share_rows(classes=5, series=3),
+    }, 6),
+])
+def test_filing_round_trips(app_request, filing_type, corp_num, corp_type, rows, budget):
+    """Assert that each filing type is loaded within its budget of queries, however big the corporation is."""
+    cursor = FakeCursor(**rows)
+    filing = Filing()
+    filing.business = Business()
+    filing.business.corp_num = corp_num
+    filing.business.corp_type = corp_type
+    filing.filing_type = filing_type
+    filing.event_id = 100
+
+    with app_request.app_context():
+        filing = Filing.get_filing(filing=filing, con=FakeConnection(cursor))
+
+    assert len(cursor.executed) <= budget
+    assert filing.header['colinIds'] == [100]
+    if 'shareStructure' in filing.body:
+        share_classes = filing.body['shareStructure']['shareClasses']
+        assert [len(share_class['series']) for share_class in share_classes] == [3] * 5
+        assert share_classes[4]['series'][2]['name'] == 'SERIES 4-2'
+    if 'nameTranslations' in filing.body:
+        assert filing.body['nameTranslations'] == [{'name': 'ACME LTEE', 'new': True}]
+
+
+@pytest.mark.parametrize('event_date, cached', [
+    (datetime.datetime(2018, 3, 1), True),
+    (EVENT_DATE, False),
+])
+def test_historic_filing_cached(app_request, event_date, cached):
+    """Assert that a filing from before the bob-date is read from the cache once assembled, and others are not."""
+    cursor = FakeCursor(events=[event_row('OTCDR', 'CP0000001', event_date)], parties=party_rows(3, 'DIR'))
+
+    def get_filing(corp_num):
+        filing = Filing()
+        filing.business = Business()
+        filing.business.corp_num = corp_num
+        filing.business.corp_type = 'CP'
+        filing.filing_type = 'changeOfDirectors'
+        filing.event_id = '100'
+        return Filing.get_filing(filing=filing, con=FakeConnection(cursor))
+
+    with app_request.app_context():
+        filing = get_filing('CP0000001')
+        queries = len(cursor.executed)
+        cached_filing = get_filing('CP0000001')
+        assert (len(cursor.executed) == queries) == cached
+        assert cached_filing.as_dict() == filing.as_dict()
+
+        # the event of another corp is not read from the cache
+        get_filing('CP0000002')
+        assert len(cursor.executed) > queries
+
+
+def test_historic_filing_from_current_data_not_cached(app_request):
+    """Assert that an AR from before the bob-date, made up from the current offices and directors, is not cached."""
+    cursor = FakeCursor(events=[event_row('OTANN', 'CP0000001', datetime.datetime(2018, 3, 1))],
+                        parties=party_rows(3, 'DIR'))
+
+    def get_filing():
+        filing = Filing()
+        filing.business = Business()
+        filing.business.corp_num = 'CP0000001'
+        filing.business.corp_type = 'CP'
+        filing.filing_type = 'annualReport'
+        filing.event_id = '100'
+        return Filing.get_filing(filing=filing, con=FakeConnection(cursor))
+
+    with app_request.app_context():
+        filing = get_filing()
+        assert filing.paper_only
+        queries = len(cursor.executed)
+        get_filing()
+        assert len(cursor.executed) == 2 * queries
+
+
+class FakeWriteCursor(FakeCursor):
+    """A cursor that answers the id and max queries of the filing writers, and counts the statements sent."""
+
+    def __init__(self):
+        """Initialize the cursor with the next id of each sequence."""
+        super().__init__()
+        self.next_id = 5000
+        self.rows_written = 0
+        self.rowcount = 1
+
+    def execute(self, query: str, **kwargs):
+        """Record the statement, and get the result of the id and max queries ready."""
+        self.executed.append(query)
+        self.rows_written += 1
+        if 'NEXTVAL' in query:
+            count = kwargs.get('count', 1)
+            self._set_result(['nextval'], [(self.next_id + i,) for i in range(count)])
+            self.next_id += count
+        elif 'FROM system_id' in query:
+            self._set_result(['id_num'], [(self.next_id,)])
+        elif 'UPDATE system_id' in query:
+            self.next_id = kwargs['new_num']
+        elif 'select max(' in query:
+            self._set_result(['max'], [(None,)])
+        else:
+            self._set_result([], [])
+
+    def executemany(self, query: str, rows: list):
+        """Record the statement, sent with all its rows at once."""
+        self.executed.append(query)
+        self.rows_written += len(rows)
+
+    def callfunc(self, name: str, return_type, args: list):
+        """Record the call, and return the search name."""
+        self.executed.append(name)
+        return args[0].upper()
+
+
+def incorporation_application(directors: int, classes: int, series: int):
+    """Return an incorporation application with the directors, and the classes, each with the series."""
+    address = {'streetAddress': '1 MAIN ST', 'addressCity': 'VICTORIA', 'addressRegion': 'BC',
+               'addressCountry': 'CA', 'postalCode': 'V8W 1A1'}
+    offices = {office_type: {'deliveryAddress': address, 'mailingAddress': address}
+               for office_type in ['registeredOffice', 'recordsOffice']}
+    parties = [{
+        'officer': {'firstName': f'FIRST{i}', 'lastName': f'LAST{i}', 'email': 'joe@example.com'},
+        'deliveryAddress': address,
+        'mailingAddress': address,
+        'roles': [{'roleType': 'Director', 'appointmentDate': '2021-03-01'}] + (
+            [{'roleType': 'Incorporator', 'appointmentDate': '2021-03-01'},
+             {'roleType': 'Completing Party', 'appointmentDate': '2021-03-01'}] if i == 0 else [])
+    } for i in range(directors)]
+    share_classes = [{
+        'name': f'CLASS {i}', 'currency': 'CAD', 'hasMaximumShares': True, 'maxNumberOfShares': 1000,
+        'hasRightsOrRestrictions': False, 'hasParValue': True, 'parValue': 1,
+        'series': [{'name': f'SERIES {i}-{j}', 'hasMaximumShares': False, 'maxNumberOfShares': None,
+                    'hasRightsOrRestrictions': False} for j in range(series)]
+    } for i in range(classes)]
+    return {
+        'offices': offices,
+        'parties': parties,
+        'shareStructure': {'shareClasses': share_classes},
+        'nameRequest': {'legalName': 'ACME LTD.', 'legalType': 'BEN'},
+        'nameTranslations': [{'name': 'ACME LTEE'}],
+    }
+
+
+@pytest.mark.parametrize('directors, classes, series', [
+    (1, 1, 0),
+    (200, 50, 10),
+])
+def test_add_filing_round_trips(app_request, directors, classes, series):
+    """Assert that an incorporation application is written in a fixed number of round trips, however big it is."""
+    cursor = FakeWriteCursor()
+    filing = Filing()
+    filing.business = Business()
+    filing.business.corp_num = '0000001'
+    filing.business.corp_type = 'BEN'
+    filing.filing_type = 'incorporationApplication'
+    filing.header = {'certifiedBy': 'JOE SMITH', 'email': 'joe@example.com'}
+    filing.effective_date = '2021-03-01T00:00:00.000000+00:00'
+    filing.body = incorporation_application(directors, classes, series)
+
+    with app_request.app_context():
+        event_id = Filing.add_filing(FakeConnection(cursor), filing)
+
+    assert event_id == 5000
+    assert len(cursor.executed) <= 30
+    # the directors, incorporator, addresses, offices, classes and series are all written
+    assert cursor.rows_written >= 3 * directors + classes * (series + 1)
+
+
+def test_add_filing_reappointed_director(app_request):
+    """Assert that a director ceased and appointed again in the same filing is added after the old one is ended."""
+    director = {
+        'officer': {'firstName': 'JOE', 'lastName': 'SMITH'},
+        'deliveryAddress': {'streetAddress': '1 MAIN ST', 'addressCity': 'VICTORIA', 'addressRegion': 'BC',
+                            'addressCountry': 'CA', 'postalCode': 'V8W 1A1'},
+        'appointmentDate': '2021-03-01'
+    }
+    cursor = FakeWriteCursor()
+    filing = Filing()
+    filing.business = Business()
+    filing.business.corp_num = 'CP0000001'
+    filing.business.corp_type = 'CP'
+    filing.filing_type = 'changeOfDirectors'
+    filing.header = {'certifiedBy': 'JOE SMITH', 'email': 'joe@example.com'}
+    filing.effective_date = '2021-03-01T00:00:00.000000+00:00'
+    filing.body = {'directors': [{**director, 'actions': ['appointed']},
+                                 {**director, 'actions': ['ceased'], 'cessationDate': '2021-03-01'}]}
+
+    with app_request.app_context():
+        Filing.add_filing(FakeConnection(cursor), filing)
+
+    ended = next(i for i, query in enumerate(cursor.executed) if 'update corp_party' in query)
+    added = next(i for i, query in enumerate(cursor.executed) if 'insert into corp_party' in query)
+    assert ended < added
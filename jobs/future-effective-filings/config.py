@@ -85,6 +85,9 @@ class _Config(object):  # pylint: disable=too-few-public-methods
     PASSWORD = os.getenv('AUTH_PASSWORD', '')
     SENTRY_DSN = os.getenv('SENTRY_DSN', '')
 
+    DUE_FILINGS_PAGE_SIZE = int(os.getenv('DUE_FILINGS_PAGE_SIZE', '100'))
+    SCHEDULER_REBUILD_INTERVAL = int(os.getenv('SCHEDULER_REBUILD_INTERVAL', '3600'))
+
     SECRET_KEY = 'a secret'
 
     TESTING = False
@@ -19,11 +19,9 @@ import asyncio
 import logging
 import os
 import random
-from datetime import datetime, timezone
 
 import requests
 import sentry_sdk  # noqa: I001; pylint: disable=ungrouped-imports; conflicts with Flake8
-from dateutil.parser import parse
 from dotenv import find_dotenv, load_dotenv
 from entity_queue_common.service import ServiceWorker
 from flask import Flask
@@ -74,14 +72,22 @@ def create_app(run_mode=os.getenv('FLASK_ENV', 'production')):
     return app
 
 
-def get_filings(app: Flask = None):
-    """Get a filing with filing_id."""
-    response = requests.get(f'{app.config["LEGAL_URL"]}/internal/filings/PAID')
-    if not response or response.status_code != 200:
-        app.logger.error(f'Failed to collect filings from legal-api. \
-            {response} {response.json()} {response.status_code}')
-        raise Exception
-    return response.json()
+def get_due_filing_ids(app: Flask = None):
+    """Yield the ids of the filings whose effective date has come, a page at a time."""
+    after_id = None
+    while True:
+        params = {'limit': app.config['DUE_FILINGS_PAGE_SIZE']}
+        if after_id:
+            params['afterId'] = after_id
+        response = requests.get(f'{app.config["LEGAL_URL"]}/internal/filings/due', params=params)
+        if not response or response.status_code != 200:
+            app.logger.error(f'Failed to collect due filings from legal-api. \
+                {response} {response.text} {response.status_code}')
+            raise Exception
+        page = response.json()
+        yield from page['filings']
+        if not (after_id := page['next']):
+            return
 
 
 async def run(loop, application: Flask = None):  # pylint: disable=redefined-outer-name
@@ -100,19 +106,15 @@ async def run(loop, application: Flask = None):  # pylint: disable=redefined-out
 
     with application.app_context():
         try:
-            filings = get_filings(app=application)
-            if not filings:
+            published = 0
+            # legal-api only returns the filings that are due, ie. effective as of now (UTC)
+            for filing_id in get_due_filing_ids(app=application):
+                msg = {'filing': {'id': filing_id}}
+                await queue_service.publish(subject, msg)
+                published += 1
+                application.logger.debug(f'Successfully put filing {filing_id} on the queue.')
+            if not published:
                 application.logger.debug('No PAID filings found to apply.')
-            for filing in filings:
-                filing_id = filing['filing']['header']['filingId']
-                effective_date = filing['filing']['header']['effectiveDate']
-                # NB: effective_date and now are both UTC
-                now = datetime.utcnow().replace(tzinfo=timezone.utc)
-                valid = effective_date and parse(effective_date) <= now
-                if valid:
-                    msg = {'filing': {'id': filing_id}}
-                    await queue_service.publish(subject, msg)
-                    application.logger.debug(f'Successfully put filing {filing_id} on the queue.')
         except Exception as err:  # pylint: disable=broad-except
             application.logger.error(err)
 
@@ -0,0 +1,100 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The Future Effective Date scheduler.
+
+This module runs the scheduler that puts filings with future effective dates on the entity filer queue
+when they become due, as a resident service instead of the polling job. Legal-api tells the scheduler of
+the future effective dates on NATS_SCHEDULER_SUBJECT.
+"""
+import asyncio
+import json
+import os
+
+import requests
+from dateutil.parser import parse
+from flask import Flask
+
+import config  # pylint: disable=import-error
+from file_future_effective import create_app, default_nats_options, default_stan_options, get_due_filing_ids, subject
+from scheduler import FilingScheduler
+from entity_queue_common.service import ServiceWorker  # noqa: I001
+
+
+scheduler_subject = os.getenv('NATS_SCHEDULER_SUBJECT', 'entity.filing.scheduler')  # pylint: disable=invalid-name
+
+
+def get_filing_schedule(app: Flask):
+    """Yield the (id, effective date) of the PAID filings, a page at a time."""
+    after_id = None
+    while True:
+        params = {'limit': app.config['DUE_FILINGS_PAGE_SIZE']}
+        if after_id:
+            params['afterId'] = after_id
+        response = requests.get(f'{app.config["LEGAL_URL"]}/internal/filings/scheduled', params=params)
+        if not response or response.status_code != 200:
+            app.logger.error(f'Failed to collect the filing schedule from legal-api. \
+                {response} {response.text} {response.status_code}')
+            raise Exception
+        page = response.json()
+        for filing in page['filings']:
+            yield filing['id'], parse(filing['effectiveDate'])
+        if not (after_id := page['next']):
+            return
+
+
+async def run(loop, application: Flask):  # pylint: disable=redefined-outer-name
+    """Run the scheduler, until the process is stopped."""
+    queue_service = ServiceWorker(
+        loop=loop,
+        nats_connection_options=default_nats_options,
+        stan_connection_options=default_stan_options,
+        config=config.get_named_config('production')
+    )
+    await queue_service.connect()
+
+    async def publish(filing_id: int):
+        await queue_service.publish(subject, {'filing': {'id': filing_id}})
+        application.logger.debug(f'Successfully put filing {filing_id} on the queue.')
+
+    def fetch_due():
+        with application.app_context():
+            return list(get_due_filing_ids(app=application))
+
+    def fetch_schedule():
+        with application.app_context():
+            return list(get_filing_schedule(application))
+
+    scheduler = FilingScheduler(publish=publish,
+                                fetch_due=fetch_due,
+                                fetch_schedule=fetch_schedule,
+                                rebuild_interval=application.config['SCHEDULER_REBUILD_INTERVAL'])
+
+    async def cb_schedule(msg):
+        try:
+            filing = json.loads(msg.data.decode('utf-8'))['filing']
+            scheduler.schedule(filing['id'], parse(filing['effectiveDate']))
+        except (KeyError, TypeError, ValueError) as err:
+            application.logger.error(f'Unable to schedule msg seq:{msg.sequence}, error:{err}')
+
+    await queue_service.sc.subscribe(subject=scheduler_subject,
+                                     queue='future-effective-scheduler',
+                                     durable_name='future-effective-scheduler_durable',
+                                     cb=cb_schedule)
+    await scheduler.run()
+
+
+if __name__ == '__main__':
+    application = create_app()  # pylint: disable=invalid-name
+    event_loop = asyncio.get_event_loop()
+    event_loop.run_until_complete(run(event_loop, application))
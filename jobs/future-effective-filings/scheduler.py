@@ -0,0 +1,135 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The schedule of the future effective filings.
+
+The scheduler keeps a min-heap of the effective dates of the PAID filings, and wakes up when the
+earliest one comes, instead of polling. The filings are then put on the filer queue once legal-api
+confirms they are due, ie. still PAID, so a filing that was paid late, or was not published, is
+picked up on the next wake up or rebuild of the schedule.
+"""
+import asyncio
+import heapq
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+def utcnow() -> datetime:
+    """Return the current UTC datetime."""
+    return datetime.utcnow().replace(tzinfo=timezone.utc)
+
+
+class FilingScheduler:  # pylint: disable=too-many-instance-attributes
+    """Publishes the future effective filings when they become due."""
+
+    def __init__(self, *,
+                 publish: Callable[[int], Awaitable],
+                 fetch_due: Callable[[], Iterable[int]],
+                 fetch_schedule: Callable[[], Iterable[Tuple[int, datetime]]],
+                 clock: Callable[[], datetime] = utcnow,
+                 rebuild_interval: float = 3600,
+                 max_sleep: float = 300):
+        """Initialize the scheduler.
+
+        :param publish: puts the filing id on the filer queue
+        :param fetch_due: returns the ids of the PAID filings that are due
+        :param fetch_schedule: returns the (id, effective date) of the PAID filings
+        :param clock: returns the current, timezone aware, datetime
+        :param rebuild_interval: the seconds between rebuilds of the schedule from legal-api
+        :param max_sleep: the most seconds the scheduler sleeps for, in case the clock jumps
+        """
+        self._publish = publish
+        self._fetch_due = fetch_due
+        self._fetch_schedule = fetch_schedule
+        self.clock = clock
+        self.rebuild_interval = rebuild_interval
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}
+        self._published: Set[int] = set()
+        self._changed: Optional[asyncio.Event] = None
+
+    def schedule(self, filing_id: int, effective_date: datetime):
+        """Add, or move, the filing on the schedule."""
+        self._scheduled[filing_id] = effective_date
+        heapq.heappush(self._heap, (effective_date, filing_id))
+        self._published.discard(filing_id)
+        if self._changed and self._heap[0] == (effective_date, filing_id):
+            self._changed.set()
+
+    def next_due(self) -> Optional[datetime]:
+        """Return the earliest effective date on the schedule."""
+        while self._heap and self._scheduled.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)  # moved or already published
+        return self._heap[0][0] if self._heap else None
+
+    async def rebuild(self) -> List[int]:
+        """Rebuild the schedule from the PAID filings, and publish the ones that are due."""
+        schedule = await asyncio.get_event_loop().run_in_executor(None, lambda: list(self._fetch_schedule()))
+        self._scheduled = dict(schedule)
+        self._heap = [(effective_date, filing_id) for filing_id, effective_date in schedule]
+        heapq.heapify(self._heap)
+        self._published.clear()
+        return await self.publish_due(force=True)
+
+    async def publish_due(self, force: bool = False) -> List[int]:
+        """Publish the filings that have become due, and return their ids.
+
+        Legal-api is only asked for the due filings when one on the schedule has come due, or when forced.
+        """
+        now = self.clock()
+        came_due = False
+        while (next_due := self.next_due()) and next_due <= now:
+            _, filing_id = heapq.heappop(self._heap)
+            del self._scheduled[filing_id]
+            came_due = True
+        if not (came_due or force):
+            return []
+
+        due = await asyncio.get_event_loop().run_in_executor(None, lambda: list(self._fetch_due()))
+        published = []
+        for filing_id in due:
+            if filing_id not in self._published:
+                await self._publish(filing_id)
+                self._published.add(filing_id)
+                published.append(filing_id)
+        return published
+
+    def seconds_to_sleep(self, next_rebuild: datetime) -> float:
+        """Return the seconds until the next filing comes due or the next rebuild, whichever is first."""
+        wake_up = min(filter(None, [self.next_due(), next_rebuild]))
+        return max(0, min((wake_up - self.clock()).total_seconds(), self.max_sleep))
+
+    async def run(self):
+        """Publish the filings as they become due, rebuilding the schedule every rebuild_interval."""
+        self._changed = asyncio.Event()
+        next_rebuild = self.clock()
+        while True:
+            try:
+                if self.clock() >= next_rebuild:
+                    next_rebuild = self.clock() + timedelta(seconds=self.rebuild_interval)
+                    await self.rebuild()
+                else:
+                    await self.publish_due()
+            except Exception as err:  # pylint: disable=broad-except; the scheduler must keep on running
+                logger.error('Failed to publish the due filings: %s', err, exc_info=True)
+                # try again soon, the filings are picked up by the rebuild
+                next_rebuild = min(next_rebuild, self.clock() + timedelta(seconds=self.max_sleep))
+            self._changed.clear()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._changed.wait(), self.seconds_to_sleep(next_rebuild))
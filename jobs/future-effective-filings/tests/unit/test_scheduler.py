@@ -0,0 +1,150 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests to assure the scheduler publishes the future effective filings when they become due.
+
+The scheduler is driven by a fake clock, and legal-api and the queue are replaced by stubs.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from scheduler import FilingScheduler
+
+
+NOW = datetime(2021, 3, 1, 12, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, now: datetime = NOW):
+        """Initialize the clock at the time."""
+        self.now = now
+
+    def __call__(self) -> datetime:
+        """Return the current time."""
+        return self.now
+
+    def advance(self, **kwargs):
+        """Move the clock forward by the timedelta."""
+        self.now += timedelta(**kwargs)
+
+
+class FakeLegal:
+    """Stands in for legal-api and the queue: the PAID filings, by effective date, and the published ids."""
+
+    def __init__(self, clock: FakeClock, filings: dict = None):
+        """Initialize with the effective date of each PAID filing."""
+        self.clock = clock
+        self.filings = filings or {}
+        self.published = []
+        self.fetch_due_calls = 0
+
+    def fetch_due(self):
+        """Return the ids of the PAID filings that are due."""
+        self.fetch_due_calls += 1
+        return [filing_id for filing_id, effective_date in self.filings.items() if effective_date <= self.clock()]
+
+    def fetch_schedule(self):
+        """Return the (id, effective date) of the PAID filings."""
+        return list(self.filings.items())
+
+    async def publish(self, filing_id: int):
+        """Put the filing id on the queue."""
+        self.published.append(filing_id)
+
+
+def create_scheduler(filings: dict = None):
+    """Return the scheduler, the fake clock and the fake legal-api."""
+    clock = FakeClock()
+    legal = FakeLegal(clock, filings)
+    scheduler = FilingScheduler(publish=legal.publish, fetch_due=legal.fetch_due,
+                                fetch_schedule=legal.fetch_schedule, clock=clock, max_sleep=300)
+    return scheduler, clock, legal
+
+
+def run(coroutine):
+    """Run the coroutine to completion."""
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_publish_when_due():
+    """Assert that a filing is published exactly when it becomes due, and legal-api is not asked before."""
+    scheduler, clock, legal = create_scheduler({1: NOW + timedelta(seconds=10)})
+    scheduler.schedule(1, NOW + timedelta(seconds=10))
+
+    assert scheduler.seconds_to_sleep(NOW + timedelta(hours=1)) == 10
+    clock.advance(seconds=9)
+    assert run(scheduler.publish_due()) == []
+    assert legal.fetch_due_calls == 0
+
+    clock.advance(seconds=1)
+    assert run(scheduler.publish_due()) == [1]
+    assert legal.published == [1]
+    assert scheduler.next_due() is None
+
+
+def test_rescheduled_filing():
+    """Assert that a rescheduled filing is only published at its new effective date."""
+    scheduler, clock, legal = create_scheduler({1: NOW + timedelta(seconds=20)})
+    scheduler.schedule(1, NOW + timedelta(seconds=10))
+    scheduler.schedule(1, NOW + timedelta(seconds=20))
+
+    assert scheduler.next_due() == NOW + timedelta(seconds=20)
+    clock.advance(seconds=10)
+    assert run(scheduler.publish_due()) == []
+    assert legal.published == []
+
+    clock.advance(seconds=10)
+    assert run(scheduler.publish_due()) == [1]
+    assert legal.published == [1]
+
+
+def test_rebuild_restores_schedule():
+    """Assert that a rebuild publishes the filings that are due, and schedules the others."""
+    scheduler, clock, legal = create_scheduler({1: NOW + timedelta(seconds=30), 2: NOW - timedelta(seconds=5)})
+    # a stale entry, which the rebuild drops
+    scheduler.schedule(3, NOW + timedelta(seconds=5))
+
+    assert run(scheduler.rebuild()) == [2]
+    assert scheduler.next_due() == NOW + timedelta(seconds=30)
+    assert scheduler.seconds_to_sleep(NOW + timedelta(hours=1)) == 30
+
+    clock.advance(seconds=30)
+    assert run(scheduler.publish_due()) == [1]
+    assert legal.published == [2, 1]
+
+
+def test_no_republishing():
+    """Assert that a filing legal-api still has as due is not published again, until the next rebuild."""
+    scheduler, clock, legal = create_scheduler({1: NOW})
+    scheduler.schedule(1, NOW)
+
+    assert run(scheduler.publish_due()) == [1]
+    assert run(scheduler.publish_due(force=True)) == []
+    clock.advance(seconds=60)
+    assert run(scheduler.publish_due(force=True)) == []
+    # the rebuild publishes it once more, in case the message was lost
+    assert run(scheduler.rebuild()) == [1]
+    assert run(scheduler.publish_due(force=True)) == []
+    assert legal.published == [1, 1]
+
+
+def test_seconds_to_sleep_capped():
+    """Assert that the scheduler wakes up by the next rebuild, and at least every max_sleep seconds."""
+    scheduler, _, _ = create_scheduler()
+    assert scheduler.seconds_to_sleep(NOW + timedelta(seconds=60)) == 60
+    assert scheduler.seconds_to_sleep(NOW + timedelta(hours=1)) == 300
+
+    scheduler.schedule(1, NOW - timedelta(seconds=5))
+    assert scheduler.seconds_to_sleep(NOW + timedelta(hours=1)) == 0
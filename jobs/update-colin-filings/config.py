@@ -49,6 +49,10 @@ class _Config(object):  # pylint: disable=too-few-public-methods
     COLIN_URL = os.getenv('COLIN_URL', '')
     LEGAL_URL = os.getenv('LEGAL_URL', '')
     SENTRY_DSN = os.getenv('SENTRY_DSN', '')
+    FILINGS_PAGE_SIZE = int(os.getenv('FILINGS_PAGE_SIZE', '500'))
+    COLIN_CONCURRENCY = int(os.getenv('COLIN_CONCURRENCY', '8'))
+    COLIN_BULK_SIZE = int(os.getenv('COLIN_BULK_SIZE', '50'))
+    COLIN_IDS_BATCH_SIZE = int(os.getenv('COLIN_IDS_BATCH_SIZE', '50'))
 
     ACCOUNT_SVC_AUTH_URL = os.getenv('ACCOUNT_SVC_AUTH_URL', None)
     ACCOUNT_SVC_CLIENT_ID = os.getenv('ACCOUNT_SVC_CLIENT_ID', None)
@@ -17,6 +17,11 @@ This module is the API for the Legal Entity system.
 """
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set
 
 import requests
 import sentry_sdk  # noqa: I001; pylint: disable=ungrouped-imports; conflicts with Flake8
@@ -62,35 +67,42 @@ def register_shellcontext(app):
 
 
 def get_filings(app: Flask = None):
-    """Get a filing with filing_id."""
-    req = requests.get(f'{app.config["LEGAL_URL"]}/internal/filings')
-    if not req or req.status_code != 200:
-        app.logger.error(f'Failed to collect filings from legal-api. {req} {req.json()} {req.status_code}')
-        raise Exception
-    return req.json()
+    """Yield the completed filings that have not been sent to colin, a page at a time."""
+    after_id = None
+    while True:
+        params = {'limit': app.config['FILINGS_PAGE_SIZE']}
+        if after_id:
+            params['afterId'] = after_id
+        req = requests.get(f'{app.config["LEGAL_URL"]}/internal/filings', params=params)
+        if not req or req.status_code != 200:
+            app.logger.error(f'Failed to collect filings from legal-api. {req} {req.json()} {req.status_code}')
+            raise Exception
+        page = req.json()
+        yield from page['filings']
+        if not (after_id := page['next']):
+            return
 
 
-def send_filing(app: Flask = None, filing: dict = None, filing_id: str = None):
-    """Post to colin-api with filing."""
-    clean_none(filing)
-
-    filing_type = filing['filing']['header'].get('name', None)
+def get_legal_type(filing: dict) -> str:
+    """Return the legal type of the business of the filing, as colin-api expects it."""
     identifier = filing['filing']['business'].get('identifier', None)
     if identifier[:2] == Business.LegalTypes.COOP.value:
-        legal_type = Business.LegalTypes.COOP.value
-    else:
-        legal_type = filing['filing']['business'].get('legalType', Business.LegalTypes.BCOMP.value)
+        return Business.LegalTypes.COOP.value
+    return filing['filing']['business'].get('legalType', Business.LegalTypes.BCOMP.value)
+
 
-    req = None
-    if legal_type and identifier and filing_type:
-        req = requests.post(f'{app.config["COLIN_URL"]}/{legal_type}/{identifier}/filings/{filing_type}', json=filing)
+def send_filings(app: Flask = None, legal_type: str = None, filings: List[dict] = None) -> List[dict]:
+    """Post a batch of filings to colin-api, and return its result for each of them, or None if the batch failed."""
+    for filing in filings:
+        clean_none(filing)
 
-    if not req or req.status_code != 201:
-        app.logger.error(f'Filing {filing_id} not created in colin {identifier}.')
-        # raise Exception
+    req = requests.post(f'{app.config["COLIN_URL"]}/{legal_type}/filings', params={'fetch': 'false'},
+                        json={'filings': filings})
+    if req.status_code not in (201, 207):
+        app.logger.error(f'Filings {[filing["filingId"] for filing in filings]} not created in colin. '
+                         f'{req.status_code}')
         return None
-    # if it's an AR containing multiple filings it will have multiple colinIds
-    return req.json()['filing']['header']['colinIds']
+    return req.json()['filings']
 
 
 def update_colin_id(app: Flask = None, filing_id: str = None, colin_ids: list = None, token: dict = None):
@@ -106,6 +118,119 @@ def update_colin_id(app: Flask = None, filing_id: str = None, colin_ids: list =
     return True
 
 
+def update_colin_ids(app: Flask = None, colin_ids: Dict[int, list] = None, token: dict = None) -> List[int]:
+    """Update the colin_ids of a batch of filings in the filings table, and return the ids of the updated filings.
+
+    The filings are updated one at a time if the batch fails.
+    """
+    req = requests.patch(
+        f'{app.config["LEGAL_URL"]}/internal/filings',
+        json={'filings': [{'filingId': filing_id, 'colinIds': ids} for filing_id, ids in colin_ids.items()]},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    if req and req.status_code == 202:
+        return list(colin_ids)
+    app.logger.error(f'Failed to update colin ids in legal db for filings {list(colin_ids)} {req.status_code}, '
+                     'retrying them one at a time')
+    return [filing_id for filing_id, ids in colin_ids.items()
+            if update_colin_id(app=app, filing_id=filing_id, colin_ids=ids, token=token)]
+
+
+class Stats:
+    """The timings of the stages of a run, which are shared by the corporation pipelines."""
+
+    def __init__(self):
+        """Initialize the stats."""
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, stage: str, seconds: float, count: int = 1):
+        """Add the time taken, and the number of filings, of a stage."""
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.counts[stage] += count
+
+    def report(self) -> str:
+        """Return the timings and throughput of the stages, and of the run."""
+        elapsed = time.perf_counter() - self.started
+        stages = [f'{stage}: {self.counts[stage]} in {seconds:.2f}s' for stage, seconds in self.seconds.items()]
+        return f'{", ".join(stages)}; ' \
+            f'{self.counts["patch"]} filings updated in {elapsed:.2f}s ({self.counts["patch"] / elapsed:.2f} filings/s)'
+
+
+class ColinIdBatcher:
+    """Collects the colin ids of the filings sent to colin, and updates them in legal-api in batches.
+
+    A corporation with a filing that failed to be updated is failed, so none of its later filings are sent to colin
+    ahead of the one that will be sent again on the next run.
+    """
+
+    def __init__(self, app: Flask, token: dict, stats: Stats, batch_size: int):
+        """Initialize the batcher."""
+        self._app = app
+        self._token = token
+        self._stats = stats
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._pending: Dict[int, list] = {}
+        self._corps: Dict[int, str] = {}
+        self._unsettled: Dict[str, int] = defaultdict(int)
+        self.failed: List[int] = []
+        self.failed_corps: Set[str] = set()
+
+    def add(self, identifier: str, filing_id: int, colin_ids: list):
+        """Add the colin ids of the filing of the corporation, and update the batch once it is full."""
+        with self._lock:
+            self._pending[filing_id] = colin_ids
+            self._corps[filing_id] = identifier
+            self._unsettled[identifier] += 1
+            batch = self._take() if len(self._pending) >= self._batch_size else None
+        if batch:
+            self._update(batch)
+
+    def flush(self):
+        """Update the colin ids that are left."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._update(batch)
+
+    def settle(self, identifier: str) -> bool:
+        """Wait for the colin ids of the corporation to be updated, and return whether they all were."""
+        self.flush()
+        with self._settled:
+            self._settled.wait_for(lambda: not self._unsettled[identifier])
+            return identifier not in self.failed_corps
+
+    def _take(self) -> Dict[int, list]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _update(self, batch: Dict[int, list]):
+        start = time.perf_counter()
+        try:
+            updated = update_colin_ids(app=self._app, colin_ids=batch, token=self._token)
+        except Exception as err:  # pylint: disable=broad-except; the filings are failed instead
+            # pylint: disable=no-member; false positive
+            self._app.logger.error(f'Failed to update colin ids in legal db for filings {list(batch)}. {err}')
+            updated = []
+        self._stats.add('patch', time.perf_counter() - start, len(updated))
+        if failed := [filing_id for filing_id in batch if filing_id not in updated]:
+            # pylint: disable=no-member; false positive
+            self._app.logger.error(f'Failed to update filings {failed} with colin event ids.')
+        with self._settled:
+            self.failed.extend(failed)
+            for filing_id in batch:
+                identifier = self._corps.pop(filing_id)
+                self._unsettled[identifier] -= 1
+                if filing_id in failed:
+                    self.failed_corps.add(identifier)
+            self._settled.notify_all()
+
+
 def clean_none(dictionary: dict = None):
     """Replace all none values with empty string."""
     for key in dictionary.keys():
@@ -121,42 +246,82 @@ def is_test_coop(identifier: str):
     return 'CP1' in identifier
 
 
+def group_by_corp(filings: List[dict]) -> Dict[str, List[dict]]:
+    """Group the filings by corporation, keeping the order of the filings of each corporation."""
+    corps = OrderedDict()
+    for filing in filings:
+        corps.setdefault(filing['filing']['business']['identifier'], []).append(filing)
+    return corps
+
+
+def send_corp_filings(app: Flask, identifier: str, filings: List[dict], batcher: ColinIdBatcher, stats: Stats):
+    """Send the filings of a corporation to colin in order, in batches, stopping at the first that fails.
+
+    The colin ids of a batch have to be updated in legal-api before the next batch is sent, as a filing that fails to
+    be updated is sent to colin again on the next run.
+    """
+    legal_type = get_legal_type(filings[0])
+    batch_size = app.config['COLIN_BULK_SIZE']
+    for i in range(0, len(filings), batch_size):
+        if i and not batcher.settle(identifier):
+            # pylint: disable=no-member; false positive
+            app.logger.error(f'Failed to update the colin ids of {identifier}, skipping the rest of its filings.')
+            return
+        batch = filings[i:i + batch_size]
+        start = time.perf_counter()
+        results = send_filings(app=app, legal_type=legal_type, filings=batch)
+        stats.add('send', time.perf_counter() - start, len(batch))
+        for filing, result in zip(batch, results or [{}]):
+            if not result.get('colinIds'):
+                # pylint: disable=no-member; false positive
+                app.logger.error(f'Failed to send filing {filing["filingId"]} to colin, skipping the rest of '
+                                 f'{identifier}. {result.get("errors")}')
+                return
+            batcher.add(identifier, filing['filingId'], result['colinIds'])
+
+
 def run():
-    """Get filings that haven't been synced with colin and send them to the colin-api."""
+    """Get filings that haven't been synced with colin and send them to the colin-api.
+
+    The filings of a corporation are sent in order, and up to COLIN_CONCURRENCY corporations at a time.
+    """
     application = create_app()
-    corps_with_failed_filing = []
+    stats = Stats()
     with application.app_context():
         try:
             # get updater-job token
             token = AccountService.get_bearer_token()
 
-            filings = get_filings(app=application)
+            start = time.perf_counter()
+            filings = list(get_filings(app=application))
+            stats.add('fetch', time.perf_counter() - start, len(filings))
             if not filings:
                 # pylint: disable=no-member; false positive
                 application.logger.debug('No completed filings to send to colin.')
-            for filing in filings:
-                filing_id = filing['filingId']
-                identifier = filing['filing']['business']['identifier']
-                if identifier in corps_with_failed_filing or is_test_coop(identifier):
-                    # pylint: disable=no-member; false positive
-                    application.logger.debug(f'Skipping filing {filing_id} for'
-                                             f' {filing["filing"]["business"]["identifier"]}.')
-                else:
-                    colin_ids = send_filing(app=application, filing=filing, filing_id=filing_id)
-                    update = None
-                    if colin_ids:
-                        update = update_colin_id(app=application, filing_id=filing_id, colin_ids=colin_ids, token=token)
-                    if update:
-                        # pylint: disable=no-member; false positive
-                        application.logger.debug(f'Successfully updated filing {filing_id}')
-                    else:
-                        corps_with_failed_filing.append(filing['filing']['business']['identifier'])
-                        # pylint: disable=no-member; false positive
-                        application.logger.error(f'Failed to update filing {filing_id} with colin event id.')
+                return
+
+            corps = group_by_corp(filings)
+            for identifier in [identifier for identifier in corps if is_test_coop(identifier)]:
+                # pylint: disable=no-member; false positive
+                application.logger.debug(f'Skipping filings {[f["filingId"] for f in corps.pop(identifier)]}'
+                                         f' for {identifier}.')
+
+            batcher = ColinIdBatcher(application, token, stats, application.config['COLIN_IDS_BATCH_SIZE'])
+            try:
+                with ThreadPoolExecutor(max_workers=application.config['COLIN_CONCURRENCY']) as executor:
+                    for future in [executor.submit(send_corp_filings, application, identifier, corp_filings,
+                                                   batcher, stats)
+                                   for identifier, corp_filings in corps.items()]:
+                        future.result()
+            finally:
+                batcher.flush()
 
         except Exception as err:
             # pylint: disable=no-member; false positive
             application.logger.error(err)
+        finally:
+            # pylint: disable=no-member; false positive
+            application.logger.info(f'update-colin-filings: {stats.report()}')
 
 
 if __name__ == '__main__':
@@ -49,6 +49,9 @@ class _Config(object):  # pylint: disable=too-few-public-methods
     COLIN_URL = os.getenv('COLIN_URL', '')
     LEGAL_URL = os.getenv('LEGAL_URL', '')
     SENTRY_DSN = os.getenv('SENTRY_DSN', '')
+    COLIN_IDS_BATCH_SIZE = int(os.getenv('COLIN_IDS_BATCH_SIZE', '1000'))
+    COLIN_FILINGS_BATCH_SIZE = int(os.getenv('COLIN_FILINGS_BATCH_SIZE', '100'))
+    COLIN_EVENTS_PAGE_SIZE = int(os.getenv('COLIN_EVENTS_PAGE_SIZE', '1000'))
 
     ACCOUNT_SVC_AUTH_URL = os.getenv('ACCOUNT_SVC_AUTH_URL', None)
     ACCOUNT_SVC_CLIENT_ID = os.getenv('ACCOUNT_SVC_CLIENT_ID', None)
@@ -18,10 +18,10 @@ This module is the API for the Legal Entity system.
 import asyncio
 import logging
 import os
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import requests
 import sentry_sdk  # noqa: I001, E501; pylint: disable=ungrouped-imports; conflicts with Flake8
-from colin_api.models.filing import Filing
 from flask import Flask
 from legal_api.services.bootstrap import AccountService
 from legal_api.services.queue import QueueService
@@ -67,83 +67,139 @@ def register_shellcontext(app):
     app.shell_context_processor(shell_context)
 
 
-def check_for_manual_filings(application: Flask = None, token: dict = None):  # pylint: disable=redefined-outer-name
-    """Check for colin filings in oracle."""
-    id_list = []
-    legal_url = application.config['LEGAL_URL']
-    colin_url = application.config['COLIN_URL']
-
-    # get max colin event_id from legal
-    response = requests.get(f'{legal_url}/internal/filings/colin_id')
+def get_last_event_id(application: Flask) -> Optional[str]:
+    """Return the watermark, ie. the last colin event id brought into legal, or 'earliest' if there is none yet."""
+    response = requests.get(f'{application.config["LEGAL_URL"]}/internal/filings/colin_id')
     if response.status_code not in [200, 404]:
         application.logger.error(f'Error getting last updated colin id from \
             legal: {response.status_code} {response.json()}')
-    else:
-        if response.status_code == 404:
-            last_event_id = 'earliest'
-        else:
-            last_event_id = dict(response.json())['maxId']
-        if last_event_id:
-            last_event_id = str(last_event_id)
-            # get all cp event_ids greater than above
-            try:
-                # call colin api for ids + filing types list
-                response = requests.get(f'{colin_url}/event/CP/{last_event_id}')
-                colin_events = dict(response.json())
-
-                # for bringing in a specific filing
-                # global SET_EVENTS_MANUALLY
-                # SET_EVENTS_MANUALLY = True
-                # colin_events = {
-                #     'events': [{'corp_num': 'CP0001489', 'event_id': 102127109, 'filing_typ_cd': 'OTCGM'}]
-                # }
-
-            except Exception as err:
-                application.logger.error('Error getting event_ids from colin')
-                raise err
-
-            # for each event_id: if not in legal db table then add event_id to list
-            for info in colin_events['events']:
-                # check that event is associated with one of the coops loaded into legal db
-                response = requests.get(
-                    f'{legal_url}/{info["corp_num"]}',
-                    headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
-                )
-                if response.status_code == 200:
-                    # check legal table
-
-                    response = requests.get(f'{legal_url}/internal/filings/colin_id/{info["event_id"]}')
-                    if response.status_code == 404:
-                        id_list.append(info)
-                    elif response.status_code != 200:
-                        application.logger.error(f'Error checking for colin id {info["event_id"]} in legal')
+        return None
+    if response.status_code == 404:
+        return 'earliest'
+    if last_event_id := dict(response.json())['maxId']:
+        return str(last_event_id)
+    application.logger.error('No ids returned from colin_last_update table in legal db.')
+    return None
+
+
+def get_colin_events(application: Flask, last_event_id: str) -> Iterator[List]:
+    """Yield the pages of cp events in colin after the watermark, so a page at a time is held in memory."""
+    page_size = application.config['COLIN_EVENTS_PAGE_SIZE']
+    while last_event_id:
+        try:
+            # call colin api for ids + filing types list
+            response = requests.get(f'{application.config["COLIN_URL"]}/event/CP/{last_event_id}',
+                                    params={'limit': page_size})
+            colin_events = dict(response.json())
+
+            # for bringing in a specific filing
+            # global SET_EVENTS_MANUALLY
+            # SET_EVENTS_MANUALLY = True
+            # colin_events = {
+            #     'events': [{'corp_num': 'CP0001489', 'event_id': 102127109, 'filing_typ_cd': 'OTCGM'}]
+            # }
+
+        except Exception as err:
+            application.logger.error('Error getting event_ids from colin')
+            raise err
+
+        yield colin_events['events']
+        last_event_id = colin_events.get('next')
+
+
+def check_for_manual_filings(application: Flask,  # pylint: disable=redefined-outer-name
+                             token: dict,
+                             events: List,
+                             corps_in_legal: Dict[str, bool]) -> Tuple[List, List]:
+    """Return the colin events, of the coops loaded into legal, that are not in legal yet, and the unchecked events.
+
+    Whether each coop is loaded into legal is checked once, and kept in corps_in_legal for the next pages. The
+    events that could not be checked, because legal failed to answer, are returned so they are treated as failed.
+    """
+    id_list = []
+    unchecked = []
+    legal_url = application.config['LEGAL_URL']
 
+    # check which events are associated with one of the coops loaded into legal, once per coop
+    for corp_num in {info['corp_num'] for info in events} - corps_in_legal.keys():
+        response = requests.get(
+            f'{legal_url}/{corp_num}',
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+        )
+        if response.status_code in [200, 404]:
+            corps_in_legal[corp_num] = response.status_code == 200
         else:
-            application.logger.error('No ids returned from colin_last_update table in legal db.')
-
-    return id_list
-
-
-def get_filing(event_info: dict = None, application: Flask = None):  # pylint: disable=redefined-outer-name
-    """Get filing created by previous event."""
-    # call the colin api for the filing
-    legal_type = event_info['corp_num'][:2]
-    if event_info['filing_typ_cd'] not in Filing.FILING_TYPES[legal_type].keys():
-        application.logger.error('Error unknown filing type: {} for event id: {}'.format(
-            event_info['filing_type'], event_info['event_id']))
-
-    filing_type = Filing.FILING_TYPES[legal_type][event_info['filing_typ_cd']]
-    identifier = event_info['corp_num']
-    event_id = event_info['event_id']
-    response = requests.get(
-        f'{application.config["COLIN_URL"]}/{legal_type}/{identifier}/filings/{filing_type}?eventId={event_id}'
+            # not kept, so it is checked again on the next page or run
+            application.logger.error(f'Error checking for {corp_num} in legal {response.status_code}')
+    unchecked.extend(info for info in events if info['corp_num'] not in corps_in_legal)
+    events = [info for info in events if corps_in_legal.get(info['corp_num'])]
+
+    # for each event_id: if not in legal db table then add event_id to list
+    batch_size = application.config['COLIN_IDS_BATCH_SIZE']
+    for i in range(0, len(events), batch_size):
+        batch = events[i:i + batch_size]
+        response = requests.post(f'{legal_url}/internal/filings/colin_ids',
+                                 json={'colinIds': [info['event_id'] for info in batch]})
+        if response.status_code != 200:
+            application.logger.error(f'Error checking for colin ids {[info["event_id"] for info in batch]} '
+                                     f'in legal {response.status_code}')
+            unchecked.extend(batch)
+            continue
+        known_ids = set(response.json()['colinIds'])
+        id_list.extend(info for info in batch if info['event_id'] not in known_ids)
+
+    return id_list, unchecked
+
+
+def update_last_event_id(application: Flask, token: dict, max_event_id: int):
+    """Save the watermark in legal, so the next run starts from the event after it."""
+    application.logger.debug('setting last_event_id in legal_db to {}'.format(max_event_id))
+    response = requests.post(
+        f'{application.config["LEGAL_URL"]}/internal/filings/colin_id/{max_event_id}',
+        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
     )
-    filing = dict(response.json())
-    return filing
+    if response.status_code != 201:
+        application.logger.error(
+            f'Error adding {max_event_id} colin_last_update table in legal db {response.status_code}'
+        )
+    else:
+        if dict(response.json())['maxId'] != max_event_id:
+            application.logger.error('Updated colin id is not max colin id in legal db.')
+        else:
+            application.logger.debug('Successfully updated colin id in legal db.')
+
+
+def get_filings(event_infos: list = None, application: Flask = None) -> dict:  # pylint: disable=redefined-outer-name
+    """Get the filings created by the previous events from colin, in batches, and return them by event id."""
+    filings = {}
+    batch_size = application.config['COLIN_FILINGS_BATCH_SIZE']
+    by_legal_type = {}
+    for event_info in event_infos:
+        by_legal_type.setdefault(event_info['corp_num'][:2], []).append(event_info['event_id'])
+    for legal_type, event_ids in by_legal_type.items():
+        for i in range(0, len(event_ids), batch_size):
+            response = requests.get(f'{application.config["COLIN_URL"]}/{legal_type}/filings',
+                                    params={'eventId': event_ids[i:i + batch_size]})
+            if response.status_code != 200:
+                application.logger.error(f'Error getting filings for event ids {event_ids[i:i + batch_size]} '
+                                         f'from colin {response.status_code}')
+                continue
+            for result in response.json()['filings']:
+                if result.get('errors'):
+                    application.logger.error(f'Error getting filing for event id {result["eventId"]} '
+                                             f'from colin {result["errors"]}')
+                else:
+                    filings[result['eventId']] = {'filing': result['filing']}
+    return filings
+
 
+def update_filings(application):  # pylint: disable=redefined-outer-name, too-many-branches, too-many-locals
+    """Get filings in colin that are not in lear and send them to lear.
 
-def update_filings(application):  # pylint: disable=redefined-outer-name, too-many-branches
-    """Get filings in colin that are not in lear and send them to lear."""
+    The colin events are read a page at a time after the watermark, and the watermark is saved after each page
+    until a filing fails, or an event can't be checked, so the next run only reads the events that are new, or
+    that failed.
+    """
     successful_filings = 0
     failed_filing_events = []
     corps_with_failed_filing = []
@@ -153,38 +209,62 @@ def update_filings(application):  # pylint: disable=redefined-outer-name, too-ma
         # get updater-job token
         token = AccountService.get_bearer_token()
 
-        # check if there are filings to send to legal
-        manual_filings_info = check_for_manual_filings(application, token)
+        last_event_id = get_last_event_id(application)
+        saved_event_id = int(last_event_id) if last_event_id and last_event_id != 'earliest' else 0
         max_event_id = 0
-
-        if len(manual_filings_info) > 0:
-            for event_info in manual_filings_info:
-                # Make sure this coop has no outstanding filings that failed to be applied.
-                # This ensures we don't apply filings out of order when one fails.
-                if event_info['corp_num'] not in corps_with_failed_filing:
-                    filing = get_filing(event_info, application)
-
-                    # call legal api with filing
-                    application.logger.debug(f'sending filing with event info: {event_info} to legal api.')
-                    response = requests.post(
-                        f'{application.config["LEGAL_URL"]}/{event_info["corp_num"]}/filings',
-                        json=filing,
-                        headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
-                    )
-                    if response.status_code != 201:
-                        if not first_failed_id:
-                            first_failed_id = event_info['event_id']
-                        failed_filing_events.append(event_info)
-                        corps_with_failed_filing.append(event_info['corp_num'])
-                        application.logger.error(f'Legal failed to create filing for {event_info["corp_num"]}')
+        corps_in_legal = {}
+
+        for events in get_colin_events(application, last_event_id):
+            # check if there are filings to send to legal
+            manual_filings_info, unchecked_events = check_for_manual_filings(
+                application, token, events, corps_in_legal)
+
+            # an event that could not be checked is treated like a failed filing, so it is tried again next run
+            first_unchecked_ids = {}
+            for event_info in unchecked_events:
+                first_failed_id = min(filter(None, [first_failed_id, event_info['event_id']]))
+                failed_filing_events.append(event_info)
+                first_unchecked_ids[event_info['corp_num']] = min(
+                    event_info['event_id'], first_unchecked_ids.get(event_info['corp_num'], event_info['event_id']))
+
+            if len(manual_filings_info) > 0:
+                filings = get_filings(manual_filings_info, application)
+                for event_info in manual_filings_info:
+                    # Make sure this coop has no outstanding filings that failed to be applied, or to be checked.
+                    # This ensures we don't apply filings out of order when one fails.
+                    if event_info['corp_num'] not in corps_with_failed_filing and \
+                            event_info['event_id'] < first_unchecked_ids.get(event_info['corp_num'], float('inf')):
+                        filing = filings.get(event_info['event_id'])
+
+                        # call legal api with filing
+                        application.logger.debug(f'sending filing with event info: {event_info} to legal api.')
+                        response = requests.post(
+                            f'{application.config["LEGAL_URL"]}/{event_info["corp_num"]}/filings',
+                            json=filing,
+                            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+                        ) if filing else None
+                        if not response or response.status_code != 201:
+                            first_failed_id = min(filter(None, [first_failed_id, event_info['event_id']]))
+                            failed_filing_events.append(event_info)
+                            corps_with_failed_filing.append(event_info['corp_num'])
+                            application.logger.error(f'Legal failed to create filing for {event_info["corp_num"]}')
+                        else:
+                            # update max_event_id entered
+                            successful_filings += 1
+                            if int(event_info['event_id']) > max_event_id:
+                                max_event_id = int(event_info['event_id'])
                     else:
-                        # update max_event_id entered
-                        successful_filings += 1
-                        if int(event_info['event_id']) > max_event_id:
-                            max_event_id = int(event_info['event_id'])
-                else:
-                    skipped_filings.append(event_info)
-        else:
+                        skipped_filings.append(event_info)
+            corps_with_failed_filing.extend(first_unchecked_ids)
+
+            # the rest of the events of the page are in legal already, or are not for a coop in legal
+            if not first_failed_id and not SET_EVENTS_MANUALLY and events:
+                max_event_id = max(max_event_id, int(events[-1]['event_id']))
+                if max_event_id > saved_event_id:
+                    update_last_event_id(application, token, max_event_id)
+                    saved_event_id = max_event_id
+
+        if not successful_filings and not failed_filing_events:
             application.logger.debug('0 filings updated in legal db.')
 
         application.logger.debug(f'successful filings: {successful_filings}')
@@ -200,23 +280,9 @@ def update_filings(application):  # pylint: disable=redefined-outer-name, too-ma
         # this way failed filings wont get buried/forgotten after multiple runs
         if first_failed_id:
             max_event_id = first_failed_id - 1
-        if max_event_id > 0:
+        if max_event_id > 0 and max_event_id != saved_event_id:
             # update max_event_id in legal_db
-            application.logger.debug('setting last_event_id in legal_db to {}'.format(max_event_id))
-            response = requests.post(
-                f'{application.config["LEGAL_URL"]}/internal/filings/colin_id/{max_event_id}',
-                headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
-            )
-            if response.status_code != 201:
-                application.logger.error(
-                    f'Error adding {max_event_id} colin_last_update table in legal db {response.status_code}'
-                )
-            else:
-                if dict(response.json())['maxId'] != max_event_id:
-                    application.logger.error('Updated colin id is not max colin id in legal db.')
-                else:
-                    application.logger.debug('Successfully updated colin id in legal db.')
-
+            update_last_event_id(application, token, max_event_id)
         else:
             application.logger.debug('colin_last_update not updated in legal db.')
 
@@ -298,5 +364,5 @@ if __name__ == '__main__':
     with application.app_context():
         update_filings(application)
         event_loop = asyncio.get_event_loop()
-        qsm = QueueService(app=application, loop=event_loop)
+        qsm = QueueService(app=application)
         event_loop.run_until_complete(update_business_nos(application))
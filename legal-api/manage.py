@@ -22,6 +22,7 @@ from flask_migrate import Migrate, MigrateCommand
 
 from legal_api import create_app
 from legal_api.models import db
+from legal_api.services import VersionedBusinessDetailsService
 # models included so that migrate can build the database migrations
 from legal_api import models  # pylint: disable=unused-import
 
@@ -50,6 +51,13 @@ def list_routes():
         print(line)
 
 
+@MANAGER.command
+def backfill_revision_snapshots(batch_size=100):
+    """Write the revision snapshots of completed filings that were processed before snapshots existed."""
+    count = VersionedBusinessDetailsService.backfill_revision_snapshots(int(batch_size))
+    print(f'{count} revision snapshots written')
+
+
 if __name__ == '__main__':
     logging.log(logging.INFO, 'Running the Manager')
     MANAGER.run()
@@ -0,0 +1,45 @@
+"""outbox messages
+
+Revision ID: 3c5e8f1a2b7d
+Revises: 7b1c6f2a9d4e
+Create Date: 2021-04-06 14:31:09.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e8f1a2b7d'
+down_revision = '7b1c6f2a9d4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_messages',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+                    sa.Column('action', sa.String(length=50), nullable=False),
+                    sa.Column('filing_id', sa.Integer(), nullable=False),
+                    sa.Column('business_id', sa.Integer(), nullable=True),
+                    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+                    sa.Column('status', sa.String(length=20), nullable=False),
+                    sa.Column('attempts', sa.Integer(), nullable=False),
+                    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True),
+                    sa.Column('last_error', sa.String(length=1000), nullable=True),
+                    sa.Column('created_date', sa.DateTime(timezone=True), nullable=True),
+                    sa.Column('completed_date', sa.DateTime(timezone=True), nullable=True),
+                    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+                    sa.ForeignKeyConstraint(['filing_id'], ['filings.id'], ),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('idempotency_key')
+                    )
+    op.create_index('ix_outbox_messages_pending', 'outbox_messages', ['next_attempt_at'], unique=False,
+                    postgresql_where=sa.text("status = 'PENDING'"))
+
+
+def downgrade():
+    op.drop_index('ix_outbox_messages_pending', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
@@ -0,0 +1,28 @@
+"""filings completed for colin index
+
+Revision ID: 5e7b9d1c3a24
+Revises: 9d2a4c6e8b10
+Create Date: 2021-04-12 09:41:17.203518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7b9d1c3a24'
+down_revision = '9d2a4c6e8b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_filings_completed_for_colin', 'filings', ['id'], unique=False,
+                    postgresql_where=sa.text("status = 'COMPLETED' AND source IS DISTINCT FROM 'COLIN' "
+                                             'AND effective_date IS NOT NULL'))
+    op.create_index(op.f('ix_colin_event_ids_filing_id'), 'colin_event_ids', ['filing_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_colin_event_ids_filing_id'), table_name='colin_event_ids')
+    op.drop_index('ix_filings_completed_for_colin', table_name='filings')
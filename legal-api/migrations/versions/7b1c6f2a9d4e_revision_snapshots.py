@@ -0,0 +1,33 @@
+"""revision snapshots
+
+Revision ID: 7b1c6f2a9d4e
+Revises: 2dedf50a17ef
+Create Date: 2021-03-24 10:12:41.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1c6f2a9d4e'
+down_revision = '2dedf50a17ef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revision_snapshots',
+                    sa.Column('filing_id', sa.Integer(), nullable=False),
+                    sa.Column('transaction_id', sa.BigInteger(), nullable=False),
+                    sa.Column('filing_json', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+                    sa.Column('company_details_json', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+                    sa.Column('created_date', sa.DateTime(timezone=True), nullable=True),
+                    sa.ForeignKeyConstraint(['filing_id'], ['filings.id'], ),
+                    sa.PrimaryKeyConstraint('filing_id', 'transaction_id')
+                    )
+
+
+def downgrade():
+    op.drop_table('revision_snapshots')
@@ -0,0 +1,25 @@
+"""filings paid effective date index
+
+Revision ID: 9d2a4c6e8b10
+Revises: 3c5e8f1a2b7d
+Create Date: 2021-04-08 10:05:52.611904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2a4c6e8b10'
+down_revision = '3c5e8f1a2b7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_filings_paid_effective_date', 'filings', ['effective_date'], unique=False,
+                    postgresql_where=sa.text("status = 'PAID'"))
+
+
+def downgrade():
+    op.drop_index('ix_filings_paid_effective_date', table_name='filings')
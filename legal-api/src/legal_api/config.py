@@ -61,9 +61,20 @@ class _Config():  # pylint: disable=too-few-public-methods
     PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 
     PAYMENT_SVC_URL = os.getenv('PAYMENT_SVC_URL', 'http://')
+    PAYMENT_SVC_TIMEOUT = float(os.getenv('PAYMENT_SVC_TIMEOUT', '5'))
+    # seconds the details of payments that are not yet completed or cancelled are cached
+    PAYMENT_STATUS_CACHE_TTL = int(os.getenv('PAYMENT_STATUS_CACHE_TTL', '10'))
+    # consecutive pay-api failures after which it isn't called for PAYMENT_SVC_RESET_TIMEOUT seconds
+    PAYMENT_SVC_FAILURE_THRESHOLD = int(os.getenv('PAYMENT_SVC_FAILURE_THRESHOLD', '5'))
+    PAYMENT_SVC_RESET_TIMEOUT = int(os.getenv('PAYMENT_SVC_RESET_TIMEOUT', '30'))
     AUTH_SVC_URL = os.getenv('AUTH_SVC_URL', 'http://')
+    # authorization decisions of the auth service are cached for up to AUTHZ_CACHE_TTL seconds
+    AUTHZ_CACHE_TTL = int(os.getenv('AUTHZ_CACHE_TTL', '60'))
+    AUTHZ_CACHE_SIZE = int(os.getenv('AUTHZ_CACHE_SIZE', '1000'))
     REPORT_SVC_URL = os.getenv('REPORT_SVC_URL', 'http://')
     REPORT_TEMPLATE_PATH = os.getenv('REPORT_PATH', 'report-templates')
+    # rendered documents of completed filings are kept here, the store is disabled when not set
+    REPORT_STORE_PATH = os.getenv('REPORT_STORE_PATH', None)
 
     GO_LIVE_DATE = os.getenv('GO_LIVE_DATE')
 
@@ -108,6 +119,9 @@ class _Config():  # pylint: disable=too-few-public-methods
     NATS_CLUSTER_ID = os.getenv('NATS_CLUSTER_ID', 'test-cluster')
     NATS_FILER_SUBJECT = os.getenv('NATS_FILER_SUBJECT', 'entity.filing.filer')
     NATS_QUEUE = os.getenv('NATS_QUEUE', 'entity-filer-worker')
+    # the future effective filings scheduler is only told of future effective dates when this is set
+    NATS_SCHEDULER_SUBJECT = os.getenv('NATS_SCHEDULER_SUBJECT')
+    NATS_PUBLISH_TIMEOUT = int(os.getenv('NATS_PUBLISH_TIMEOUT', '10'))
 
     # NAMEX PROXY Settings
     NAMEX_AUTH_SVC_URL = os.getenv('NAMEX_AUTH_SVC_URL', 'http://')
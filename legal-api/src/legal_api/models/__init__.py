@@ -21,9 +21,11 @@ from .colin_update import ColinLastUpdate
 from .comment import Comment
 from .filing import Filing
 from .office import Office, OfficeType
+from .outbox_message import OutboxMessage
 from .party_role import Party, PartyRole
 from .registration_bootstrap import RegistrationBootstrap
 from .resolution import Resolution
+from .revision_snapshot import RevisionSnapshot
 from .share_class import ShareClass
 from .share_series import ShareSeries
 from .user import User
@@ -31,5 +33,5 @@ from .user import User
 
 __all__ = ('db',
            'Address', 'Alias', 'Business', 'ColinLastUpdate', 'Comment', 'Filing',
-           'Office', 'OfficeType', 'Party', 'RegistrationBootstrap', 'Resolution',
+           'Office', 'OfficeType', 'OutboxMessage', 'Party', 'RegistrationBootstrap', 'Resolution', 'RevisionSnapshot',
            'PartyRole', 'ShareClass', 'ShareSeries', 'User')
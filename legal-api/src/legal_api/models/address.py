@@ -15,7 +15,7 @@
 
 Currently this only provides API versioning information
 """
-import pycountry
+from legal_api.utils.country import get_country
 
 from .db import db
 
@@ -86,7 +86,7 @@ class Address(db.Model):  # pylint: disable=too-many-instance-attributes
         address.street_additional = new_info.get('streetAddressAdditional')
         address.city = new_info.get('addressCity')
         address.region = new_info.get('addressRegion')
-        address.country = pycountry.countries.search_fuzzy(new_info.get('addressCountry'))[0].alpha_2
+        address.country = get_country(new_info.get('addressCountry')).alpha_2
         address.postal_code = new_info.get('postalCode')
         address.delivery_instructions = new_info.get('deliveryInstructions')
 
@@ -15,6 +15,8 @@
 
 The ColinEventId class and Schema are held in this module.
 """
+from collections import defaultdict
+from typing import Dict, List
 
 from .db import db
 
@@ -25,7 +27,7 @@ class ColinEventId(db.Model):  # pylint: disable=too-few-public-methods
     __tablename__ = 'colin_event_ids'
 
     colin_event_id = db.Column('colin_event_id', db.Integer, unique=True, primary_key=True)
-    filing_id = db.Column('filing_id', db.Integer, db.ForeignKey('filings.id'))
+    filing_id = db.Column('filing_id', db.Integer, db.ForeignKey('filings.id'), index=True)
 
     def save(self):
         """Save the object to the database immediately."""
@@ -41,6 +43,24 @@ class ColinEventId(db.Model):  # pylint: disable=too-few-public-methods
             id_list.append(obj.colin_event_id)
         return id_list
 
+    @staticmethod
+    def get_by_filing_ids(filing_ids: List[int]) -> Dict[int, List[int]]:
+        """Get the lists of colin_event_ids linked to the given filing_ids, in one query."""
+        id_lists = defaultdict(list)
+        if filing_ids:
+            for colin_event_id, filing_id in db.session.query(ColinEventId.colin_event_id, ColinEventId.filing_id). \
+                    filter(ColinEventId.filing_id.in_(filing_ids)).order_by(ColinEventId.colin_event_id):
+                id_lists[filing_id].append(colin_event_id)
+        return id_lists
+
+    @staticmethod
+    def get_known_colin_ids(colin_ids: List[int]) -> List[int]:
+        """Get the ones of the given colin_event_ids that are linked to a filing, in one query."""
+        if not colin_ids:
+            return []
+        return [colin_event_id for colin_event_id, in db.session.query(ColinEventId.colin_event_id).
+                filter(ColinEventId.colin_event_id.in_(colin_ids)).order_by(ColinEventId.colin_event_id)]
+
     @staticmethod
     def get_by_colin_id(colin_id):
         """Get the ColinEventId obj with the given colin id."""
@@ -24,7 +24,7 @@ from sqlalchemy.orm import backref
 from legal_api.exceptions import BusinessException
 
 from .db import db
-from .user import User
+from .user import User  # noqa: F401 pylint: disable=unused-import; needed by the SQLAlchemy relationship
 
 
 class Comment(db.Model):
@@ -52,7 +52,7 @@ class Comment(db.Model):
     @property
     def json(self):
         """Return the json repressentation of a comment."""
-        user = User.find_by_id(self.staff_id)
+        user = self.staff
         return {
             'comment': {
                 'id': self.id,
@@ -13,23 +13,24 @@
 # limitations under the License
 """Filings are legal documents that alter the state of a business."""
 import copy
+from collections import defaultdict
 from datetime import date, datetime
 from enum import Enum
 from http import HTTPStatus
-from typing import List
+from typing import List, Tuple
 
 from flask import current_app
-from sqlalchemy import desc, event, inspect, or_
+from sqlalchemy import desc, event, func, inspect, or_
 from sqlalchemy.dialects.postgresql import JSONB, dialect
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import backref
+from sqlalchemy.orm import backref, joinedload, selectinload
 
 from legal_api.exceptions import BusinessException
 from legal_api.models.colin_event_id import ColinEventId
 from legal_api.schemas import rsbc_schemas
 
 from .db import db  # noqa: I001
-from .comment import Comment  # noqa: I001,F401 pylint: disable=unused-import; needed by the SQLAlchemy relationship
+from .comment import Comment  # noqa: I001
 
 
 class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many-public-methods
@@ -127,6 +128,15 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
     }
 
     __tablename__ = 'filings'
+    __table_args__ = (
+        # the filings waiting on their effective date, see get_due_filing_ids
+        db.Index('ix_filings_paid_effective_date', 'effective_date',
+                 postgresql_where=db.text("status = 'PAID'")),
+        # the filings waiting to be sent to COLIN, see get_completed_filings_for_colin
+        db.Index('ix_filings_completed_for_colin', 'id',
+                 postgresql_where=db.text("status = 'COMPLETED' AND source IS DISTINCT FROM 'COLIN' "
+                                          'AND effective_date IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     _completion_date = db.Column('completion_date', db.DateTime(timezone=True))
@@ -340,6 +350,11 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
     @property
     def json(self):
         """Return a json representation of this object."""
+        return self._json(colin_event_ids=ColinEventId.get_by_filing_id(self.id),
+                          comments=[comment.json for comment in self.comments])
+
+    def _json(self, colin_event_ids: List[int], comments: List[dict]):
+        """Return a json representation of this object, using the supplied colin ids and comments."""
         try:
             json_submission = copy.deepcopy(self.filing_json)
             json_submission['filing']['header']['date'] = self._filing_date.isoformat()
@@ -363,10 +378,10 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
                 json_submission['filing']['header']['paymentAccount'] = self.payment_account
 
             # add colin_event_ids
-            json_submission['filing']['header']['colinIds'] = ColinEventId.get_by_filing_id(self.id)
+            json_submission['filing']['header']['colinIds'] = colin_event_ids
 
             # add comments
-            json_submission['filing']['header']['comments'] = [comment.json for comment in self.comments]
+            json_submission['filing']['header']['comments'] = comments
 
             # add affected filings list
             json_submission['filing']['header']['affectedFilings'] = [filing.id for filing in self.children]
@@ -407,8 +422,8 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
         return filing
 
     @staticmethod
-    def get_filings_by_status(business_id: int, status: [], after_date: date = None):
-        """Return the filings with statuses in the status array input."""
+    def _filings_by_status_query(business_id: int, status: [], after_date: date = None):
+        """Return the query for the filings with statuses in the status array input."""
         query = db.session.query(Filing). \
             filter(Filing.business_id == business_id). \
             filter(Filing._status.in_(status)). \
@@ -418,7 +433,43 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
         if after_date:
             query = query.filter(Filing._filing_date >= after_date)
 
-        return query.all()
+        return query
+
+    @staticmethod
+    def get_filings_by_status(business_id: int, status: [], after_date: date = None):
+        """Return the filings with statuses in the status array input."""
+        return Filing._filings_by_status_query(business_id, status, after_date).all()
+
+    @staticmethod
+    def get_filings_json_by_status(business_id: int, status: [], after_date: date = None) -> List[dict]:
+        """Return the json of the filings with statuses in the status array input.
+
+        The output is the same as calling Filing.json on each filing returned by get_filings_by_status,
+        but the related rows (colin ids, comments, children, parent and submitter) are fetched for all the
+        filings at once, so the number of queries does not grow with the size of the ledger.
+        """
+        filings = Filing._filings_by_status_query(business_id, status, after_date). \
+            options(joinedload(Filing.filing_submitter),
+                    joinedload(Filing.parent_filing),
+                    selectinload(Filing.children),
+                    selectinload(Filing.colin_event_ids)). \
+            all()
+        if not filings:
+            return []
+
+        comments = defaultdict(list)
+        filing_comments = db.session.query(Comment). \
+            options(joinedload(Comment.staff)). \
+            filter(Comment.filing_id.in_([filing.id for filing in filings])). \
+            order_by(Comment.id). \
+            all()
+        for comment in filing_comments:
+            comments[comment.filing_id].append(comment.json)
+
+        return [filing._json(  # pylint: disable=protected-access; bulk serializer of this class
+            colin_event_ids=[colin_event.colin_event_id for colin_event in filing.colin_event_ids],
+            comments=comments[filing.id])
+            for filing in filings]
 
     @staticmethod
     def get_filings_by_type(business_id: int, filing_type: str):
@@ -475,15 +526,28 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
         return filing.first()
 
     @staticmethod
-    def get_completed_filings_for_colin():
-        """Return the filings with statuses in the status array input."""
-        filings = db.session.query(Filing). \
+    def get_completed_filings_for_colin(after_id: int = None, limit: int = None) -> List[Tuple]:
+        """Return the completed LEAR filings with no colin event ids, in id order.
+
+        Each row is the filing with the identifier, legal type and legal name of its business, from the one query.
+        Pages are keyed on the last id of the previous page, given as after_id.
+        """
+        from .business import Business  # pylint: disable=import-outside-toplevel; circular import
+
+        query = db.session.query(Filing, Business.identifier, Business.legal_type, Business.legal_name). \
+            join(Business, Business.id == Filing.business_id). \
             filter(
-                Filing.colin_event_ids == None,  # pylint: disable=singleton-comparison # noqa: E711;
                 Filing._status == Filing.Status.COMPLETED.value,
-                Filing.effective_date != None   # pylint: disable=singleton-comparison # noqa: E711;
-            ).order_by(Filing.filing_date).all()
-        return filings
+                Filing._source.is_distinct_from(Filing.Source.COLIN.value),
+                Filing.effective_date != None,  # pylint: disable=singleton-comparison # noqa: E711;
+                Filing.colin_event_ids == None  # pylint: disable=singleton-comparison # noqa: E711;
+            )
+        if after_id:
+            query = query.filter(Filing.id > after_id)
+        query = query.order_by(Filing.id)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
 
     @staticmethod
     def get_all_filings_by_status(status):
@@ -492,6 +556,31 @@ class Filing(db.Model):  # pylint: disable=too-many-instance-attributes,too-many
             filter(Filing._status == status).all()  # pylint: disable=singleton-comparison # noqa: E711;
         return filings
 
+    @staticmethod
+    def get_due_filing_ids(after_id: int = None, limit: int = 100) -> List[int]:
+        """Return the ids of up to limit PAID filings whose effective date has come, in id order.
+
+        Pages are keyed on the last id of the previous page, given as after_id.
+        """
+        query = db.session.query(Filing.id). \
+            filter(Filing._status == Filing.Status.PAID.value). \
+            filter(Filing.effective_date <= func.now())
+        if after_id:
+            query = query.filter(Filing.id > after_id)
+        return [filing_id for filing_id, in query.order_by(Filing.id).limit(limit)]
+
+    @staticmethod
+    def get_paid_filing_schedule(after_id: int = None, limit: int = 100) -> List[Tuple[int, datetime]]:
+        """Return the (id, effective date) of up to limit PAID filings, in id order.
+
+        Pages are keyed on the last id of the previous page, given as after_id.
+        """
+        query = db.session.query(Filing.id, Filing.effective_date). \
+            filter(Filing._status == Filing.Status.PAID.value)
+        if after_id:
+            query = query.filter(Filing.id > after_id)
+        return query.order_by(Filing.id).limit(limit).all()
+
     def save(self):
         """Save and commit immediately."""
         db.session.add(self)
@@ -0,0 +1,138 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This model manages the outbox of the side effects of processing filings.
+
+The OutboxMessage class is held in this module.
+"""
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import List, Tuple
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import aliased
+
+from .db import db
+
+
+class OutboxMessage(db.Model):  # pylint: disable=too-many-instance-attributes
+    """Holds a side effect of a filing, ie. a call to another service, until it has been carried out.
+
+    Messages are written in the same transaction as the filing, so a side effect is recorded if and only if
+    the filing is, and are then carried out, and retried, by a dispatcher after the transaction is committed.
+    The idempotency key is unique, so a side effect is only ever recorded once.
+    """
+
+    class Status(Enum):
+        """Render an Enum of the Outbox Message Statuses."""
+
+        PENDING = 'PENDING'
+        COMPLETED = 'COMPLETED'
+        FAILED = 'FAILED'
+
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        db.Index('ix_outbox_messages_pending', 'next_attempt_at',
+                 postgresql_where=db.text("status = 'PENDING'")),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column('idempotency_key', db.String(100), unique=True, nullable=False)
+    action = db.Column('action', db.String(50), nullable=False)
+    filing_id = db.Column('filing_id', db.Integer, db.ForeignKey('filings.id'), nullable=False)
+    business_id = db.Column('business_id', db.Integer, db.ForeignKey('businesses.id'))
+    payload = db.Column('payload', JSONB)
+    status = db.Column('status', db.String(20), default=Status.PENDING.value, nullable=False)
+    attempts = db.Column('attempts', db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column('next_attempt_at', db.DateTime(timezone=True), default=datetime.utcnow)
+    last_error = db.Column('last_error', db.String(1000))
+    created_date = db.Column('created_date', db.DateTime(timezone=True), default=datetime.utcnow)
+    completed_date = db.Column('completed_date', db.DateTime(timezone=True))
+
+    @classmethod
+    def find_by_id(cls, message_id: int):
+        """Return the message matching the id."""
+        return cls.query.filter_by(id=message_id).one_or_none()
+
+    @classmethod
+    def claim_due(cls, limit: int, lease: int) -> List[Tuple[int, int]]:
+        """Return the (filing id, id) of up to limit pending messages that are due, and commit a lease on them.
+
+        The messages are not attempted again by anyone else until the lease, in seconds, runs out,
+        and the rows locked by another dispatcher claiming at the same time are skipped.
+        A message is not due while an earlier message of its filing is pending, so the messages
+        of a filing are carried out in the order they were added, even when one is retried.
+        """
+        now = datetime.utcnow()
+        earlier = aliased(cls)
+        messages = cls.query.filter(cls.status == cls.Status.PENDING.value,
+                                    cls.next_attempt_at <= now,
+                                    ~db.session.query(earlier.id)
+                                    .filter(earlier.filing_id == cls.filing_id,
+                                            earlier.id < cls.id,
+                                            earlier.status == cls.Status.PENDING.value)
+                                    .exists()) \
+            .order_by(cls.next_attempt_at) \
+            .limit(limit) \
+            .with_for_update(skip_locked=True) \
+            .all()
+        for message in messages:
+            message.next_attempt_at = now + timedelta(seconds=lease)
+        claimed = [(message.filing_id, message.id) for message in messages]
+        db.session.commit()
+        return claimed
+
+    @classmethod
+    def release(cls, message_ids: List[int]):
+        """Release the lease on the claimed messages, so they are due again, and commit it."""
+        if message_ids:
+            cls.query.filter(cls.id.in_(message_ids)) \
+                .update({cls.next_attempt_at: datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+
+    @property
+    def completed_steps(self) -> List[str]:
+        """Return the steps of the message carried out by its earlier attempts."""
+        return (self.payload or {}).get('completedSteps', [])
+
+    def record_step(self, step: str):
+        """Save the step of the message as carried out, so a retry of the message does not repeat it."""
+        self.payload = {**(self.payload or {}), 'completedSteps': [*self.completed_steps, step]}
+        self.save()
+
+    def record_success(self):
+        """Mark the message as carried out, and save it."""
+        self.status = OutboxMessage.Status.COMPLETED.value
+        self.attempts += 1
+        self.last_error = None
+        self.completed_date = datetime.utcnow()
+        self.save()
+
+    def record_failure(self, error: str, retry_in: float = None):
+        """Save the failed attempt, and either retry the message in retry_in seconds or, without it, give up on it."""
+        self.attempts += 1
+        self.last_error = (error or '')[:1000]
+        if retry_in is None:
+            self.status = OutboxMessage.Status.FAILED.value
+        else:
+            self.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_in)
+        self.save()
+
+    def save(self):
+        """Save the object to the database immediately."""
+        db.session.add(self)
+        db.session.commit()
+
+    def save_to_session(self):
+        """Save to the session, do not commit immediately."""
+        db.session.add(self)
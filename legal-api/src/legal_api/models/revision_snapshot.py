@@ -0,0 +1,56 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This model manages the data store for the point-in-time revisions of completed filings.
+
+The RevisionSnapshot class is held in this module.
+"""
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .db import db
+
+
+class RevisionSnapshot(db.Model):  # pylint: disable=too-few-public-methods
+    """Holds the business details revision of a filing, as of the transaction that completed it.
+
+    Once a filing is completed its revision can no longer change, so it is written once by the filer
+    and read back instead of being rebuilt from the version tables.
+    The filing header is not part of the snapshot, as it holds data (comments, colin ids, etc.) that
+    can still change after the filing is completed.
+    """
+
+    __tablename__ = 'revision_snapshots'
+
+    filing_id = db.Column('filing_id', db.Integer, db.ForeignKey('filings.id'), primary_key=True)
+    transaction_id = db.Column('transaction_id', db.BigInteger, primary_key=True)
+    filing_json = db.Column('filing_json', JSONB)
+    company_details_json = db.Column('company_details_json', JSONB)
+    created_date = db.Column('created_date', db.DateTime(timezone=True), default=datetime.utcnow)
+
+    @classmethod
+    def find(cls, filing_id: int, transaction_id: int):
+        """Return the snapshot of the filing as of the transaction, if one has been written."""
+        if not filing_id or not transaction_id:
+            return None
+        return cls.query.filter_by(filing_id=filing_id, transaction_id=transaction_id).one_or_none()
+
+    def save(self):
+        """Save the object to the database immediately."""
+        db.session.add(self)
+        db.session.commit()
+
+    def save_to_session(self):
+        """Save toThe session, do not commit immediately."""
+        db.session.add(self)
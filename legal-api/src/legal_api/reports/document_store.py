@@ -0,0 +1,163 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+# an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+"""Store of the rendered documents of completed filings.
+
+The output of a completed filing only changes with the report template, and with the business data it shows,
+eg. the tax id assigned after the filing is completed, so its rendered PDFs are kept and served from the store
+instead of being rendered by the report service again. Documents are keyed by filing id, report type, the version
+hash of the assembled template and a digest of the data rendered into it, so a change to either is picked up
+without having to invalidate the store.
+
+The storage itself is pluggable, the store only needs a backend that implements StorageBackend.
+"""
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class DocumentKey:
+    """The key of a rendered document."""
+
+    filing_id: int
+    report_type: str
+    template_version: str
+    data_version: str
+
+
+class StorageBackend(ABC):
+    """The interface of the storage used by the document store."""
+
+    @abstractmethod
+    def get(self, key: DocumentKey) -> Optional[bytes]:
+        """Return the document, or None if it is not stored."""
+
+    @abstractmethod
+    def put(self, key: DocumentKey, content: bytes):
+        """Store the document."""
+
+    @abstractmethod
+    def delete(self, filing_id: int):
+        """Remove all the documents of the filing."""
+
+
+class FileSystemBackend(StorageBackend):
+    """Stores the documents on the local filesystem, as <root>/<filing id>/<report type>-<versions>.pdf."""
+
+    def __init__(self, root: str):
+        """Create the backend."""
+        self.root = Path(root)
+
+    def _path(self, key: DocumentKey) -> Path:
+        return self.root / str(key.filing_id) / f'{key.report_type}-{key.template_version}-{key.data_version}.pdf'
+
+    def get(self, key: DocumentKey) -> Optional[bytes]:
+        """Return the document, or None if it is not stored."""
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: DocumentKey, content: bytes):
+        """Store the document.
+
+        The document is written to a temporary file that is then renamed, so a partly written document is never read.
+        The other versions of the document are removed, as they are superseded by it.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+        for other_path in path.parent.glob(f'{key.report_type}-*.pdf'):
+            if other_path != path:
+                with suppress(FileNotFoundError):
+                    other_path.unlink()
+
+    def delete(self, filing_id: int):
+        """Remove all the documents of the filing."""
+        shutil.rmtree(self.root / str(filing_id), ignore_errors=True)
+
+
+class DocumentStore():
+    """Wrapper around the storage of the rendered documents, that keeps count of the hits and misses.
+
+    The store is disabled, and every document rendered, unless REPORT_STORE_PATH is set.
+    """
+
+    def __init__(self, app=None):
+        """Initialize this object."""
+        self.backend: Optional[StorageBackend] = None
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app, backend: StorageBackend = None):
+        """Initialize the storage from the app configuration, unless a backend is given."""
+        if not backend and (root := app.config.get('REPORT_STORE_PATH')):
+            backend = FileSystemBackend(root)
+        self.backend = backend
+        self.reset_stats()
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if the documents are stored."""
+        return self.backend is not None
+
+    def get(self, key: DocumentKey) -> Optional[bytes]:
+        """Return the stored document, or None on a miss."""
+        content = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if content is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return content
+
+    def put(self, key: DocumentKey, content: bytes):
+        """Store the document."""
+        if self.backend:
+            self.backend.put(key, content)
+
+    def invalidate(self, filing_id: int):
+        """Remove all the stored documents of the filing."""
+        if self.backend:
+            self.backend.delete(filing_id)
+
+    @property
+    def stats(self) -> dict:
+        """Return the hit and miss counts since the store was initialized."""
+        with self._lock:
+            return {'enabled': self.enabled, 'hits': self._hits, 'misses': self._misses}
+
+    def reset_stats(self):
+        """Reset the hit and miss counts."""
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+
+document_store = DocumentStore()  # pylint: disable=invalid-name; shared variables are lower case.
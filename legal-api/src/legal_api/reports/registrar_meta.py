@@ -10,6 +10,7 @@
 # specific language governing permissions and limitations under the License.
 """Holds the registrar meta data."""
 import base64
+import bisect
 import datetime
 
 from flask import current_app
@@ -42,17 +43,34 @@ class RegistrarInfo:   # pylint: disable=too-few-public-methods
         }
     ]
 
+    # the start dates, end dates and registrars (with their signature encoded) ordered by start date,
+    # by template path
+    _registrars_by_date = {}
+
     @staticmethod
     def get_registrar_info(filing_effective_date) -> dict:
         """Return the registrar for a filing."""
         filing_effective_date = filing_effective_date.replace(tzinfo=None)
-        registrar = [x for x in RegistrarInfo.registrar_info if
-                     (filing_effective_date >= datetime.datetime.strptime(x['startDate'], '%Y-%m-%dT%H:%M:%S') and
-                      (x['endDate'] is None or
-                       filing_effective_date <= datetime.datetime.strptime(x['endDate'], '%Y-%m-%dT%H:%M:%S')))][0]
-        signature = RegistrarInfo.encode_registrar_signature(registrar['signatureImage'])
-        registrar['signature'] = f'data:image/png;base64,{signature}'
-        return registrar
+        start_dates, end_dates, registrars = RegistrarInfo._get_registrar_index()
+        index = bisect.bisect_right(start_dates, filing_effective_date) - 1
+        if index < 0 or (end_dates[index] and filing_effective_date > end_dates[index]):
+            raise IndexError(f'No registrar found for {filing_effective_date}.')
+        return {**registrars[index]}
+
+    @staticmethod
+    def _get_registrar_index():
+        """Return the registrar date intervals, built once so the dates and signatures aren't read on every call."""
+        template_path = current_app.config.get('REPORT_TEMPLATE_PATH')
+        if template_path not in RegistrarInfo._registrars_by_date:
+            start_dates, end_dates, registrars = [], [], []
+            for registrar_info in sorted(RegistrarInfo.registrar_info, key=lambda x: x['startDate']):
+                signature = RegistrarInfo.encode_registrar_signature(registrar_info['signatureImage'])
+                registrars.append({**registrar_info, 'signature': f'data:image/png;base64,{signature}'})
+                start_dates.append(datetime.datetime.strptime(registrar_info['startDate'], '%Y-%m-%dT%H:%M:%S'))
+                end_dates.append(datetime.datetime.strptime(registrar_info['endDate'], '%Y-%m-%dT%H:%M:%S')
+                                 if registrar_info['endDate'] else None)
+            RegistrarInfo._registrars_by_date[template_path] = (start_dates, end_dates, registrars)
+        return RegistrarInfo._registrars_by_date[template_path]
 
     @staticmethod
     def encode_registrar_signature(signature_image) -> str:
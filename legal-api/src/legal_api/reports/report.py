@@ -11,22 +11,24 @@
 """Produces a PDF output based on templates and JSON messages."""
 import base64
 import copy
+import hashlib
 import json
 import os
 import re
 from contextlib import suppress
 from datetime import datetime
 from http import HTTPStatus
-from pathlib import Path
 
-import pycountry
 import requests
 from flask import current_app, jsonify
 
 from legal_api.models import Business, Filing
+from legal_api.reports.document_store import DocumentKey, document_store
 from legal_api.reports.registrar_meta import RegistrarInfo
+from legal_api.reports.template_registry import substitute_template_parts, template_registry
 from legal_api.services import VersionedBusinessDetailsService
 from legal_api.utils.auth import jwt
+from legal_api.utils.country import get_country
 from legal_api.utils.legislation_datetime import LegislationDatetime
 
 
@@ -48,19 +50,38 @@ class Report:  # pylint: disable=too-few-public-methods
         if self._filing.business_id:
             self._business = Business.find_by_internal_id(self._filing.business_id)
             Report._populate_business_info_to_filing(self._filing, self._business)
-        headers = {
-            'Authorization': 'Bearer {}'.format(jwt.get_token_auth_header()),
-            'Content-Type': 'application/json'
-        }
+
         data = {
             'reportName': self._get_report_filename(),
-            'template': "'" + base64.b64encode(bytes(self._get_template(), 'utf-8')).decode() + "'",
             'templateVars': self._get_template_data()
         }
+        document_key = None
+        if document_store.enabled and self._filing.status == Filing.Status.COMPLETED.value:
+            # the output of a completed filing only changes with its template, and the business data rendered into it
+            document_key = DocumentKey(filing_id=self._filing.id,
+                                       report_type=self._report_key,
+                                       template_version=template_registry.get_template_version(
+                                           self._get_template_filename()),
+                                       data_version=hashlib.sha256(
+                                           json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest())
+            if (content := document_store.get(document_key)) is not None:
+                return content, HTTPStatus.OK
+
+        headers = {
+            'Authorization': 'Bearer {}'.format(jwt.get_token_auth_header()),
+            'Content-Type': 'application/json'
+        }
+        data['template'] = "'" + base64.b64encode(bytes(self._get_template(), 'utf-8')).decode() + "'"
         response = requests.post(url=current_app.config.get('REPORT_SVC_URL'), headers=headers, data=json.dumps(data))
 
         if response.status_code != HTTPStatus.OK:
             return jsonify(message=str(response.content)), response.status_code
+
+        if document_key:
+            try:
+                document_store.put(document_key, response.content)
+            except OSError as err:
+                current_app.logger.error(f'Unable to store {document_key}: {err}')
         return response.content, response.status_code
 
     def _get_report_filename(self):
@@ -72,10 +93,7 @@ class Report:  # pylint: disable=too-few-public-methods
 
     def _get_template(self):
         try:
-            template_path = current_app.config.get('REPORT_TEMPLATE_PATH')
-            template_code = Path(f'{template_path}/{self._get_template_filename()}').read_text()
-            # substitute template parts
-            template_code = self._substitute_template_parts(template_code)
+            template_code = template_registry.get_template(self._get_template_filename())
         except Exception as err:
             current_app.logger.error(err)
             raise err
@@ -96,53 +114,7 @@ class Report:  # pylint: disable=too-few-public-methods
         :return: template_code string, modified.
         """
         template_path = current_app.config.get('REPORT_TEMPLATE_PATH')
-        template_parts = [
-            'bc-annual-report/legalObligations',
-            'bc-address-change/addresses',
-            'bc-director-change/directors',
-            'certificate-of-name-change/style',
-            'common/certificateLogo',
-            'common/certificateRegistrarSignature',
-            'common/certificateSeal',
-            'common/certificateStyle',
-            'common/addresses',
-            'common/shareStructure',
-            'common/correctedOnCertificate',
-            'common/style',
-            'common/businessDetails',
-            'common/directors',
-            'incorporation-application/benefitCompanyStmt',
-            'incorporation-application/completingParty',
-            'incorporation-application/effectiveDate',
-            'incorporation-application/incorporator',
-            'incorporation-application/nameRequest',
-            'common/benefitCompanyStmt',
-            'notice-of-articles/directors',
-            'notice-of-articles/restrictions',
-            'common/resolutionDates',
-            'alteration-notice/businessTypeChange',
-            'common/effectiveDate',
-            'common/legalNameChange',
-            'common/nameTranslation',
-            'alteration-notice/companyProvisions',
-            'addresses',
-            'certification',
-            'directors',
-            'dissolution',
-            'footer',
-            'legalNameChange',
-            'logo',
-            'macros',
-            'resolution',
-            'style'
-        ]
-
-        # substitute template parts - marked up by [[filename]]
-        for template_part in template_parts:
-            template_part_code = Path(f'{template_path}/template-parts/{template_part}.html').read_text()
-            template_code = template_code.replace('[[{}.html]]'.format(template_part), template_part_code)
-
-        return template_code
+        return substitute_template_parts(template_path, template_code)
 
     def _get_template_filename(self):
         if ReportMeta.reports[self._report_key].get('hasDifferentTemplates', False):
@@ -296,7 +268,7 @@ class Report:  # pylint: disable=too-few-public-methods
     @staticmethod
     def _format_address(address):
         country = address['addressCountry']
-        country = pycountry.countries.search_fuzzy(country)[0].name
+        country = get_country(country).name
         address['addressCountry'] = country
         return address
 
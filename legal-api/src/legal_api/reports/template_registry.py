@@ -0,0 +1,152 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except in compliance with
+# the License. You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+# an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+"""Registry of the assembled report templates.
+
+A report template is its main template file with the template parts, marked up by [[partname.html]],
+substituted in. The assembled templates are kept in memory, so the files are only read once per process.
+"""
+import hashlib
+import re
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Tuple
+
+from flask import current_app
+
+
+TEMPLATE_PARTS = frozenset([
+    'bc-annual-report/legalObligations',
+    'bc-address-change/addresses',
+    'bc-director-change/directors',
+    'certificate-of-name-change/style',
+    'common/certificateLogo',
+    'common/certificateRegistrarSignature',
+    'common/certificateSeal',
+    'common/certificateStyle',
+    'common/addresses',
+    'common/shareStructure',
+    'common/correctedOnCertificate',
+    'common/style',
+    'common/businessDetails',
+    'common/directors',
+    'incorporation-application/benefitCompanyStmt',
+    'incorporation-application/completingParty',
+    'incorporation-application/effectiveDate',
+    'incorporation-application/incorporator',
+    'incorporation-application/nameRequest',
+    'common/benefitCompanyStmt',
+    'notice-of-articles/directors',
+    'notice-of-articles/restrictions',
+    'common/resolutionDates',
+    'alteration-notice/businessTypeChange',
+    'common/effectiveDate',
+    'common/legalNameChange',
+    'common/nameTranslation',
+    'alteration-notice/companyProvisions',
+    'addresses',
+    'certification',
+    'directors',
+    'dissolution',
+    'footer',
+    'legalNameChange',
+    'logo',
+    'macros',
+    'resolution',
+    'style'
+])
+
+_TEMPLATE_PART_MARKUP = re.compile(r'\[\[([^\[\]]+)\.html\]\]')
+
+
+def substitute_template_parts(template_path: str, template_code: str, part_files: Dict[Path, str] = None) -> str:
+    """Substitute the template parts in the template code, in a single pass.
+
+    Only the known TEMPLATE_PARTS are substituted, any other markup is left as is.
+    Template parts can only be one level deep, the parts themselves are not searched for markup.
+
+    :param template_path: the root of the report templates
+    :param template_code: the main template
+    :param part_files: if given, collects the contents of the part files read, by path
+    :return: template_code string, modified.
+    """
+    if part_files is None:
+        part_files = {}
+
+    def _part_code(match):
+        template_part = match.group(1)
+        if template_part not in TEMPLATE_PARTS:
+            return match.group(0)
+        part_file = Path(f'{template_path}/template-parts/{template_part}.html')
+        if part_file not in part_files:
+            part_files[part_file] = part_file.read_text()
+        return part_files[part_file]
+
+    return _TEMPLATE_PART_MARKUP.sub(_part_code, template_code)
+
+
+class TemplateRegistry:
+    """Assembles each report template once and keeps it in memory.
+
+    In debug mode an assembled template is rebuilt when the mtime of its file or of any of its parts
+    changes, so template edits show up without a restart. Otherwise the cache is frozen for the life
+    of the process.
+    """
+
+    def __init__(self):
+        """Create the registry."""
+        # (template code, template version, file mtimes) by (template path, template file name)
+        self._templates: Dict[Tuple[str, str], Tuple[str, str, Dict[Path, float]]] = {}
+        self._lock = Lock()
+
+    def get_template(self, template_file_name: str) -> str:
+        """Return the assembled template."""
+        return self._get_entry(template_file_name)[0]
+
+    def get_template_version(self, template_file_name: str) -> str:
+        """Return a hash of the assembled template, that changes whenever the template or its parts change."""
+        return self._get_entry(template_file_name)[1]
+
+    def _get_entry(self, template_file_name: str) -> Tuple[str, str, Dict[Path, float]]:
+        """Return the cache entry of the template, assembling it if it isn't cached or is stale."""
+        template_path = current_app.config.get('REPORT_TEMPLATE_PATH')
+        key = (template_path, template_file_name)
+
+        if (entry := self._templates.get(key)) and \
+                not (current_app.config.get('DEBUG') and TemplateRegistry._is_stale(entry[2])):
+            return entry
+
+        template_file = Path(f'{template_path}/{template_file_name}')
+        mtime = template_file.stat().st_mtime
+        part_files = {}
+        template_code = substitute_template_parts(template_path, template_file.read_text(), part_files)
+
+        mtimes = {part_file: part_file.stat().st_mtime for part_file in part_files}
+        mtimes[template_file] = mtime
+        entry = (template_code, hashlib.sha256(template_code.encode('utf-8')).hexdigest(), mtimes)
+        with self._lock:
+            self._templates[key] = entry
+        return entry
+
+    def clear(self):
+        """Remove all the assembled templates."""
+        with self._lock:
+            self._templates.clear()
+
+    @staticmethod
+    def _is_stale(mtimes: Dict[Path, float]) -> bool:
+        """Return True if any of the files of an assembled template changed since it was assembled."""
+        try:
+            return any(file.stat().st_mtime != mtime for file, mtime in mtimes.items())
+        except FileNotFoundError:
+            return True
+
+
+template_registry = TemplateRegistry()  # pylint: disable=invalid-name; shared variables are lower case.
@@ -26,7 +26,11 @@ from .business_resolutions import ResolutionResource
 from .business_share_classes import ShareClassResource
 from .business_tasks import TaskListResource
 from .filing_comments import CommentResource
-from .internal_services import InternalBusinessResource
+from .internal_services import (
+    InternalAuthorizationCacheResource,
+    InternalBusinessResource,
+    InternalDocumentStoreResource,
+)
 
 
 __all__ = ('API')
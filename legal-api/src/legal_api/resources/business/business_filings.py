@@ -16,7 +16,7 @@
 Provides all the search and retrieval from the business entity datastore.
 """
 from http import HTTPStatus
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
 import requests  # noqa: I001; grouping out of order to make both pylint & isort happy
 from requests import exceptions  # noqa: I001; grouping out of order to make both pylint & isort happy
@@ -24,6 +24,7 @@ from flask import current_app, g, jsonify, request
 from flask_babel import _
 from flask_jwt_oidc import JwtManager
 from flask_restx import Resource, cors
+from sqlalchemy import exc
 from werkzeug.local import LocalProxy
 
 import legal_api.reports
@@ -130,11 +131,10 @@ class ListFilingResource(Resource):
                 HTTPStatus.NOT_ACCEPTABLE
 
         rv = []
-        filings = CoreFiling.get_filings_by_status(business.id,
-                                                   [Filing.Status.COMPLETED.value, Filing.Status.PAID.value])
-        for filing in filings:
-            filing_json = filing.raw
-            filing_json['filing']['documents'] = DocumentMetaService().get_documents(filing_json)
+        filings = CoreFiling.get_raw_filings_by_status(business.id,
+                                                       [Filing.Status.COMPLETED.value, Filing.Status.PAID.value])
+        for filing_json in filings:
+            filing_json['filing']['documents'] = DocumentMetaService().get_documents(filing_json, business)
             rv.append(filing_json)
 
         return jsonify(filings=rv)
@@ -379,7 +379,7 @@ class ListFilingResource(Resource):
                 raise KeyError
             if not ListFilingResource._is_before_epoch_filing(filing.filing_json, business):
                 payload = {'filing': {'id': filing.id}}
-                queue.publish_json(payload)
+                queue.publish_json(payload).result(timeout=queue.publish_timeout)
             else:
                 epoch_filing = Filing.get_filings_by_status(business_id=business.id, status=[Filing.Status.EPOCH.value])
                 filing.transaction_id = epoch_filing[0].transaction_id
@@ -674,6 +674,7 @@ class ListFilingResource(Resource):
             if fe_date:
                 filing.effective_date = datetime.datetime.fromisoformat(fe_date)
                 filing.save()
+                ListFilingResource._schedule_filing(filing)
 
         elif business.legal_type != 'CP':
             if filing_type == 'changeOfAddress':
@@ -681,6 +682,22 @@ class ListFilingResource(Resource):
                 filing.filing_json['filing']['header']['futureEffectiveDate'] = effective_date
                 filing.effective_date = effective_date
                 filing.save()
+                ListFilingResource._schedule_filing(filing)
+
+    @staticmethod
+    def _schedule_filing(filing: Filing):
+        """Let the future effective filings scheduler know of the effective date, if it is in the future.
+
+        The scheduler rebuilds its schedule from the PAID filings periodically, so a lost message only
+        delays the filing to the next rebuild.
+        """
+        subject = current_app.config.get('NATS_SCHEDULER_SUBJECT')
+        effective_date = filing.effective_date
+        if not effective_date.tzinfo:
+            effective_date = effective_date.replace(tzinfo=datetime.timezone.utc)
+        if subject and effective_date > datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc):
+            queue.publish_json({'filing': {'id': filing.id, 'effectiveDate': filing.effective_date.isoformat()}},
+                               subject)
 
     @staticmethod
     def _is_future_effective_filing(filing_json: dict) -> bool:
@@ -693,7 +710,7 @@ class ListFilingResource(Resource):
 
 
 @cors_preflight('GET, POST, PUT, PATCH, DELETE')
-@API.route('/internal/filings', methods=['GET', 'OPTIONS'])
+@API.route('/internal/filings', methods=['GET', 'PATCH', 'OPTIONS'])
 @API.route('/internal/filings/<string:status>', methods=['GET', 'OPTIONS'])
 @API.route('/internal/filings/<int:filing_id>', methods=['PATCH', 'OPTIONS'])
 class InternalFilings(Resource):
@@ -702,30 +719,42 @@ class InternalFilings(Resource):
     @staticmethod
     @cors.crossdomain(origin='*')
     def get(status=None):
-        """Get filings by status formatted in json."""
+        """Get filings by status formatted in json.
+
+        Without a status, get a page of the completed filings to send to COLIN, starting after the filing id
+        given as afterId, where next is the afterId of the next page, or None on the last one.
+        """
         pending_filings = []
         filings = []
 
         if status is None:
-            pending_filings = Filing.get_completed_filings_for_colin()
-            for filing in pending_filings:
+            after_id, limit, err = _get_page_args()
+            if err:
+                return jsonify(err), HTTPStatus.BAD_REQUEST
+
+            pending_filings = Filing.get_completed_filings_for_colin(after_id, limit)
+            corrected_colin_ids = ColinEventId.get_by_filing_ids([
+                filing.filing_json['filing']['correction']['correctedFilingId']
+                for filing, *_ in pending_filings if filing.filing_type == 'correction' and filing.filing_json
+            ])
+            for filing, identifier, legal_type, legal_name in pending_filings:
                 filing_json = filing.filing_json
-                business = Business.find_by_internal_id(filing.business_id)
                 if filing_json and filing.filing_type != 'lear_epoch' and \
-                        (filing.filing_type != 'correction' or business.legal_type != business.LegalTypes.COOP.value):
+                        (filing.filing_type != 'correction' or legal_type != Business.LegalTypes.COOP.value):
                     filing_json['filingId'] = filing.id
                     filing_json['filing']['header']['learEffectiveDate'] = filing.effective_date.isoformat()
                     if not filing_json['filing']['business'].get('legalName'):
-                        business = Business.find_by_internal_id(filing.business_id)
-                        filing_json['filing']['business']['legalName'] = business.legal_name
+                        filing_json['filing']['business']['legalName'] = legal_name
                     if filing.filing_type == 'correction':
-                        colin_ids = \
-                            ColinEventId.get_by_filing_id(filing_json['filing']['correction']['correctedFilingId'])
+                        colin_ids = corrected_colin_ids.get(filing_json['filing']['correction']['correctedFilingId'])
                         if not colin_ids:
                             continue
                         filing_json['filing']['correction']['correctedFilingColinId'] = colin_ids[0]  # should only be 1
                     filings.append(filing_json)
-            return jsonify(filings), HTTPStatus.OK
+            return jsonify({
+                'filings': filings,
+                'next': pending_filings[-1][0].id if len(pending_filings) == limit else None
+            }), HTTPStatus.OK
 
         pending_filings = Filing.get_all_filings_by_status(status)
         for filing in pending_filings:
@@ -735,14 +764,16 @@ class InternalFilings(Resource):
     @staticmethod
     @cors.crossdomain(origin='*')
     @jwt.requires_auth
-    def patch(filing_id):
-        """Patch the colin_event_id for a filing."""
+    def patch(filing_id=None):
+        """Patch the colin_event_id for a filing, or for a batch of filings without a filing_id."""
         # check authorization
         try:
             if not jwt.validate_roles([COLIN_SVC_ROLE]):
                 return jsonify({'message': 'You are not authorized to update the colin id'}), HTTPStatus.UNAUTHORIZED
 
             json_input = request.get_json()
+            if filing_id is None:
+                return InternalFilings._patch_colin_ids(json_input)
             if not json_input:
                 return None, None, {'message': f'No filing json data in body of patch for {filing_id}.'}, \
                     HTTPStatus.BAD_REQUEST
@@ -766,6 +797,125 @@ class InternalFilings(Resource):
             current_app.logger.Error(f'Error patching colin event id for filing with id {filing_id}')
             raise err
 
+    @staticmethod
+    def _patch_colin_ids(json_input: dict):
+        """Add the colin_event_ids of a batch of filings, all or none of them, in one transaction.
+
+        The body is {'filings': [{'filingId': 1, 'colinIds': [2]}]}.
+        """
+        try:
+            colin_ids = {int(filing['filingId']): [int(colin_id) for colin_id in filing['colinIds']]
+                         for filing in json_input['filings']}
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'message': 'Expected a list of filings with a filingId and colinIds.'}), \
+                HTTPStatus.BAD_REQUEST
+
+        filings = Filing.query.filter(Filing.id.in_(colin_ids.keys())).all()
+        if missing := colin_ids.keys() - {filing.id for filing in filings}:
+            return jsonify({'message': f'{sorted(missing)} no filings found'}), HTTPStatus.NOT_FOUND
+        for filing in filings:
+            for colin_id in colin_ids[filing.id]:
+                colin_event_id_obj = ColinEventId()
+                colin_event_id_obj.colin_event_id = colin_id
+                filing.colin_event_ids.append(colin_event_id_obj)
+            db.session.add(filing)
+        try:
+            db.session.commit()
+        except exc.IntegrityError as err:
+            db.session.rollback()
+            current_app.logger.error(f'Error adding colin event ids to filings {sorted(colin_ids)}: {err}')
+            return jsonify({'message': 'One or more of the colin ids are already linked to a filing.'}), \
+                HTTPStatus.BAD_REQUEST
+
+        saved_colin_ids = ColinEventId.get_by_filing_ids(list(colin_ids))
+        return jsonify({'filings': [{'filingId': filing_id, 'colinIds': saved_colin_ids[filing_id]}
+                                    for filing_id in colin_ids]}), HTTPStatus.ACCEPTED
+
+
+def _get_page_args() -> Tuple[int, int, Optional[dict]]:
+    """Return the afterId and limit of the requested page, or an error response."""
+    try:
+        after_id = int(request.args.get('afterId', 0))
+        limit = min(int(request.args.get('limit', 100)), InternalDueFilings.MAX_PAGE_SIZE)
+    except ValueError:
+        return None, None, {'message': 'afterId and limit must be integers.'}
+    if limit < 1:
+        return None, None, {'message': 'limit must be positive.'}
+    return after_id, limit, None
+
+
+@cors_preflight('GET')
+@API.route('/internal/filings/due', methods=['GET', 'OPTIONS'])
+class InternalDueFilings(Resource):
+    """Internal service for the future effective filings job."""
+
+    MAX_PAGE_SIZE = 1000
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def get():
+        """Get the ids of the PAID filings whose effective date has come.
+
+        The page starts after the filing id given as afterId, and next is the afterId of the next page,
+        or None on the last one.
+        """
+        after_id, limit, err = _get_page_args()
+        if err:
+            return jsonify(err), HTTPStatus.BAD_REQUEST
+
+        filing_ids = Filing.get_due_filing_ids(after_id, limit)
+        return jsonify({
+            'filings': filing_ids,
+            'next': filing_ids[-1] if len(filing_ids) == limit else None
+        }), HTTPStatus.OK
+
+
+@cors_preflight('GET')
+@API.route('/internal/filings/scheduled', methods=['GET', 'OPTIONS'])
+class InternalScheduledFilings(Resource):
+    """Internal service for the future effective filings scheduler."""
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def get():
+        """Get the id and effective date of the PAID filings, paged in the same way as the due filings."""
+        after_id, limit, err = _get_page_args()
+        if err:
+            return jsonify(err), HTTPStatus.BAD_REQUEST
+
+        schedule = Filing.get_paid_filing_schedule(after_id, limit)
+        return jsonify({
+            'filings': [{'id': filing_id, 'effectiveDate': effective_date.isoformat()}
+                        for filing_id, effective_date in schedule],
+            'next': schedule[-1][0] if len(schedule) == limit else None
+        }), HTTPStatus.OK
+
+
+@cors_preflight('POST')
+@API.route('/internal/filings/colin_ids', methods=['POST', 'OPTIONS'])
+class InternalKnownColinIds(Resource):
+    """Internal service for the update-legal-filings job."""
+
+    MAX_COLIN_IDS = 1000
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    def post():
+        """Get which of the colin event ids in the body, as {'colinIds': [...]}, are already linked to a filing.
+
+        This is a query, sent as a POST so a batch of ids fits in the body.
+        """
+        json_input = request.get_json()
+        try:
+            colin_ids = [int(colin_id) for colin_id in json_input['colinIds']]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'message': 'Expected a list of colinIds.'}), HTTPStatus.BAD_REQUEST
+        if len(colin_ids) > InternalKnownColinIds.MAX_COLIN_IDS:
+            return jsonify({'message': f'No more than {InternalKnownColinIds.MAX_COLIN_IDS} colinIds at a time.'}), \
+                HTTPStatus.BAD_REQUEST
+
+        return jsonify({'colinIds': ColinEventId.get_known_colin_ids(colin_ids)}), HTTPStatus.OK
+
 
 @cors_preflight('GET, POST, PUT, PATCH, DELETE')
 @API.route('/internal/filings/colin_id', methods=['GET', 'OPTIONS'])
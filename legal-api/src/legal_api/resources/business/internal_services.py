@@ -21,7 +21,9 @@ from flask import jsonify, request
 from flask_restx import Resource, cors
 
 from legal_api.models import Business
-from legal_api.services import COLIN_SVC_ROLE
+from legal_api.reports.document_store import document_store
+from legal_api.services import COLIN_SVC_ROLE, STAFF_ROLE, SYSTEM_ROLE
+from legal_api.services.authz import authz_cache
 from legal_api.utils.auth import jwt
 from legal_api.utils.util import cors_preflight
 
@@ -69,3 +71,50 @@ class InternalBusinessResource(Resource):
             business.save()
 
         return jsonify({'message': 'Successfully updated tax ids.'}), HTTPStatus.CREATED
+
+
+@cors_preflight('GET, DELETE')
+@API.route('/internal/documents', methods=['GET', 'OPTIONS'])
+@API.route('/internal/documents/<int:filing_id>', methods=['DELETE', 'OPTIONS'])
+class InternalDocumentStoreResource(Resource):
+    """The store of the rendered documents of completed filings."""
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    @jwt.requires_auth
+    def get():
+        """Return the hit and miss counts of the document store."""
+        if not (jwt.validate_roles([STAFF_ROLE]) or jwt.validate_roles([SYSTEM_ROLE])):
+            return jsonify({'message': 'You are not authorized to view the document store'}), \
+                HTTPStatus.UNAUTHORIZED
+
+        return jsonify(document_store.stats), HTTPStatus.OK
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    @jwt.requires_auth
+    def delete(filing_id: int):
+        """Remove the stored documents of the filing, so they are rendered again."""
+        if not (jwt.validate_roles([STAFF_ROLE]) or jwt.validate_roles([SYSTEM_ROLE])):
+            return jsonify({'message': 'You are not authorized to invalidate the document store'}), \
+                HTTPStatus.UNAUTHORIZED
+
+        document_store.invalidate(filing_id)
+        return jsonify({'message': f'Removed the stored documents of filing {filing_id}.'}), HTTPStatus.OK
+
+
+@cors_preflight('GET')
+@API.route('/internal/authorizations', methods=['GET', 'OPTIONS'])
+class InternalAuthorizationCacheResource(Resource):
+    """The cache of the authorization decisions of the auth service."""
+
+    @staticmethod
+    @cors.crossdomain(origin='*')
+    @jwt.requires_auth
+    def get():
+        """Return the hit and miss counts of the authorization cache."""
+        if not (jwt.validate_roles([STAFF_ROLE]) or jwt.validate_roles([SYSTEM_ROLE])):
+            return jsonify({'message': 'You are not authorized to view the authorization cache'}), \
+                HTTPStatus.UNAUTHORIZED
+
+        return jsonify(authz_cache.stats), HTTPStatus.OK
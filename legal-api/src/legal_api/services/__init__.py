@@ -18,6 +18,7 @@ from .business_details_version import VersionedBusinessDetailsService
 from .document_meta import DocumentMetaService
 from .flags import Flags
 from .namex import NameXService
+from .payment import PaymentService
 from .queue import QueueService
 
 
@@ -27,4 +28,6 @@ queue = QueueService()  # pylint: disable=invalid-name; shared variables are low
 
 namex = NameXService()  # pylint: disable=invalid-name; shared variables are lower case by Flask convention.
 
+payment = PaymentService()  # pylint: disable=invalid-name; shared variables are lower case by Flask convention.
+
 #  document_meta = DocumentMetaService()  # pylint: disable=invalid-name;
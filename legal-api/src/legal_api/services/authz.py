@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """This manages all of the authentication and authorization service."""
+import time
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import List
+from threading import Lock
+from typing import List, Optional, Tuple
 
-from flask import current_app
+from flask import current_app, g
 from flask_jwt_oidc import JwtManager
 from requests import Session, exceptions
 from requests.adapters import HTTPAdapter
@@ -29,6 +32,86 @@ COLIN_SVC_ROLE = 'colin'
 PUBLIC_USER = 'public_user'
 
 
+class AuthorizationCache():
+    """Bounded LRU cache of the authorization decisions of the auth service, shared by the requests of the process.
+
+    A decision expires after AUTHZ_CACHE_TTL seconds, or when the token it was made for expires.
+    """
+
+    def __init__(self, app=None):
+        """Initialize this object."""
+        self.max_size = 1000
+        self.ttl = 60
+        self._decisions: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize the cache from the app configuration."""
+        self.max_size = app.config.get('AUTHZ_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('AUTHZ_CACHE_TTL', self.ttl)
+        self.clear()
+
+    def get(self, key: Tuple) -> Optional[bool]:
+        """Return the cached decision, or None if there isn't one or it has expired."""
+        with self._lock:
+            if (entry := self._decisions.get(key)) and entry[1] > time.time():
+                self._decisions.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._decisions.pop(key, None)
+            self._misses += 1
+            return None
+
+    def put(self, key: Tuple, decision: bool, token_exp: int = None):
+        """Cache the decision, until the ttl or token expires, whichever is first."""
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._decisions[key] = (decision, expires_at)
+            self._decisions.move_to_end(key)
+            while len(self._decisions) > self.max_size:
+                self._decisions.popitem(last=False)
+
+    def clear(self):
+        """Remove all the cached decisions, and reset the counts."""
+        with self._lock:
+            self._decisions.clear()
+            self._hits = 0
+            self._misses = 0
+
+    @property
+    def stats(self) -> dict:
+        """Return the hit and miss counts, and the number of cached decisions."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'size': len(self._decisions)}
+
+
+authz_cache = AuthorizationCache()  # pylint: disable=invalid-name; shared variables are lower case.
+
+
+def _auth_session() -> Session:
+    """Return a session to the auth service, that retries on server errors."""
+    http = Session()
+    retries = Retry(total=5,
+                    backoff_factor=0.1,
+                    status_forcelist=[500, 502, 503, 504])
+    http.mount('http://', HTTPAdapter(max_retries=retries))
+    http.mount('https://', HTTPAdapter(max_retries=retries))
+    return http
+
+
+# long lived, so the connections to the auth service are pooled and reused
+_session = _auth_session()  # pylint: disable=invalid-name
+
+
 def authorized(  # pylint: disable=too-many-return-statements
         identifier: str, jwt: JwtManager, action: List[str]) -> bool:
     """Assert that the user is authorized to create filings against the business identifier."""
@@ -50,22 +133,27 @@ def authorized(  # pylint: disable=too-many-return-statements
         template_url = current_app.config.get('AUTH_SVC_URL')
         auth_url = template_url.format(**vars())
 
+        # decisions are only cached for tokens that have been validated, ie. of requests that require auth
+        token_info = g.get('jwt_oidc_token_info') or {}
+        cache_key = None
+        if subject := token_info.get('sub'):
+            cache_key = (subject, identifier, tuple(sorted(action)))
+            if (decision := authz_cache.get(cache_key)) is not None:
+                return decision
+
         token = jwt.get_token_auth_header()
         headers = {'Authorization': 'Bearer ' + token}
         try:
-            http = Session()
-            retries = Retry(total=5,
-                            backoff_factor=0.1,
-                            status_forcelist=[500, 502, 503, 504])
-            http.mount('http://', HTTPAdapter(max_retries=retries))
-            rv = http.get(url=auth_url, headers=headers)
-
-            if rv.status_code != HTTPStatus.OK \
-                    or not rv.json().get('roles'):
+            rv = _session.get(url=auth_url, headers=headers)
+
+            if rv.status_code != HTTPStatus.OK:
                 return False
 
-            if all(elem.lower() in rv.json().get('roles') for elem in action):
-                return True
+            roles = rv.json().get('roles')
+            decision = bool(roles) and all(elem.lower() in roles for elem in action)
+            if cache_key:
+                authz_cache.put(cache_key, decision, token_info.get('exp'))
+            return decision
 
         except (exceptions.ConnectionError,  # pylint: disable=broad-except
                 exceptions.Timeout,
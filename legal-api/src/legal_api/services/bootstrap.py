@@ -17,6 +17,8 @@ import contextlib
 import json
 import secrets
 import string
+import threading
+import time
 from http import HTTPStatus
 from typing import Dict, Union
 
@@ -90,11 +92,19 @@ class RegistrationBootstrapService:
 class AccountService:
     """Wrapper to call Authentication Services.
 
-    @TODO Cache and refresh / retry token as needed to reduce calls.
+    The service account token is cached for the process, and refreshed shortly before it expires,
+    or when it gets rejected.
     """
 
     BEARER: str = 'Bearer '
     CONTENT_TYPE_JSON = {'Content-Type': 'application/json'}
+    # seconds before the token expires that it gets refreshed
+    TOKEN_REFRESH_MARGIN = 60
+
+    _token_lock = threading.Lock()
+    _token: str = None
+    _token_key: tuple = None
+    _token_refresh_at: float = 0
 
     try:
         timeout = int(current_app.config.get('ACCOUNT_SVC_TIMEOUT', 20))
@@ -103,9 +113,33 @@ class AccountService:
 
     @classmethod
     def get_bearer_token(cls):
-        """Get a valid Bearer token for the service to use."""
+        """Get a valid Bearer token for the service to use.
+
+        The token is only requested when the cached one is about to expire, by a single thread at a time.
+        """
         token_url = current_app.config.get('ACCOUNT_SVC_AUTH_URL')
         client_id = current_app.config.get('ACCOUNT_SVC_CLIENT_ID')
+        token_key = (token_url, client_id)
+
+        if cls._token_key == token_key and time.monotonic() < cls._token_refresh_at and (token := cls._token):
+            return token
+
+        with cls._token_lock:
+            # another thread may have refreshed it while this one waited on the lock
+            if cls._token_key == token_key and time.monotonic() < cls._token_refresh_at and (token := cls._token):
+                return token
+
+            requested_at = time.monotonic()
+            token, expires_in = cls._request_bearer_token(token_url, client_id)
+            if token:
+                cls._token = token
+                cls._token_key = token_key
+                cls._token_refresh_at = requested_at + max(expires_in - cls.TOKEN_REFRESH_MARGIN, 0)
+            return token
+
+    @classmethod
+    def _request_bearer_token(cls, token_url: str, client_id: str):
+        """Return a new token for the service account and the seconds it expires in, or None."""
         client_secret = current_app.config.get('ACCOUNT_SVC_CLIENT_SECRET')
 
         data = 'grant_type=client_credentials'
@@ -118,9 +152,39 @@ class AccountService:
                             timeout=cls.timeout)
 
         try:
-            return res.json().get('access_token')
+            res_json = res.json()
+            return res_json.get('access_token'), int(res_json.get('expires_in') or 0)
         except Exception:
-            return None
+            return None, 0
+
+    @classmethod
+    def invalidate_bearer_token(cls, token: str = None):
+        """Remove the cached token, so the next call gets a new one.
+
+        If a token is given, it is only removed if it is still the cached one.
+        """
+        with cls._token_lock:
+            if token is None or token == cls._token:
+                cls._token = None
+                cls._token_refresh_at = 0
+
+    @classmethod
+    def _request_with_token(cls, method: str, url: str, token: str, **kwargs) -> requests.Response:
+        """Make the request with the token, retrying once with a new token if the token is rejected."""
+        def _request(bearer_token):
+            return requests.request(method,
+                                    url=url,
+                                    headers={**cls.CONTENT_TYPE_JSON,
+                                             'Authorization': cls.BEARER + bearer_token},
+                                    timeout=cls.timeout,
+                                    **kwargs)
+
+        response = _request(token)
+        if response.status_code == HTTPStatus.UNAUTHORIZED:
+            cls.invalidate_bearer_token(token)
+            if (new_token := cls.get_bearer_token()) and new_token != token:
+                response = _request(new_token)
+        return response
 
     @classmethod
     def create_affiliation(cls, account: int,
@@ -142,32 +206,34 @@ class AccountService:
                                   'corpTypeCode': corp_type_code,
                                   'name': business_name or business_registration
                                   })
-        entity_record = requests.post(
-            url=account_svc_entity_url,
-            headers={**cls.CONTENT_TYPE_JSON,
-                     'Authorization': cls.BEARER + token},
-            data=entity_data,
-            timeout=cls.timeout
-        )
+        entity_record = cls._request_with_token('POST', account_svc_entity_url, token, data=entity_data)
 
         # Create an account:business affiliation
         affiliate_data = json.dumps({
             'businessIdentifier': business_registration,
             'passCode': ''
         })
-        affiliate = requests.post(
-            url=account_svc_affiliate_url,
-            headers={**cls.CONTENT_TYPE_JSON,
-                     'Authorization': cls.BEARER + token},
-            data=affiliate_data,
-            timeout=cls.timeout
-        )
+        affiliate = cls._request_with_token('POST', account_svc_affiliate_url, token, data=affiliate_data)
 
         # @TODO delete affiliation and entity record next sprint when affiliation service is updated
         if affiliate.status_code != HTTPStatus.CREATED or entity_record.status_code != HTTPStatus.CREATED:
             return HTTPStatus.BAD_REQUEST
         return HTTPStatus.OK
 
+    @classmethod
+    def get_affiliation(cls, account: int, business_registration: str) -> int:
+        """Return OK if the business is affiliated to the account, NOT_FOUND if not, or the status of the failure."""
+        template_url = current_app.config.get('ACCOUNT_SVC_AFFILIATE_URL')
+        account_svc_affiliate_url = template_url.format(account_id=account)
+
+        token = cls.get_bearer_token()
+
+        if not token:
+            return HTTPStatus.UNAUTHORIZED
+
+        affiliate = cls._request_with_token('GET', account_svc_affiliate_url + '/' + business_registration, token)
+        return affiliate.status_code
+
     @classmethod
     def update_entity(cls,
                       business_registration: str,
@@ -187,13 +253,8 @@ class AccountService:
             'corpTypeCode': corp_type_code,
             'name': business_name
         })
-        entity_record = requests.patch(
-            url=account_svc_entity_url + '/' + business_registration,
-            headers={**cls.CONTENT_TYPE_JSON,
-                     'Authorization': cls.BEARER + token},
-            data=entity_data,
-            timeout=cls.timeout
-        )
+        entity_record = cls._request_with_token('PATCH', account_svc_entity_url + '/' + business_registration, token,
+                                                data=entity_data)
 
         if entity_record.status_code != HTTPStatus.OK:
             return HTTPStatus.BAD_REQUEST
@@ -212,19 +273,9 @@ class AccountService:
         token = cls.get_bearer_token()
 
         # Delete an account:business affiliation
-        affiliate = requests.delete(
-            url=account_svc_affiliate_url + '/' + business_registration,
-            headers={**cls.CONTENT_TYPE_JSON,
-                     'Authorization': cls.BEARER + token},
-            timeout=cls.timeout
-        )
+        affiliate = cls._request_with_token('DELETE', account_svc_affiliate_url + '/' + business_registration, token)
         # Delete an entity record
-        entity_record = requests.delete(
-            url=account_svc_entity_url + '/' + business_registration,
-            headers={**cls.CONTENT_TYPE_JSON,
-                     'Authorization': cls.BEARER + token},
-            timeout=cls.timeout
-        )
+        entity_record = cls._request_with_token('DELETE', account_svc_entity_url + '/' + business_registration, token)
 
         if affiliate.status_code != HTTPStatus.OK \
                 or entity_record.status_code not in (HTTPStatus.OK, HTTPStatus.NO_CONTENT):
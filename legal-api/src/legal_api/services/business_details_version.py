@@ -14,9 +14,10 @@
 
 """This provides the service for getting business details as of a filing."""
 # pylint: disable=singleton-comparison ; pylint does not recognize sqlalchemy ==
+import copy
+from collections import defaultdict
 from datetime import datetime
 
-import pycountry
 from sqlalchemy import or_
 from sqlalchemy_continuum import version_class
 
@@ -29,10 +30,12 @@ from legal_api.models import (
     Party,
     PartyRole,
     Resolution,
+    RevisionSnapshot,
     ShareClass,
     ShareSeries,
     db,
 )
+from legal_api.utils.country import get_country
 
 
 class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-methods
@@ -40,10 +43,73 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
 
     @staticmethod
     def get_revision(filing_id, business_id):
-        """Consolidates based on filing type upto the given transaction id of a filing."""
-        business = Business.find_by_internal_id(business_id)
+        """Consolidates based on filing type upto the given transaction id of a filing.
+
+        The revision is read from the snapshot written when the filing was completed, and only
+        rebuilt from the version tables if there is no snapshot.
+        """
         filing = Filing.find_by_id(filing_id)
+        if (snapshot := RevisionSnapshot.find(filing.id, filing.transaction_id)) and snapshot.filing_json:
+            revision_json = copy.deepcopy(snapshot.filing_json)
+            revision_json['filing']['header'] = VersionedBusinessDetailsService.get_header_revision(filing)
+            return revision_json
+
+        business = Business.find_by_internal_id(business_id)
+        return VersionedBusinessDetailsService.build_revision(filing, business)
+
+    @staticmethod
+    def save_revision_snapshot(filing, business) -> RevisionSnapshot:
+        """Add the snapshot of the filing revisions to the session, without committing.
+
+        This must be called once the changes of the filing have been made in the session and the
+        filing has its transaction id, so that it lands in the same commit as the filing.
+        """
+        # make sure the version rows of this transaction are visible to the revision queries
+        db.session.flush()
+
+        filing_json = VersionedBusinessDetailsService.build_revision(filing, business)
+        del filing_json['filing']['header']
+        snapshot = RevisionSnapshot(
+            filing_id=filing.id,
+            transaction_id=filing.transaction_id,
+            filing_json=filing_json,
+            company_details_json=VersionedBusinessDetailsService.build_company_details_revision(filing, business)
+        )
+        snapshot.save_to_session()
+        return snapshot
 
+    @staticmethod
+    def backfill_revision_snapshots(batch_size: int = 100) -> int:  # pylint: disable=protected-access
+        """Write the snapshots of the completed filings that don't have one, committing after each batch.
+
+        Returns the number of snapshots written.
+        """
+        count = 0
+        last_filing_id = 0
+        while True:
+            filings = db.session.query(Filing). \
+                outerjoin(RevisionSnapshot, Filing.id == RevisionSnapshot.filing_id). \
+                filter(Filing._status == Filing.Status.COMPLETED.value). \
+                filter(Filing.transaction_id.isnot(None)). \
+                filter(Filing.business_id.isnot(None)). \
+                filter(RevisionSnapshot.filing_id.is_(None)). \
+                filter(Filing.id > last_filing_id). \
+                order_by(Filing.id). \
+                limit(batch_size). \
+                all()
+            if not filings:
+                return count
+
+            for filing in filings:
+                business = Business.find_by_internal_id(filing.business_id)
+                VersionedBusinessDetailsService.save_revision_snapshot(filing, business)
+                count += 1
+            last_filing_id = filings[-1].id
+            db.session.commit()
+
+    @staticmethod
+    def build_revision(filing, business):
+        """Rebuild the filing revision from the version tables."""
         revision_json = {}
         revision_json['filing'] = {}
         if filing.filing_type == 'incorporationApplication':
@@ -186,22 +252,34 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
 
     @staticmethod
     def get_company_details_revision(filing_id, business_id) -> dict:
-        """Consolidates company details upto the given transaction id of a filing."""
-        company_profile_json = {}
-        business = Business.find_by_internal_id(business_id)
+        """Consolidates company details upto the given transaction id of a filing.
+
+        The details are read from the snapshot written when the filing was completed, and only
+        rebuilt from the version tables if there is no snapshot.
+        """
         filing = Filing.find_by_id(filing_id)
+        if (snapshot := RevisionSnapshot.find(filing.id, filing.transaction_id)) and snapshot.company_details_json:
+            return copy.deepcopy(snapshot.company_details_json)
+
+        business = Business.find_by_internal_id(business_id)
+        return VersionedBusinessDetailsService.build_company_details_revision(filing, business)
+
+    @staticmethod
+    def build_company_details_revision(filing, business) -> dict:
+        """Rebuild the company details of the filing from the version tables."""
+        company_profile_json = {}
         company_profile_json['business'] = \
             VersionedBusinessDetailsService.get_business_revision(filing.transaction_id, business)
         company_profile_json['parties'] = \
-            VersionedBusinessDetailsService.get_party_role_revision(filing.transaction_id, business_id)
+            VersionedBusinessDetailsService.get_party_role_revision(filing.transaction_id, business.id)
         company_profile_json['offices'] = \
-            VersionedBusinessDetailsService.get_office_revision(filing.transaction_id, business_id)
+            VersionedBusinessDetailsService.get_office_revision(filing.transaction_id, business.id)
         company_profile_json['shareClasses'] = \
-            VersionedBusinessDetailsService.get_share_class_revision(filing.transaction_id, business_id)
+            VersionedBusinessDetailsService.get_share_class_revision(filing.transaction_id, business.id)
         company_profile_json['nameTranslations'] = \
-            VersionedBusinessDetailsService.get_name_translations_revision(filing.transaction_id, business_id)
+            VersionedBusinessDetailsService.get_name_translations_revision(filing.transaction_id, business.id)
         company_profile_json['resolutions'] = \
-            VersionedBusinessDetailsService.get_resolution_dates_revision(filing.transaction_id, business_id)
+            VersionedBusinessDetailsService.get_resolution_dates_revision(filing.transaction_id, business.id)
         return company_profile_json
 
     @staticmethod
@@ -257,17 +335,24 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
             .filter(or_(offices_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
                         offices_version.end_transaction_id > transaction_id)) \
             .order_by(offices_version.transaction_id).all()
+        if not offices:
+            return offices_json
+
+        # all the addresses of all the offices in one round trip
+        addresses_by_office = defaultdict(list)
+        addresses_list = db.session.query(address_version) \
+            .filter(address_version.transaction_id <= transaction_id) \
+            .filter(address_version.operation_type != 2) \
+            .filter(address_version.office_id.in_([office.id for office in offices])) \
+            .filter(or_(address_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
+                        address_version.end_transaction_id > transaction_id)) \
+            .order_by(address_version.transaction_id).all()
+        for address in addresses_list:
+            addresses_by_office[address.office_id].append(address)
 
         for office in offices:
             offices_json[office.office_type] = {}
-            addresses_list = db.session.query(address_version) \
-                .filter(address_version.transaction_id <= transaction_id) \
-                .filter(address_version.operation_type != 2) \
-                .filter(address_version.office_id == office.id) \
-                .filter(or_(address_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
-                            address_version.end_transaction_id > transaction_id)) \
-                .order_by(address_version.transaction_id).all()
-            for address in addresses_list:
+            for address in addresses_by_office[office.id]:
                 offices_json[office.office_type][f'{address.address_type}Address'] = \
                     VersionedBusinessDetailsService.address_revision_json(address)
 
@@ -275,27 +360,45 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
 
     @staticmethod
     def get_party_role_revision(transaction_id, business_id, is_ia_or_after=False, role=None) -> dict:
-        """Consolidates all party changes upto the given transaction id."""
+        """Consolidates all party changes upto the given transaction id.
+
+        The party roles, their parties and the party addresses are each loaded in a single query,
+        so the number of round trips doesn't depend on the number of parties.
+        """
         party_role_version = version_class(PartyRole)
-        party_roles = db.session.query(party_role_version)\
+        party_version = version_class(Party)
+        party_roles = db.session.query(party_role_version, party_version) \
+            .join(party_version, party_version.id == party_role_version.party_id) \
             .filter(party_role_version.transaction_id <= transaction_id) \
             .filter(party_role_version.operation_type != 2) \
             .filter(party_role_version.business_id == business_id) \
+            .filter(party_role_version.cessation_date == None) \
             .filter(or_(role == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
                         party_role_version.role == role)) \
             .filter(or_(party_role_version.end_transaction_id == None,   # pylint: disable=singleton-comparison # noqa: E711,E501;
                         party_role_version.end_transaction_id > transaction_id)) \
+            .filter(party_version.transaction_id <= transaction_id) \
+            .filter(party_version.operation_type != 2) \
+            .filter(or_(party_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
+                        party_version.end_transaction_id > transaction_id)) \
             .order_by(party_role_version.transaction_id).all()
+
+        address_ids = set()
+        for _, party_revision in party_roles:
+            address_ids.update((party_revision.delivery_address_id, party_revision.mailing_address_id))
+        addresses = VersionedBusinessDetailsService.get_address_revisions(transaction_id, address_ids)
+
         parties = []
-        for party_role in party_roles:
-            if party_role.cessation_date is None:
-                party_role_json = VersionedBusinessDetailsService.party_role_revision_json(transaction_id,
-                                                                                           party_role, is_ia_or_after)
-                if 'roles' in party_role_json and (party := next((x for x in parties if x['officer']['id']
-                                                                  == party_role_json['officer']['id']), None)):
-                    party['roles'].extend(party_role_json['roles'])
-                else:
-                    parties.append(party_role_json)
+        parties_by_id = {}
+        for party_role, party_revision in party_roles:
+            party_role_json = VersionedBusinessDetailsService.party_role_revision_json(party_role, party_revision,
+                                                                                       addresses, is_ia_or_after)
+            if 'roles' in party_role_json and (party := parties_by_id.get(party_role_json['officer']['id'])):
+                party['roles'].extend(party_role_json['roles'])
+            else:
+                parties.append(party_role_json)
+                if 'roles' in party_role_json:
+                    parties_by_id[party_role_json['officer']['id']] = party_role_json
 
         return parties
 
@@ -310,34 +413,41 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
             .filter(or_(share_class_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
                         share_class_version.end_transaction_id > transaction_id)) \
             .order_by(share_class_version.transaction_id).all()
+        share_series = VersionedBusinessDetailsService.get_share_series_revision(
+            transaction_id, [share_class.id for share_class in share_classes_list])
         share_classes = []
         for share_class in share_classes_list:
             share_class_json = VersionedBusinessDetailsService.share_class_revision_json(share_class)
-            share_class_json['series'] = VersionedBusinessDetailsService.get_share_series_revision(transaction_id,
-                                                                                                   share_class.id)
+            share_class_json['series'] = share_series[share_class.id]
             share_class_json['type'] = 'Class'
             share_class_json['id'] = str(share_class_json['id'])
             share_classes.append(share_class_json)
         return share_classes
 
     @staticmethod
-    def get_share_series_revision(transaction_id, share_class_id) -> dict:
-        """Consolidates all share series under the share class upto the given transaction id."""
+    def get_share_series_revision(transaction_id, share_class_ids) -> dict:
+        """Consolidates all share series under the share classes upto the given transaction id.
+
+        Returns the share series json by share class id.
+        """
+        share_series_by_class = defaultdict(list)
+        if not share_class_ids:
+            return share_series_by_class
+
         share_series_version = version_class(ShareSeries)
         share_series_list = db.session.query(share_series_version) \
             .filter(share_series_version.transaction_id <= transaction_id) \
             .filter(share_series_version.operation_type != 2) \
-            .filter(share_series_version.share_class_id == share_class_id) \
+            .filter(share_series_version.share_class_id.in_(share_class_ids)) \
             .filter(or_(share_series_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
                         share_series_version.end_transaction_id > transaction_id)) \
             .order_by(share_series_version.transaction_id).all()
-        share_series_arr = []
         for share_series in share_series_list:
             share_series_json = VersionedBusinessDetailsService.share_series_revision_json(share_series)
             share_series_json['type'] = 'Series'
             share_series_json['id'] = str(share_series_json['id'])
-            share_series_arr.append(share_series_json)
-        return share_series_arr
+            share_series_by_class[share_series.share_class_id].append(share_series_json)
+        return share_series_by_class
 
     @staticmethod
     def get_name_translations_revision(transaction_id, business_id) -> dict:
@@ -392,12 +502,11 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
         return resolutions_arr
 
     @staticmethod
-    def party_role_revision_json(transaction_id, party_role_revision, is_ia_or_after) -> dict:
+    def party_role_revision_json(party_role_revision, party_revision, addresses, is_ia_or_after) -> dict:
         """Return the party member as a json object."""
         cessation_date = datetime.date(party_role_revision.cessation_date).isoformat()\
             if party_role_revision.cessation_date else None
-        party_revision = VersionedBusinessDetailsService.get_party_revision(transaction_id, party_role_revision)
-        party = VersionedBusinessDetailsService.party_revision_json(transaction_id, party_revision, is_ia_or_after)
+        party = VersionedBusinessDetailsService.party_revision_json(party_revision, addresses, is_ia_or_after)
 
         if is_ia_or_after:
             party['roles'] = [{
@@ -415,19 +524,6 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
 
         return party
 
-    @staticmethod
-    def get_party_revision(transaction_id, party_role_revision) -> dict:
-        """Consolidates all party changes upto the given transaction id."""
-        party_version = version_class(Party)
-        party = db.session.query(party_version) \
-            .filter(party_version.transaction_id <= transaction_id) \
-            .filter(party_version.operation_type != 2) \
-            .filter(party_version.id == party_role_revision.party_id) \
-            .filter(or_(party_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
-                        party_version.end_transaction_id > transaction_id)) \
-            .order_by(party_version.transaction_id).one_or_none()
-        return party
-
     @staticmethod
     def party_revision_type_json(party_revision, is_ia_or_after) -> dict:
         """Return the party member by type as a json object."""
@@ -455,26 +551,23 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
         return member
 
     @staticmethod
-    def party_revision_json(transaction_id, party_revision, is_ia_or_after) -> dict:
-        """Return the party member as a json object."""
+    def party_revision_json(party_revision, addresses, is_ia_or_after) -> dict:
+        """Return the party member as a json object, using the address revisions indexed by id."""
         member = VersionedBusinessDetailsService.party_revision_type_json(party_revision, is_ia_or_after)
         if party_revision.delivery_address_id:
             member_address = VersionedBusinessDetailsService.address_revision_json(
-                VersionedBusinessDetailsService.get_address_revision
-                (transaction_id, party_revision.delivery_address_id))
+                addresses[party_revision.delivery_address_id])
             if 'addressType' in member_address:
                 del member_address['addressType']
             member['deliveryAddress'] = member_address
         if party_revision.mailing_address_id:
-            member_mailing_address = \
-                VersionedBusinessDetailsService.address_revision_json(
-                    VersionedBusinessDetailsService.get_address_revision
-                    (transaction_id, party_revision.mailing_address_id))
+            member_mailing_address = VersionedBusinessDetailsService.address_revision_json(
+                addresses[party_revision.mailing_address_id])
             if 'addressType' in member_mailing_address:
                 del member_mailing_address['addressType']
             member['mailingAddress'] = member_mailing_address
         else:
-            if party_revision.delivery_address:
+            if 'deliveryAddress' in member:
                 member['mailingAddress'] = member['deliveryAddress']
 
         if is_ia_or_after:
@@ -485,24 +578,28 @@ class VersionedBusinessDetailsService:  # pylint: disable=too-many-public-method
         return member
 
     @staticmethod
-    def get_address_revision(transaction_id, address_id) -> dict:
-        """Consolidates all party changes upto the given transaction id."""
+    def get_address_revisions(transaction_id, address_ids) -> dict:
+        """Return the revisions of the addresses as of the given transaction id, by address id."""
+        address_ids = [address_id for address_id in address_ids if address_id]
+        if not address_ids:
+            return {}
+
         address_version = version_class(Address)
-        address = db.session.query(address_version) \
+        addresses = db.session.query(address_version) \
             .filter(address_version.transaction_id <= transaction_id) \
             .filter(address_version.operation_type != 2) \
-            .filter(address_version.id == address_id) \
+            .filter(address_version.id.in_(address_ids)) \
             .filter(or_(address_version.end_transaction_id == None,  # pylint: disable=singleton-comparison # noqa: E711,E501;
                         address_version.end_transaction_id > transaction_id)) \
-            .order_by(address_version.transaction_id).one_or_none()
-        return address
+            .all()
+        return {address.id: address for address in addresses}
 
     @staticmethod
     def address_revision_json(address_revision):
         """Return a dict of this object, with keys in JSON format."""
         country_description = ''
         if address_revision.country:
-            country_description = pycountry.countries.search_fuzzy(address_revision.country)[0].name
+            country_description = get_country(address_revision.country).name
         return {
             'streetAddress': address_revision.street,
             'streetAddressAdditional': address_revision.street_additional,
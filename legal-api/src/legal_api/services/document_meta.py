@@ -47,15 +47,19 @@ class DocumentMetaService():
         self._filing_id = None
         self._filing_date = None
 
-    def get_documents(self, filing: dict):
-        """Return an array of document meta for a filing."""
+    def get_documents(self, filing: dict, business: Business = None):
+        """Return an array of document meta for a filing.
+
+        The business can be passed in by callers that already have it, to avoid looking it up for every filing.
+        """
         # look up legal type
         self._business_identifier = filing['filing']['business']['identifier']
         # if this is a temp registration then there is no business, so get legal type from filing
         if self._business_identifier.startswith('T'):
             self._legal_type = filing['filing']['incorporationApplication']['nameRequest']['legalType']
         else:
-            business = Business.find_by_identifier(self._business_identifier)
+            if not business or business.identifier != self._business_identifier:
+                business = Business.find_by_identifier(self._business_identifier)
             if not business:
                 return []  # business not found
             self._legal_type = business.legal_type
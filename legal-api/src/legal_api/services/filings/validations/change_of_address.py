@@ -16,11 +16,11 @@ import json
 from http import HTTPStatus
 from typing import Dict
 
-import pycountry
 from flask_babel import _
 
 from legal_api.errors import Error
 from legal_api.models import Business
+from legal_api.utils.country import get_country
 
 
 def validate(business: Business, cod: Dict) -> Error:
@@ -45,7 +45,7 @@ def validate(business: Business, cod: Dict) -> Error:
                             'path': path})
 
             try:
-                country = pycountry.countries.search_fuzzy(country)[0].alpha_2
+                country = get_country(country).alpha_2
                 if country != 'CA':
                     raise LookupError
             except LookupError:
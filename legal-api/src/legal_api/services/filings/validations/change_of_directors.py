@@ -15,11 +15,11 @@
 from http import HTTPStatus
 from typing import Dict, List
 
-import pycountry
 from flask_babel import _ as babel  # noqa: N813, I004, I001; importing camelcase '_' as a name
 
 from legal_api.errors import Error
 from legal_api.models import Address, Business, Filing
+from legal_api.utils.country import get_country
 from legal_api.utils.datetime import datetime
 from legal_api.utils.legislation_datetime import LegislationDatetime
 
@@ -60,7 +60,7 @@ def validate_directors_addresses(cod: Dict) -> List:
             if address_type in director:
                 try:
                     country = get_str(director, f'/{address_type}/addressCountry')
-                    _ = pycountry.countries.search_fuzzy(country)[0].alpha_2
+                    _ = get_country(country).alpha_2
 
                 except LookupError:
                     msg.append({'error': babel('Address Country must resolve to a valid ISO-2 country.'),
@@ -16,11 +16,11 @@ from datetime import timedelta
 from http import HTTPStatus  # pylint: disable=wrong-import-order
 from typing import Dict, List, Optional
 
-import pycountry
 from flask_babel import _ as babel  # noqa: N813, I004, I001, I003
 
 from legal_api.errors import Error
 from legal_api.models import Business, Filing
+from legal_api.utils.country import get_country
 from legal_api.utils.datetime import datetime as dt
 
 from legal_api.core.filing import Filing as coreFiling  # noqa: I001
@@ -79,7 +79,7 @@ def validate_offices(incorporation_json) -> Error:
                             'path': path})
 
             try:
-                country = pycountry.countries.search_fuzzy(country)[0].alpha_2
+                country = get_country(country).alpha_2
                 if country != 'CA':
                     raise LookupError
             except LookupError:
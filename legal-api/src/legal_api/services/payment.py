@@ -0,0 +1,183 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""This provides the payment details of filings, from the pay-api.
+
+The lookups of a request are made concurrently, over a pooled session and with a timeout.
+Payments in a terminal state can no longer change, so their details are cached for the life of the
+process, while the details of other payments are only cached for a few seconds.
+A circuit breaker stops calling the pay-api for a while once it keeps failing, so a slow or down
+pay-api only leaves the payment details out, instead of holding up the requests.
+"""
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from threading import Lock
+from typing import Dict, List, Optional
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+
+class CircuitBreaker():
+    """Opens after failure_threshold consecutive failures, and lets a trial call through after reset_timeout."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """Initialize this object."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if calls are not allowed through."""
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        """Close the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Count the failure, opening the breaker once there are too many in a row."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class PaymentService():
+    """Looks up the payment details of filings on the pay-api."""
+
+    TERMINAL_STATUSES = frozenset(['COMPLETED', 'CANCELLED'])
+
+    def __init__(self, app=None):
+        """Initialize this object."""
+        self.timeout = 5
+        self.ttl = 10
+        self.max_size = 5000
+        self.max_workers = 8
+        self.breaker = CircuitBreaker()
+        self._session = self._create_session()
+        self._details: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize the session, cache and circuit breaker from the app configuration."""
+        self.timeout = app.config.get('PAYMENT_SVC_TIMEOUT', self.timeout)
+        self.ttl = app.config.get('PAYMENT_STATUS_CACHE_TTL', self.ttl)
+        self.breaker = CircuitBreaker(app.config.get('PAYMENT_SVC_FAILURE_THRESHOLD', 5),
+                                      app.config.get('PAYMENT_SVC_RESET_TIMEOUT', 30))
+        self._session = self._create_session()
+        with self._lock:
+            self._details.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def _create_session(self) -> requests.Session:
+        """Return a session with a connection pool for each of the concurrent lookups."""
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_maxsize=self.max_workers))
+        session.mount('https://', HTTPAdapter(pool_maxsize=self.max_workers))
+        return session
+
+    def get_payment_details(self, payment_tokens: List[str], token: str) -> Dict[str, Optional[dict]]:
+        """Return the isPaymentActionRequired and paymentMethod of each payment, or None if it is unavailable."""
+        details = {}
+        missing = []
+        for payment_token in dict.fromkeys(payment_tokens):
+            if (cached := self._get_cached(payment_token)) is not None:
+                details[payment_token] = cached
+            else:
+                missing.append(payment_token)
+
+        if missing and self.breaker.is_open:
+            current_app.logger.warning(f'Payment service circuit open, skipping {len(missing)} payment lookups.')
+            details.update(dict.fromkeys(missing))
+        elif missing:
+            payment_svc_url = current_app.config.get('PAYMENT_SVC_URL')
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json'
+            }
+            with ThreadPoolExecutor(max_workers=min(len(missing), self.max_workers)) as executor:
+                responses = executor.map(
+                    lambda payment_token: self._request(f'{payment_svc_url}/{payment_token}', headers), missing)
+                for payment_token, response_json in zip(missing, responses):
+                    details[payment_token] = self._cache(payment_token, response_json)
+
+        return details
+
+    def _request(self, url: str, headers: dict) -> Optional[dict]:
+        """Return the pay-api invoice, or None if the pay-api failed to return it."""
+        try:
+            response = self._session.get(url=url, headers=headers, timeout=self.timeout)
+            if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                self.breaker.record_failure()
+                return None
+            self.breaker.record_success()
+            if response.status_code != HTTPStatus.OK:
+                return None
+            return response.json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.breaker.record_failure()
+            return None
+        except ValueError:
+            return None
+
+    def _get_cached(self, payment_token: str) -> Optional[dict]:
+        """Return the cached payment details, or None if they aren't cached or have expired."""
+        with self._lock:
+            if (entry := self._details.get(payment_token)) and (entry[1] is None or entry[1] > time.monotonic()):
+                self._details.move_to_end(payment_token)
+                self._hits += 1
+                return entry[0]
+            self._details.pop(payment_token, None)
+            self._misses += 1
+            return None
+
+    def _cache(self, payment_token: str, response_json: Optional[dict]) -> Optional[dict]:
+        """Cache and return the payment details of the pay-api invoice."""
+        if response_json is None:
+            return None
+
+        details = {
+            'isPaymentActionRequired': response_json.get('isPaymentActionRequired', False),
+            'paymentMethod': response_json.get('paymentMethod', '')
+        }
+        expires_at = None if response_json.get('statusCode') in self.TERMINAL_STATUSES \
+            else time.monotonic() + self.ttl
+        with self._lock:
+            self._details[payment_token] = (details, expires_at)
+            self._details.move_to_end(payment_token)
+            while len(self._details) > self.max_size:
+                self._details.popitem(last=False)
+        return details
+
+    @property
+    def stats(self) -> dict:
+        """Return the hit and miss counts of the cache, and the state of the circuit breaker."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'size': len(self._details),
+                    'circuitOpen': self.breaker.is_open}
@@ -14,12 +14,15 @@
 
 """This provides the service to publish to the queue."""
 import asyncio
+import atexit
 import json
 import logging
 import random
 import string
+import threading
+from concurrent.futures import Future
+from typing import Iterable
 
-from flask import _app_ctx_stack
 from nats.aio.client import Client as NATS, DEFAULT_CONNECT_TIMEOUT  # noqa N814; by convention the name is NATS
 from stan.aio.client import Client as STAN  # noqa N814; by convention the name is STAN
 
@@ -27,39 +30,50 @@ from stan.aio.client import Client as STAN  # noqa N814; by convention the name
 class QueueService():
     """Provides services to use the Queue from Flask.
 
+    A single connection to the queue is kept for the process. It is owned by a background thread
+    running its own event loop, so publishing only hands the message over to that loop and returns
+    a future, without waiting on the queue. The connection is made on the first publish, and made
+    again on the next publish whenever it is lost.
+
     For ease of use, this follows the style of a Flask Extension
     """
 
-    def __init__(self, app=None, loop=None):
+    def __init__(self, app=None):
         """Initialize, supports setting the app context on instantiation."""
         # Default NATS Options
         self.name = 'default_api_client'
         self.nats_options = {}
         self.stan_options = {}
-        self.loop = loop
         self.nats_servers = None
         self.subject = None
+        self.publish_timeout = 10
+
+        self.loop = None
+        self.nats = None
+        self.stan = None
+        self._stan_connected = False
+        self._connect_lock = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
 
         self.logger = logging.getLogger()
 
         if app is not None:
-            self.init_app(app, self.loop)
+            self.init_app(app)
 
-    def init_app(self, app, loop=None,
-                 nats_options=None, stan_options=None):
+    def init_app(self, app, nats_options=None, stan_options=None):
         """Initialize the extension.
 
         :param app: Flask app
         :return: naked
         """
         self.name = app.config.get('NATS_CLIENT_NAME')
-        self.loop = loop or asyncio.get_event_loop()
         self.nats_servers = app.config.get('NATS_SERVERS').split(',')
         self.subject = app.config.get('NATS_FILER_SUBJECT')
+        self.publish_timeout = app.config.get('NATS_PUBLISH_TIMEOUT', self.publish_timeout)
 
         default_nats_options = {
             'name': self.name,
-            'io_loop': self.loop,
             'servers': self.nats_servers,
             'connect_timeout': app.config.get('NATS_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
 
@@ -81,65 +95,123 @@ class QueueService():
              lower().
              strip(string.whitespace)
              ).translate({ord(c): '_' for c in string.punctuation})
-            + '_' + str(random.SystemRandom().getrandbits(0x58))
         }
         if not stan_options:
             stan_options = {}
 
         self.stan_options = {**default_stan_options, **stan_options}
 
-        app.teardown_appcontext(self.teardown)
-
-    def teardown(self, exception):  # pylint: disable=unused-argument; flask method signature
-        """Destroy all objects created by this extension."""
-        try:
-            this_loop = asyncio.get_event_loop()
-            this_loop.run_until_complete(self.close())
-        except RuntimeError as e:
-            self.logger.error(e)
+    def _start(self) -> asyncio.AbstractEventLoop:
+        """Start the background thread that owns the connection, unless it is running."""
+        with self._thread_lock:
+            if not (self._thread and self._thread.is_alive()):
+                self.loop = asyncio.new_event_loop()
+                self._connect_lock = None
+                self._thread = threading.Thread(target=self.loop.run_forever, name='queue-publisher', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+            return self.loop
+
+    def shutdown(self, timeout: float = 5):
+        """Close the connection and stop the background thread."""
+        with self._thread_lock:
+            if not (self._thread and self._thread.is_alive()):
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self.close(), self.loop).result(timeout)
+            except Exception as err:  # pylint: disable=broad-except; stopping regardless
+                self.logger.error('Error closing the queue connection: %s', err)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+            atexit.unregister(self.shutdown)
 
     async def connect(self):
-        """Connect to the queueing service."""
-        ctx = _app_ctx_stack.top
-        if ctx:
-            if not hasattr(ctx, 'nats'):
-                ctx.nats = NATS()
-                ctx.stan = STAN()
-
-            if not ctx.nats.is_connected:
-                self.stan_options = {**self.stan_options, **{'nats': ctx.nats}}
-                await ctx.nats.connect(**self.nats_options)
-                await ctx.stan.connect(**self.stan_options)
+        """Connect to the queueing service, unless already connected.
+
+        Runs on the loop of the background thread.
+        """
+        if not self._connect_lock:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+
+            await self.close()
+            self.nats = NATS()
+            self.stan = STAN()
+            await self.nats.connect(**{**self.nats_options, 'io_loop': self.loop})
+            # a new client id, as the cluster may still hold on to the one of a lost connection
+            await self.stan.connect(**{**self.stan_options,
+                                       'client_id': self.stan_options['client_id'] + '_' +
+                                       str(random.SystemRandom().getrandbits(0x58)),
+                                       'nats': self.nats,
+                                       'loop': self.loop,
+                                       'conn_lost_cb': self.on_connection_lost})
+            self._stan_connected = True
 
     async def close(self):
         """Close the connections to the queue."""
-        if self.nats and self.nats.is_connected:
-            await self.stan.close()
-            await self.nats.close()
-
-    def publish_json(self, payload=None):
-        """Publish the json payload to the Queue Service."""
+        self._stan_connected = False
         try:
-            self.loop.run_until_complete(self.async_publish_json(payload, self.subject))
-        except Exception as err:
-            self.logger.error('Error: %s', err)
-            raise err
+            if self.stan:
+                await self.stan.close()
+            if self.nats and not self.nats.is_closed:
+                await self.nats.close()
+        except Exception as err:  # pylint: disable=broad-except; the clients are replaced regardless
+            self.logger.warning('Error closing the queue connection: %s', err)
+        self.stan = None
+        self.nats = None
+
+    def publish_json(self, payload=None, subject=None) -> Future:
+        """Publish the json payload to the Queue Service.
+
+        Returns a future of the publish, which is done once the queue acknowledges the message.
+        """
+        return self.publish_json_batch([payload], subject)
+
+    def publish_json_batch(self, payloads: Iterable, subject=None) -> Future:
+        """Publish the json payloads to the Queue Service, in order.
+
+        Returns a future of the publish, which is done once the queue acknowledges all the messages.
+        """
+        future = self.run_coroutine(self.async_publish_json_batch(list(payloads), subject or self.subject))
+        future.add_done_callback(self._log_publish_error)
+        return future
+
+    def run_coroutine(self, coro) -> Future:
+        """Run the coroutine on the loop of the background thread, eg. to subscribe with its connection."""
+        return asyncio.run_coroutine_threadsafe(coro, self._start())
 
     async def publish_json_to_subject(self, payload=None, subject=None):
         """Publish the json payload to the specified subject."""
-        try:
-            await self.async_publish_json(payload, subject)
-        except Exception as err:
-            self.logger.error('Error: %s', err)
-            raise err
+        await asyncio.wrap_future(self.publish_json(payload, subject))
 
     async def async_publish_json(self, payload=None, subject=None):
-        """Publish the json payload to the Queue Service."""
-        if not self.is_connected:
-            await self.connect()
+        """Publish the json payload to the Queue Service.
+
+        Runs on the loop of the background thread.
+        """
+        await self.async_publish_json_batch([payload], subject or self.subject)
 
-        await self.stan.publish(subject=subject,
-                                payload=json.dumps(payload).encode('utf-8'))
+    async def async_publish_json_batch(self, payloads: list, subject=None):
+        """Publish the json payloads to the Queue Service, without waiting on each acknowledgement in turn.
+
+        Runs on the loop of the background thread.
+        """
+        await self.connect()
+        try:
+            await asyncio.gather(*[self.stan.publish(subject=subject, payload=json.dumps(payload).encode('utf-8'))
+                                   for payload in payloads])
+        except Exception:
+            # drop the connection, so the next publish reconnects
+            await self.close()
+            raise
+
+    def _log_publish_error(self, future: Future):
+        """Log the error of a failed publish."""
+        if not future.cancelled() and (err := future.exception()):
+            self.logger.error('Error: %s', err)
 
     async def on_error(self, e):
         """Handle errors raised by the client library."""
@@ -157,9 +229,14 @@ class QueueService():
         """Invoke by the client library when the NATS connection is closed."""
         self.logger.warning('Closed connection to NATS')
 
+    async def on_connection_lost(self, error):
+        """Invoke by the client library when the STAN connection is lost."""
+        self.logger.warning('Lost connection to STAN: %s', error)
+        self._stan_connected = False
+
     @property
     def is_closed(self):
-        """Return True if the connection toThe cluster is closed."""
+        """Return True if the connection to the cluster is closed."""
         if self.nats:
             return self.nats.is_closed
         return True
@@ -168,25 +245,5 @@ class QueueService():
     def is_connected(self):
         """Return True if connected to the NATS cluster."""
         if self.nats:
-            return self.nats.is_connected
+            return self.nats.is_connected and self._stan_connected
         return False
-
-    @property
-    def stan(self):
-        """Return the STAN client for the Queue Service."""
-        ctx = _app_ctx_stack.top
-        if ctx:
-            if not hasattr(ctx, 'stan'):
-                return None
-            return ctx.stan
-        return None
-
-    @property
-    def nats(self):
-        """Return the NATS client for the Queue Service."""
-        ctx = _app_ctx_stack.top
-        if ctx:
-            if not hasattr(ctx, 'nats'):
-                return None
-            return ctx.nats
-        return None
@@ -0,0 +1,61 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Country normalisation.
+
+pycountry.countries.search_fuzzy scans every country and subdivision on each call, which is slow
+when done for every address of a filing. Addresses almost always carry an exact country code or name,
+so those are resolved from an index built once, and only anything else falls back to the fuzzy search,
+whose results are cached.
+"""
+import unicodedata
+from functools import lru_cache
+
+import pycountry
+
+
+_COUNTRY_INDEX = {}
+
+
+def _normalise(value: str) -> str:
+    """Return the value stripped, lower cased and without accents, the same way search_fuzzy compares names."""
+    value = unicodedata.normalize('NFKD', value.strip().lower())
+    return ''.join(c for c in value if not unicodedata.combining(c))
+
+
+def _country_index() -> dict:
+    """Return the index of the countries by alpha-2, alpha-3, name, official name and common name."""
+    if not _COUNTRY_INDEX:
+        index = {}
+        for country in pycountry.countries:
+            for attr in ('alpha_2', 'alpha_3', 'name', 'official_name', 'common_name'):
+                if value := getattr(country, attr, None):
+                    index.setdefault(_normalise(value), country)
+        _COUNTRY_INDEX.update(index)
+    return _COUNTRY_INDEX
+
+
+@lru_cache(maxsize=512)
+def _search_fuzzy(country: str):
+    """Return the best fuzzy match for the country."""
+    return pycountry.countries.search_fuzzy(country)[0]
+
+
+def get_country(country: str):
+    """Return the pycountry country for a country code or name.
+
+    Raises LookupError if nothing matches, like pycountry.countries.search_fuzzy.
+    """
+    if isinstance(country, str) and (match := _country_index().get(_normalise(country))):
+        return match
+    return _search_fuzzy(country)
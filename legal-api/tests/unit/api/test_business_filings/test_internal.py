@@ -19,6 +19,7 @@ Test-Suite to ensure that the /businesses endpoint is working as expected.
 import asyncio
 import copy
 import json
+import threading
 from datetime import datetime
 from http import HTTPStatus
 
@@ -111,13 +112,11 @@ def test_post_colin_filing(session, client, jwt):
 
 @integration_nats
 @pytest.mark.asyncio
-async def test_colin_filing_failed_to_queue(app_ctx, session, client, jwt, stan_server, event_loop):
+async def test_colin_filing_failed_to_queue(app_ctx, session, client, jwt, stan_server):
     """Assert that payment tokens can be retrieved and decoded from the Queue."""
     # SETUP
-    this_loop = asyncio.get_event_loop()
-    this_loop = event_loop
-    queue = QueueService(app_ctx, this_loop)
-    await queue.connect()
+    queue = QueueService(app_ctx)
+    await asyncio.wrap_future(queue.run_coroutine(queue.connect()))
 
     # TEST - add some COLIN filings to the system, check that they got placed on the Queue
     # Create business
@@ -141,6 +140,7 @@ async def test_colin_filing_failed_to_queue(app_ctx, session, client, jwt, stan_
     # Assure that the filing was rejected
     assert rv.status_code == HTTPStatus.BAD_REQUEST
     assert 'missing filing/header values' in rv.json['errors'][0]['message']
+    queue.shutdown()
 
 
 @integration_nats
@@ -150,23 +150,21 @@ def test_colin_filing_to_queue(app_ctx, session, client, jwt, stan_server):
     # SETUP
     msgs = []
     filing_ids = []
-    this_loop = asyncio.get_event_loop()
-    # this_loop = event_loop
-    future = asyncio.Future(loop=this_loop)
-    queue = QueueService(app_ctx, this_loop)
-    this_loop.run_until_complete(queue.connect())
+    received = threading.Event()
+    queue = QueueService(app_ctx)
+    queue.run_coroutine(queue.connect()).result(timeout=5)
 
     async def cb(msg):
         nonlocal msgs
-        nonlocal future
         msgs.append(msg)
         if len(msgs) == 5:
-            future.set_result(True)
+            received.set()
 
-    this_loop.run_until_complete(queue.stan.subscribe(subject=queue.subject,
-                                                      queue='colin_queue',
-                                                      durable_name='colin_queue',
-                                                      cb=cb))
+    # subscribed on the loop of the service, which is the one its connection belongs to
+    queue.run_coroutine(queue.stan.subscribe(subject=queue.subject,
+                                             queue='colin_queue',
+                                             durable_name='colin_queue',
+                                             cb=cb)).result(timeout=5)
 
     # TEST - add some COLIN filings to the system, check that they got placed on the Queue
     for i in range(0, 5):
@@ -196,10 +194,8 @@ def test_colin_filing_to_queue(app_ctx, session, client, jwt, stan_server):
         filing_ids.append(rv.json['filing']['id'])
 
     # Await all the messages were received
-    try:
-        this_loop.run_until_complete(asyncio.wait_for(future, 2, loop=this_loop))
-    except Exception as err:
-        print(err)
+    received.wait(timeout=2)
+    queue.shutdown()
 
     # CHECK the colinFilings were retrieved from the queue
     assert len(msgs) == 5
@@ -275,8 +271,29 @@ def test_get_internal_filings(session, client, jwt):
     # test endpoint returned filing1 only (completed, no corrections, with no colin id set)
     rv = client.get('/api/v1/businesses/internal/filings')
     assert rv.status_code == HTTPStatus.OK
-    assert len(rv.json) == 1
-    assert rv.json[0]['filingId'] == filing1.id
+    assert len(rv.json['filings']) == 1
+    assert rv.json['filings'][0]['filingId'] == filing1.id
+    assert rv.json['next'] is None
+
+
+def test_get_internal_filings_paged(session, client, jwt):
+    """Assert that the internal filings get endpoint pages the completed filings without colin ids."""
+    b = factory_business('CP7654321')
+    factory_business_mailing_address(b)
+    filing_ids = [factory_completed_filing(b, ANNUAL_REPORT).id for _ in range(3)]
+
+    rv = client.get('/api/v1/businesses/internal/filings?limit=2')
+    assert rv.status_code == HTTPStatus.OK
+    assert [filing['filingId'] for filing in rv.json['filings']] == filing_ids[:2]
+    assert rv.json['next'] == filing_ids[1]
+
+    rv = client.get(f'/api/v1/businesses/internal/filings?limit=2&afterId={rv.json["next"]}')
+    assert [filing['filingId'] for filing in rv.json['filings']] == filing_ids[2:]
+    assert rv.json['filings'][0]['filing']['business']['legalName'] == b.legal_name
+    assert rv.json['next'] is None
+
+    rv = client.get('/api/v1/businesses/internal/filings?limit=x')
+    assert rv.status_code == HTTPStatus.BAD_REQUEST
 
 
 @pytest.mark.parametrize('identifier, base_filing, corrected_filing, colin_id', [
@@ -297,11 +314,12 @@ def test_get_bcomp_corrections(session, client, jwt, identifier, base_filing, co
     # test endpoint returns filing
     rv = client.get('/api/v1/businesses/internal/filings')
     assert rv.status_code == HTTPStatus.OK
-    assert len(rv.json) == 1
+    assert len(rv.json['filings']) == 1
     if colin_id:
-        assert rv.json[0]['filingId'] == filing.id
+        assert rv.json['filings'][0]['filingId'] == filing.id
+        assert rv.json['filings'][0]['filing']['correction']['correctedFilingColinId'] == colin_id
     else:
-        assert rv.json[0]['filingId'] == incorp_filing.id
+        assert rv.json['filings'][0]['filingId'] == incorp_filing.id
 
 
 def test_patch_internal_filings(session, client, jwt):
@@ -328,6 +346,37 @@ def test_patch_internal_filings(session, client, jwt):
     assert colin_id in rv.json['filing']['header']['colinIds']
 
 
+def test_patch_internal_filings_batch(session, client, jwt):
+    """Assert that the internal filings patch endpoint updates the colin_event_ids of a batch of filings."""
+    from legal_api.models.colin_event_id import ColinEventId
+    # setup
+    b = factory_business('CP7654321')
+    factory_business_mailing_address(b)
+    filing1 = factory_completed_filing(b, ANNUAL_REPORT)
+    filing2 = factory_completed_filing(b, ANNUAL_REPORT)
+
+    # make request
+    rv = client.patch('/api/v1/businesses/internal/filings',
+                      json={'filings': [{'filingId': filing1.id, 'colinIds': [1234]},
+                                        {'filingId': filing2.id, 'colinIds': [1235, 1236]}]},
+                      headers=create_header(jwt, [COLIN_SVC_ROLE]))
+
+    # test result
+    assert rv.status_code == HTTPStatus.ACCEPTED
+    assert rv.json['filings'] == [{'filingId': filing1.id, 'colinIds': [1234]},
+                                  {'filingId': filing2.id, 'colinIds': [1235, 1236]}]
+    assert sorted(ColinEventId.get_by_filing_id(filing2.id)) == [1235, 1236]
+
+    # a colin id already in use fails the whole batch
+    filing3 = factory_completed_filing(b, ANNUAL_REPORT)
+    rv = client.patch('/api/v1/businesses/internal/filings',
+                      json={'filings': [{'filingId': filing3.id, 'colinIds': [1237]},
+                                        {'filingId': filing1.id, 'colinIds': [1234]}]},
+                      headers=create_header(jwt, [COLIN_SVC_ROLE]))
+    assert rv.status_code == HTTPStatus.BAD_REQUEST
+    assert not ColinEventId.get_by_filing_id(filing3.id)
+
+
 def test_get_colin_id(session, client, jwt):
     """Assert the internal/filings/colin_id get endpoint returns properly."""
     from legal_api.models.colin_event_id import ColinEventId
@@ -349,6 +398,27 @@ def test_get_colin_id(session, client, jwt):
     assert rv.status_code == HTTPStatus.NOT_FOUND
 
 
+def test_get_known_colin_ids(session, client, jwt):
+    """Assert that the known colin ids endpoint returns which of the colin ids are linked to a filing."""
+    from legal_api.models.colin_event_id import ColinEventId
+    # setup
+    b = factory_business('CP7654321')
+    filing = factory_completed_filing(b, ANNUAL_REPORT)
+    for colin_id in [1234, 1236]:
+        colin_event_id = ColinEventId()
+        colin_event_id.colin_event_id = colin_id
+        filing.colin_event_ids.append(colin_event_id)
+    filing.save()
+
+    rv = client.post('/api/v1/businesses/internal/filings/colin_ids', json={'colinIds': [1234, 1235, 1236]})
+
+    assert rv.status_code == HTTPStatus.OK
+    assert rv.json['colinIds'] == [1234, 1236]
+
+    rv = client.post('/api/v1/businesses/internal/filings/colin_ids', json={'ids': [1234]})
+    assert rv.status_code == HTTPStatus.BAD_REQUEST
+
+
 def test_get_colin_last_update(session, client, jwt):
     """Assert the get endpoint for ColinLastUpdate returns last updated colin id."""
     from tests.unit.models import db
@@ -408,3 +478,88 @@ def test_future_filing_coa(session, client, jwt):
     assert paid_filings[0]['filing']['header']['filingId'] == filing.id
     assert paid_filings[0]['filing']['header']['paymentToken']
     assert paid_filings[0]['filing']['header']['effectiveDate']
+
+
+def test_get_due_filings(session, client, jwt):
+    """Assert that only the ids of the PAID filings whose effective date has come are returned, a page at a time."""
+    import pytz
+    from tests.unit.models import factory_pending_filing
+    # setup
+    identifier = 'CP7654321'
+    b = factory_business(identifier)
+    factory_business_mailing_address(b)
+
+    def paid_filing(effective_date):
+        filing = factory_pending_filing(b, ANNUAL_REPORT)
+        filing.effective_date = effective_date
+        filing.payment_completion_date = pytz.utc.localize(datetime.utcnow())
+        filing.save()
+        assert filing.status == Filing.Status.PAID.value
+        return filing
+
+    due_filings = [paid_filing(datetime.utcnow() - datedelta.DAY) for _ in range(3)]
+    paid_filing(datetime.utcnow() + datedelta.DAY)
+    factory_completed_filing(b, ANNUAL_REPORT)
+
+    rv = client.get('/api/v1/businesses/internal/filings/due?limit=2')
+    assert rv.status_code == HTTPStatus.OK
+    assert rv.json == {'filings': [due_filings[0].id, due_filings[1].id], 'next': due_filings[1].id}
+
+    rv = client.get(f'/api/v1/businesses/internal/filings/due?limit=2&afterId={rv.json["next"]}')
+    assert rv.status_code == HTTPStatus.OK
+    assert rv.json == {'filings': [due_filings[2].id], 'next': None}
+
+    rv = client.get('/api/v1/businesses/internal/filings/due?limit=x')
+    assert rv.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_get_scheduled_filings(session, client, jwt):
+    """Assert that the id and effective date of all the PAID filings are returned, a page at a time."""
+    import pytz
+    from tests.unit.models import factory_pending_filing
+    # setup
+    identifier = 'CP7654321'
+    b = factory_business(identifier)
+    factory_business_mailing_address(b)
+
+    filings = []
+    for effective_date in (datetime.utcnow() - datedelta.DAY, datetime.utcnow() + datedelta.DAY):
+        filing = factory_pending_filing(b, ANNUAL_REPORT)
+        filing.effective_date = pytz.utc.localize(effective_date)
+        filing.payment_completion_date = pytz.utc.localize(datetime.utcnow())
+        filing.save()
+        filings.append(filing)
+    factory_completed_filing(b, ANNUAL_REPORT)
+
+    rv = client.get('/api/v1/businesses/internal/filings/scheduled?limit=1')
+    assert rv.status_code == HTTPStatus.OK
+    assert rv.json == {'filings': [{'id': filings[0].id, 'effectiveDate': filings[0].effective_date.isoformat()}],
+                       'next': filings[0].id}
+
+    rv = client.get(f'/api/v1/businesses/internal/filings/scheduled?afterId={filings[0].id}')
+    assert rv.json == {'filings': [{'id': filings[1].id, 'effectiveDate': filings[1].effective_date.isoformat()}],
+                       'next': None}
+
+
+def test_schedule_future_effective_filing(app, session, monkeypatch):
+    """Assert that the scheduler is only told of future effective dates, and only when its subject is set."""
+    import pytz
+    from legal_api.resources.business.business_filings import ListFilingResource
+    published = []
+    monkeypatch.setattr('legal_api.resources.business.business_filings.queue.publish_json',
+                        lambda payload, subject: published.append((payload, subject)))
+    b = factory_business('CP7654321')
+    filing = factory_filing(b, ANNUAL_REPORT)
+    filing.effective_date = pytz.utc.localize(datetime.utcnow() + datedelta.DAY)
+
+    ListFilingResource._schedule_filing(filing)
+    assert not published
+
+    monkeypatch.setitem(app.config, 'NATS_SCHEDULER_SUBJECT', 'entity.filing.scheduler')
+    ListFilingResource._schedule_filing(filing)
+    assert published == [({'filing': {'id': filing.id, 'effectiveDate': filing.effective_date.isoformat()}},
+                          'entity.filing.scheduler')]
+
+    filing.effective_date = pytz.utc.localize(datetime.utcnow() - datedelta.DAY)
+    ListFilingResource._schedule_filing(filing)
+    assert len(published) == 1
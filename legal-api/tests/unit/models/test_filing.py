@@ -35,6 +35,7 @@ from registry_schemas.example_data import (
     FILING_HEADER,
     SPECIAL_RESOLUTION,
 )
+from sqlalchemy import event
 from sqlalchemy.exc import DataError
 from sqlalchemy_continuum import versioning_manager
 
@@ -45,6 +46,7 @@ from tests.conftest import not_raises
 from tests.unit.models import (
     factory_business,
     factory_business_mailing_address,
+    factory_comment,
     factory_completed_filing,
     factory_filing,
 )
@@ -397,6 +399,40 @@ def test_get_filings_by_status__default_order(session):
         file_counter -= 1
 
 
+@pytest.mark.parametrize('num_filings', [1, 12])
+def test_get_filings_json_by_status(session, num_filings):
+    """Assert that the bulk serializer matches Filing.json and uses a fixed number of queries."""
+    from legal_api.models import db
+
+    # setup
+    business = factory_business('CP1234567')
+    for i in range(num_filings):
+        filing = factory_completed_filing(business, ANNUAL_REPORT, colin_id=1000 + i)
+        factory_comment(business, filing, f'comment {i}')
+        factory_comment(business, filing, f'another comment {i}')
+    session.expire_all()
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        statements.append(statement)
+
+    # test
+    event.listen(db.engine, 'before_cursor_execute', count_statements)
+    try:
+        rv = Filing.get_filings_json_by_status(business.id, [Filing.Status.COMPLETED.value])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statements)
+
+    # check
+    # filings (with submitter & parent), children, colin ids, comments (with staff)
+    assert len(statements) <= 4
+    assert len(rv) == num_filings
+    assert json.dumps(rv, sort_keys=False) == \
+        json.dumps([filing.json for filing in Filing.get_filings_by_status(business.id,
+                                                                           [Filing.Status.COMPLETED.value])])
+
+
 def test_get_most_recent_filing_by_legal_type_in_json(session):
     """Assert that the most recent legal filing can be retrieved."""
     business = factory_business('CP1234567')
@@ -549,8 +585,15 @@ def test_get_internal_filings(session, client, jwt):
     filing.save()
     filings = Filing.get_completed_filings_for_colin()
     assert len(filings) == 1
-    assert filing.id == filings[0].json['filing']['header']['filingId']
-    assert filings[0].json['filing']['header']['colinIds'] == []
+    assert filing.id == filings[0][0].json['filing']['header']['filingId']
+    assert filings[0][0].json['filing']['header']['colinIds'] == []
+    assert filings[0][1:] == (identifier, b.legal_type, b.legal_name)
+    # assert doesn't return filings from COLIN
+    filing._source = Filing.Source.COLIN.value
+    filing.save()
+    assert Filing.get_completed_filings_for_colin() == []
+    filing._source = Filing.Source.LEAR.value
+    filing.save()
     # assert doesn't return non completed filings
     filing.transaction_id = None
     filing.save()
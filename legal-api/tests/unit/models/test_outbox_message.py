@@ -0,0 +1,86 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests to assure the OutboxMessage Model.
+
+Test-Suite to ensure that the OutboxMessage Model is working as expected.
+"""
+from registry_schemas.example_data import ANNUAL_REPORT
+
+from legal_api.models import OutboxMessage
+from tests.unit.models import factory_business, factory_completed_filing
+
+
+def test_claim_due_outbox_messages(session):
+    """Assert that due messages are claimed once, until their lease runs out or they are retried."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+    message = OutboxMessage(idempotency_key=f'{filing.id}:publishEvent', action='publishEvent',
+                            filing_id=filing.id, business_id=business.id)
+    message.save()
+
+    assert message.status == OutboxMessage.Status.PENDING.value
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, message.id)]
+    # leased
+    assert OutboxMessage.claim_due(limit=10, lease=300) == []
+
+    message.record_failure('unavailable', retry_in=0)
+    assert message.attempts == 1
+    assert message.last_error == 'unavailable'
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, message.id)]
+
+    message.record_success()
+    assert message.status == OutboxMessage.Status.COMPLETED.value
+    assert message.attempts == 2
+    assert message.completed_date
+    assert OutboxMessage.claim_due(limit=10, lease=0) == []
+
+
+def test_outbox_message_gives_up(session):
+    """Assert that a message failed without a retry is no longer claimed."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+    message = OutboxMessage(idempotency_key=f'{filing.id}:updateEntity', action='updateEntity',
+                            filing_id=filing.id, business_id=business.id)
+    message.save()
+
+    message.record_failure('x' * 2000)
+
+    assert message.status == OutboxMessage.Status.FAILED.value
+    assert len(message.last_error) == 1000
+    assert OutboxMessage.claim_due(limit=10, lease=0) == []
+
+
+def test_claim_due_waits_for_earlier_messages(session):
+    """Assert that a message is not claimed while an earlier message of its filing is pending."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+    first = OutboxMessage(idempotency_key=f'{filing.id}:publishEmail', action='publishEmail',
+                          filing_id=filing.id, business_id=business.id)
+    first.save()
+    second = OutboxMessage(idempotency_key=f'{filing.id}:publishEvent', action='publishEvent',
+                           filing_id=filing.id, business_id=business.id)
+    second.save()
+
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, first.id)]
+
+    first.record_failure('unavailable', retry_in=0)
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, first.id)]
+
+    first.record_success()
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, second.id)]
+    # leased, until released
+    assert OutboxMessage.claim_due(limit=10, lease=300) == []
+    OutboxMessage.release([second.id])
+    assert OutboxMessage.claim_due(limit=10, lease=300) == [(filing.id, second.id)]
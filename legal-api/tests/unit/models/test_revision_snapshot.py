@@ -0,0 +1,77 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests to assure the RevisionSnapshot Model.
+
+Test-Suite to ensure that the RevisionSnapshot Model and its use by the revision service are working as expected.
+"""
+import copy
+
+from registry_schemas.example_data import ANNUAL_REPORT
+
+from legal_api.models import RevisionSnapshot
+from legal_api.services import VersionedBusinessDetailsService
+from tests.unit.models import factory_business, factory_completed_filing
+
+
+def test_find_revision_snapshot(session):
+    """Assert that a snapshot can be saved and found by filing and transaction id."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+
+    snapshot = RevisionSnapshot(filing_id=filing.id,
+                                transaction_id=filing.transaction_id,
+                                filing_json={'filing': {'annualReport': {}}})
+    snapshot.save()
+
+    assert RevisionSnapshot.find(filing.id, filing.transaction_id)
+    assert not RevisionSnapshot.find(filing.id, filing.transaction_id + 1)
+    assert not RevisionSnapshot.find(filing.id, None)
+
+
+def test_get_revision_from_snapshot(session):
+    """Assert that the revision is read from the snapshot, with the current filing header."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+
+    rebuilt = VersionedBusinessDetailsService.get_revision(filing.id, business.id)
+    assert not RevisionSnapshot.find(filing.id, filing.transaction_id)
+
+    VersionedBusinessDetailsService.save_revision_snapshot(filing, business)
+    session.commit()
+
+    snapshot = RevisionSnapshot.find(filing.id, filing.transaction_id)
+    assert 'header' not in snapshot.filing_json['filing']
+
+    # the snapshot is served instead of the version tables
+    snapshot_json = copy.deepcopy(snapshot.filing_json)
+    snapshot_json['filing']['annualReport']['marker'] = 'from snapshot'
+    snapshot.filing_json = snapshot_json
+    snapshot.save()
+
+    revision = VersionedBusinessDetailsService.get_revision(filing.id, business.id)
+    assert revision['filing']['annualReport']['marker'] == 'from snapshot'
+    assert revision['filing']['header'] == rebuilt['filing']['header']
+
+
+def test_backfill_revision_snapshots(session):
+    """Assert that the backfill writes a snapshot for completed filings that are missing one."""
+    business = factory_business('CP1234567')
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+
+    assert VersionedBusinessDetailsService.backfill_revision_snapshots() == 1
+    assert VersionedBusinessDetailsService.backfill_revision_snapshots() == 0
+
+    snapshot = RevisionSnapshot.find(filing.id, filing.transaction_id)
+    assert snapshot.company_details_json['business']['identifier'] == 'CP1234567'
@@ -0,0 +1,130 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test-Suite to ensure that the document store is working as expected."""
+import copy
+from http import HTTPStatus
+
+from flask import current_app
+from registry_schemas.example_data import ANNUAL_REPORT
+
+from legal_api.reports.document_store import DocumentKey, DocumentStore, FileSystemBackend, document_store
+from legal_api.reports.report import Report
+from legal_api.services.authz import BASIC_USER, STAFF_ROLE
+from tests.unit.models import factory_business, factory_completed_filing, factory_filing  # noqa:E501,I001
+from tests.unit.services.utils import create_header
+
+
+def test_file_system_backend(tmp_path):
+    """Assert that documents are stored, read back and invalidated by filing."""
+    backend = FileSystemBackend(str(tmp_path))
+    key = DocumentKey(filing_id=1, report_type='annualReport', template_version='abc', data_version='1')
+    other_key = DocumentKey(filing_id=2, report_type='annualReport', template_version='abc', data_version='1')
+
+    assert backend.get(key) is None
+
+    backend.put(key, b'pdf')
+    backend.put(other_key, b'other pdf')
+    assert backend.get(key) == b'pdf'
+    # a new template or data version is a different document
+    assert backend.get(DocumentKey(filing_id=1, report_type='annualReport', template_version='def',
+                                   data_version='1')) is None
+    new_key = DocumentKey(filing_id=1, report_type='annualReport', template_version='abc', data_version='2')
+    assert backend.get(new_key) is None
+    # which supersedes the stored one
+    backend.put(new_key, b'new pdf')
+    assert backend.get(new_key) == b'new pdf'
+    assert backend.get(key) is None
+    backend.put(key, b'pdf')
+
+    backend.delete(1)
+    assert backend.get(key) is None
+    assert backend.get(other_key) == b'other pdf'
+    assert not list((tmp_path / '2').glob('*.tmp'))
+
+
+def test_document_store_stats(app, tmp_path):
+    """Assert that the hits and misses are counted, and that the store is disabled without a backend."""
+    store = DocumentStore()
+    key = DocumentKey(filing_id=1, report_type='annualReport', template_version='abc', data_version='1')
+    assert not store.enabled
+    store.put(key, b'pdf')
+    assert store.get(key) is None
+
+    store.init_app(app, backend=FileSystemBackend(str(tmp_path)))
+    assert store.stats == {'enabled': True, 'hits': 0, 'misses': 0}
+    assert store.get(key) is None
+    store.put(key, b'pdf')
+    assert store.get(key) == b'pdf'
+    assert store.get(key) == b'pdf'
+    assert store.stats == {'enabled': True, 'hits': 2, 'misses': 1}
+
+    store.invalidate(1)
+    assert store.get(key) is None
+    assert store.stats == {'enabled': True, 'hits': 2, 'misses': 2}
+
+
+def test_get_pdf_from_document_store(session, app, requests_mock, tmp_path):
+    """Assert that completed filings are rendered once, and other filings every time."""
+    identifier = 'CP7654321'
+    business = factory_business(identifier)
+    filing_json = copy.deepcopy(ANNUAL_REPORT)
+    filing_json['filing']['business']['identifier'] = identifier
+    completed_filing = factory_completed_filing(business, filing_json)
+    pending_filing = factory_filing(business, filing_json)
+
+    requests_mock.post(current_app.config.get('REPORT_SVC_URL'), content=b'pdf')
+    document_store.init_app(app, backend=FileSystemBackend(str(tmp_path)))
+    try:
+        with app.test_request_context(headers={'Authorization': 'Bearer token'}):
+            for _ in range(2):
+                assert Report(completed_filing).get_pdf() == (b'pdf', HTTPStatus.OK)
+            assert requests_mock.call_count == 1
+
+            for _ in range(2):
+                assert Report(pending_filing).get_pdf() == (b'pdf', HTTPStatus.OK)
+            assert requests_mock.call_count == 3
+
+            # the business data rendered into the document changed after the filing was completed
+            business.tax_id = '123456789'
+            business.save()
+            for _ in range(2):
+                assert Report(completed_filing).get_pdf() == (b'pdf', HTTPStatus.OK)
+            assert requests_mock.call_count == 4
+
+        assert document_store.stats == {'enabled': True, 'hits': 2, 'misses': 2}
+    finally:
+        document_store.init_app(app)
+
+
+def test_document_store_resource(app, client, jwt, tmp_path):
+    """Assert that staff can see the store counts and invalidate the documents of a filing."""
+    key = DocumentKey(filing_id=1, report_type='annualReport', template_version='abc', data_version='1')
+    document_store.init_app(app, backend=FileSystemBackend(str(tmp_path)))
+    try:
+        document_store.put(key, b'pdf')
+
+        rv = client.delete('/api/v1/businesses/internal/documents/1', headers=create_header(jwt, [BASIC_USER]))
+        assert rv.status_code == HTTPStatus.UNAUTHORIZED
+        assert document_store.get(key) == b'pdf'
+
+        rv = client.delete('/api/v1/businesses/internal/documents/1', headers=create_header(jwt, [STAFF_ROLE]))
+        assert rv.status_code == HTTPStatus.OK
+        assert document_store.get(key) is None
+
+        rv = client.get('/api/v1/businesses/internal/documents', headers=create_header(jwt, [STAFF_ROLE]))
+        assert rv.status_code == HTTPStatus.OK
+        assert rv.json == {'enabled': True, 'hits': 1, 'misses': 1}
+    finally:
+        document_store.init_app(app)
@@ -59,3 +59,16 @@ def test_get_registrar_for_a_filing(session):
     assert registrar_info['signature']
     assert registrar_info['name'] == 'ANGELO COCCO'
     assert registrar_info['title'] == 'A/Registrar of Companies'
+
+
+def test_get_registrar_info_intervals(app):
+    """Assert that the registrar is found by the interval of the date, and callers get their own copy."""
+    with app.app_context():
+        assert RegistrarInfo.get_registrar_info(datetime.datetime(2012, 5, 31, 23, 59, 59))['name'] == 'RON TOWNSHEND'
+        assert RegistrarInfo.get_registrar_info(datetime.datetime(2012, 6, 1))['name'] == 'ANGELO COCCO'
+        assert RegistrarInfo.get_registrar_info(datetime.datetime(2012, 7, 13))['name'] == 'CAROL PREST'
+
+        registrar_info = RegistrarInfo.get_registrar_info(datetime.datetime(2020, 1, 1))
+        registrar_info['name'] = 'changed'
+        assert RegistrarInfo.get_registrar_info(datetime.datetime(2020, 1, 1))['name'] == 'CAROL PREST'
+        assert registrar_info['signature'].startswith('data:image/png;base64,')
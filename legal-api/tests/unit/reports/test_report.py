@@ -266,3 +266,33 @@ def create_alteration_report(filing, business, report_type):
     set_registrar_info(report)
     set_meta_info(report)
     return report
+
+
+def test_template_registry(app, tmp_path):
+    """Assert that templates are assembled once and rebuilt in debug mode when a file changes."""
+    import os
+
+    from legal_api.reports.template_registry import TemplateRegistry
+
+    (tmp_path / 'template-parts').mkdir()
+    part_file = tmp_path / 'template-parts' / 'footer.html'
+    part_file.write_text('<footer/>')
+    (tmp_path / 'report.html').write_text('<body>[[footer.html]][[unknown.html]][[footer.html]]</body>')
+
+    registry = TemplateRegistry()
+    with app.app_context(), \
+            patch.dict(current_app.config, {'REPORT_TEMPLATE_PATH': str(tmp_path), 'DEBUG': False}):
+        template = registry.get_template('report.html')
+        assert template == '<body><footer/>[[unknown.html]]<footer/></body>'
+        version = registry.get_template_version('report.html')
+
+        # frozen outside of debug mode
+        part_file.write_text('<footer>changed</footer>')
+        os.utime(part_file, (0, 0))
+        assert registry.get_template('report.html') == template
+
+        # rebuilt in debug mode, as the part changed
+        current_app.config['DEBUG'] = True
+        assert registry.get_template('report.html') == \
+            '<body><footer>changed</footer>[[unknown.html]]<footer>changed</footer></body>'
+        assert registry.get_template_version('report.html') != version
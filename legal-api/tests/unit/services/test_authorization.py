@@ -21,7 +21,14 @@ from http import HTTPStatus
 import pytest
 from flask import jsonify
 
-from legal_api.services.authz import BASIC_USER, COLIN_SVC_ROLE, STAFF_ROLE, authorized
+from legal_api.services.authz import (
+    BASIC_USER,
+    COLIN_SVC_ROLE,
+    STAFF_ROLE,
+    AuthorizationCache,
+    authorized,
+    authz_cache,
+)
 from tests import integration_authorization, not_github_ci
 
 from .utils import helper_create_jwt
@@ -220,3 +227,68 @@ def test_authorized_invalid_roles(monkeypatch, app, jwt):
         rv = authorized(identifier, jwt, ['view'])
 
     assert not rv
+
+
+def test_authorization_cache(app):
+    """Assert that the cache is bounded, and that decisions expire with the ttl or the token."""
+    import time
+
+    cache = AuthorizationCache()
+    cache.max_size = 2
+    cache.put(('sub', 'CP1234567', ('edit',)), True)
+    cache.put(('sub', 'CP7654321', ('edit',)), False)
+    assert cache.get(('sub', 'CP1234567', ('edit',))) is True
+    cache.put(('sub', 'CP0000000', ('edit',)), True)
+
+    # the least recently used decision is dropped
+    assert cache.get(('sub', 'CP7654321', ('edit',))) is None
+    assert cache.get(('sub', 'CP1234567', ('edit',))) is True
+    assert cache.get(('sub', 'CP0000000', ('edit',))) is True
+
+    # the decision expires with the token
+    cache.put(('sub', 'CP0000001', ('edit',)), True, token_exp=int(time.time()) - 1)
+    assert cache.get(('sub', 'CP0000001', ('edit',))) is None
+
+    assert cache.stats == {'hits': 3, 'misses': 2, 'size': 1}
+
+    cache.init_app(app)
+    assert cache.stats == {'hits': 0, 'misses': 0, 'size': 0}
+
+
+@not_github_ci
+def test_authorized_user_cached(monkeypatch, app_request, jwt):
+    """Assert that the decisions of the auth service are cached by user, identifier and actions."""
+    from requests import Response
+    calls = []
+
+    def mock_get(*args, **kwargs):  # pylint: disable=unused-argument; mocks of library methods
+        calls.append(kwargs['url'])
+        resp = Response()
+        resp.status_code = 200
+        return resp
+
+    def mock_json(self, **kwargs):  # pylint: disable=unused-argument; mocks of library methods
+        return {'roles': ['view']}
+
+    monkeypatch.setattr('requests.sessions.Session.get', mock_get)
+    monkeypatch.setattr('requests.Response.json', mock_json)
+
+    @app_request.route('/fake_jwt_route/<string:identifier>/<string:action>')
+    @jwt.requires_auth
+    def get_fake(identifier: str, action: str):
+        if not authorized(identifier, jwt, [action]):
+            return jsonify(message='failed'), HTTPStatus.METHOD_NOT_ALLOWED
+        return jsonify(message='success'), HTTPStatus.OK
+
+    token = helper_create_jwt(jwt, roles=[BASIC_USER], username='CP1234567')
+    headers = {'Authorization': 'Bearer ' + token}
+    client = app_request.test_client()
+
+    for _ in range(3):
+        assert client.get('/fake_jwt_route/CP1234567/view', headers=headers).status_code == HTTPStatus.OK
+        assert client.get('/fake_jwt_route/CP1234567/edit', headers=headers).status_code == \
+            HTTPStatus.METHOD_NOT_ALLOWED
+    assert client.get('/fake_jwt_route/CP7654321/view', headers=headers).status_code == HTTPStatus.OK
+
+    assert len(calls) == 3
+    assert authz_cache.stats == {'hits': 4, 'misses': 3, 'size': 3}
@@ -0,0 +1,103 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests to assure the VersionedBusinessDetailsService.
+
+Test-Suite to ensure that the business details revisions are rebuilt correctly.
+"""
+import datetime
+
+import pytest
+from registry_schemas.example_data import ANNUAL_REPORT
+from sqlalchemy import event
+
+from legal_api.models import Address, PartyRole, db
+from legal_api.services import VersionedBusinessDetailsService
+from tests.unit.models import factory_business, factory_completed_filing, factory_party_role
+
+
+def _add_directors(business, num_directors):
+    """Add directors, with delivery and mailing addresses, to the business."""
+    for i in range(num_directors):
+        party_role = factory_party_role(
+            Address(city=f'Delivery City {i}', address_type=Address.DELIVERY),
+            Address(city=f'Mailing City {i}', address_type=Address.MAILING),
+            {'firstName': f'First{i}', 'lastName': f'Last{i}', 'middleInitial': 'M'},
+            datetime.datetime(2017, 5, 17),
+            None,
+            PartyRole.RoleTypes.DIRECTOR
+        )
+        business.party_roles.append(party_role)
+    business.save()
+
+
+@pytest.mark.parametrize('num_directors', [1, 50])
+def test_party_role_revision_round_trips(session, num_directors):
+    """Assert that the party revision is rebuilt in a constant number of queries."""
+    # setup
+    business = factory_business('CP1234567')
+    _add_directors(business, num_directors)
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        statements.append(statement)
+
+    # test
+    event.listen(db.engine, 'before_cursor_execute', count_statements)
+    try:
+        parties = VersionedBusinessDetailsService.get_party_role_revision(filing.transaction_id, business.id,
+                                                                          role='director')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statements)
+
+    # check
+    # party roles joined with parties, addresses
+    assert len(statements) == 2
+    assert len(parties) == num_directors
+    for i, party in enumerate(sorted(parties, key=lambda p: int(p['officer']['firstName'][5:]))):
+        assert party['role'] == 'director'
+        assert party['deliveryAddress']['addressCity'] == f'Delivery City {i}'
+        assert party['mailingAddress']['addressCity'] == f'Mailing City {i}'
+
+
+def test_party_role_revision_merges_roles(session):
+    """Assert that the roles of the same party are merged for an incorporation application."""
+    # setup
+    business = factory_business('CP1234567')
+    party_role = factory_party_role(
+        Address(city='Delivery City', address_type=Address.DELIVERY),
+        None,
+        {'firstName': 'Michael', 'lastName': 'Crane', 'middleInitial': 'Joe'},
+        datetime.datetime(2017, 5, 17),
+        None,
+        PartyRole.RoleTypes.DIRECTOR
+    )
+    business.party_roles.append(party_role)
+    business.party_roles.append(PartyRole(role=PartyRole.RoleTypes.INCORPORATOR.value,
+                                          appointment_date=datetime.datetime(2017, 5, 17),
+                                          party_id=party_role.party_id))
+    business.save()
+    filing = factory_completed_filing(business, ANNUAL_REPORT)
+
+    # test
+    parties = VersionedBusinessDetailsService.get_party_role_revision(filing.transaction_id, business.id,
+                                                                      is_ia_or_after=True)
+
+    # check
+    assert len(parties) == 1
+    assert {role['roleType'] for role in parties[0]['roles']} == {'Director', 'Incorporator'}
+    # no mailing address, so the delivery address is used
+    assert parties[0]['mailingAddress'] == parties[0]['deliveryAddress']
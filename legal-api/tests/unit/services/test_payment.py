@@ -0,0 +1,71 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests to assure the Payment Service.
+
+Test-Suite to ensure that the Payment Service is working as expected.
+"""
+from http import HTTPStatus
+
+from flask import current_app
+from requests import exceptions
+
+from legal_api.services.payment import PaymentService
+
+
+def test_get_payment_details(app, requests_mock):
+    """Assert that terminal payments are cached, and other payments only for the ttl."""
+    with app.app_context():
+        service = PaymentService(app)
+        service.ttl = 0
+        payment_svc_url = current_app.config.get('PAYMENT_SVC_URL')
+        completed = requests_mock.get(f'{payment_svc_url}/1', json={
+            'statusCode': 'COMPLETED', 'isPaymentActionRequired': False, 'paymentMethod': 'DIRECT_PAY'})
+        created = requests_mock.get(f'{payment_svc_url}/2', json={
+            'statusCode': 'CREATED', 'isPaymentActionRequired': True, 'paymentMethod': 'ONLINE_BANKING'})
+        requests_mock.get(f'{payment_svc_url}/3', status_code=HTTPStatus.NOT_FOUND)
+
+        for _ in range(2):
+            details = service.get_payment_details(['1', '2', '3'], 'token')
+            assert details == {
+                '1': {'isPaymentActionRequired': False, 'paymentMethod': 'DIRECT_PAY'},
+                '2': {'isPaymentActionRequired': True, 'paymentMethod': 'ONLINE_BANKING'},
+                '3': None
+            }
+        assert completed.call_count == 1
+        assert created.call_count == 2
+        assert created.last_request.headers['Authorization'] == 'Bearer token'
+        assert service.stats == {'hits': 1, 'misses': 5, 'size': 2, 'circuitOpen': False}
+
+
+def test_get_payment_details_circuit_breaker(app, requests_mock):
+    """Assert that the pay-api is no longer called once it keeps failing."""
+    with app.app_context():
+        service = PaymentService(app)
+        service.breaker.failure_threshold = 2
+        payment_svc_url = current_app.config.get('PAYMENT_SVC_URL')
+        timeout = requests_mock.get(f'{payment_svc_url}/1', exc=exceptions.ConnectTimeout)
+        error = requests_mock.get(f'{payment_svc_url}/2', status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+
+        assert service.get_payment_details(['1', '2'], 'token') == {'1': None, '2': None}
+        assert service.breaker.is_open
+        assert service.get_payment_details(['1', '2'], 'token') == {'1': None, '2': None}
+        assert timeout.call_count == 1
+        assert error.call_count == 1
+
+        # a trial call is let through once the breaker resets
+        service.breaker.reset_timeout = 0
+        requests_mock.get(f'{payment_svc_url}/1', json={'statusCode': 'CREATED'})
+        assert service.get_payment_details(['1'], 'token') == {
+            '1': {'isPaymentActionRequired': False, 'paymentMethod': ''}}
+        assert not service.breaker.is_open
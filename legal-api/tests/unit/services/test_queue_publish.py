@@ -19,9 +19,12 @@ Test-Suite to ensure that the Queue Publication Service is working as expected.
 import asyncio
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import dpath.util
 import pytest
+from nats.aio.client import Client as NATS  # noqa N814; by convention the name is NATS
+from stan.aio.client import Client as STAN  # noqa N814; by convention the name is STAN
 
 from legal_api.services.queue import QueueService
 from tests import integration_nats
@@ -36,8 +39,7 @@ def test_nats_stan_config(app):
     assert app.config.get('NATS_QUEUE')
 
 
-@pytest.mark.asyncio
-async def test_queue_properties_with_no_flask_ctx():
+def test_queue_properties_with_no_flask_ctx():
     """Assert that the queue clients cannot be checked."""
     queue = QueueService()
 
@@ -46,36 +48,109 @@ async def test_queue_properties_with_no_flask_ctx():
     assert queue.is_closed
     assert not queue.is_connected
 
-    await queue.connect()
-    assert not queue.is_connected
 
+class FakeNats():
+    """A stand in for the NATS client."""
 
-@integration_nats
-@pytest.mark.asyncio
-async def test_queue_connect_to_nats(app_ctx, stan_server):
-    """Assert that the service can connect to the STAN Queue."""
-    queue = QueueService(app_ctx)
+    def __init__(self):
+        """Initialize this object."""
+        self.is_connected = False
+        self.is_closed = True
 
-    # sanity check
-    assert not queue.is_connected
+    async def connect(self, **kwargs):
+        """Connect."""
+        self.is_connected = True
+        self.is_closed = False
 
-    # test
-    await queue.connect()
-    assert queue.is_connected
+    async def close(self):
+        """Close."""
+        self.is_connected = False
+        self.is_closed = True
 
-    await queue.connect()
-    assert queue.is_connected
 
-    await queue.close()
+class FakeStan():
+    """A stand in for the STAN client, that records the published messages."""
+
+    connections = 0
+    published = []
+    fail_next = False
+
+    async def connect(self, **kwargs):
+        """Connect."""
+        FakeStan.connections += 1
+
+    async def publish(self, subject, payload):
+        """Publish, failing if asked to."""
+        if FakeStan.fail_next:
+            FakeStan.fail_next = False
+            raise ConnectionError('lost')
+        await asyncio.sleep(0)
+        FakeStan.published.append((subject, json.loads(payload.decode('utf-8'))))
+
+    async def close(self):
+        """Close."""
+
+
+def test_publish_from_threads(app, monkeypatch):
+    """Assert that publishing reuses the connection, returns futures, keeps batches in order and reconnects."""
+    monkeypatch.setattr('legal_api.services.queue.NATS', FakeNats)
+    monkeypatch.setattr('legal_api.services.queue.STAN', FakeStan)
+    FakeStan.connections = 0
+    FakeStan.published = []
+    queue = QueueService(app)
+    subject = app.config.get('NATS_FILER_SUBJECT')
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = list(executor.map(lambda i: queue.publish_json({'filing': {'id': i}}), range(10)))
+        for future in futures:
+            future.result(timeout=2)
+        assert FakeStan.connections == 1
+        assert queue.is_connected
+        assert sorted(payload['filing']['id'] for _, payload in FakeStan.published) == list(range(10))
+
+        FakeStan.published = []
+        queue.publish_json_batch([{'filing': {'id': i}} for i in range(5)], subject='other').result(timeout=2)
+        assert FakeStan.published == [('other', {'filing': {'id': i}}) for i in range(5)]
+
+        # a failed publish drops the connection, and the next one reconnects
+        FakeStan.fail_next = True
+        with pytest.raises(ConnectionError):
+            queue.publish_json({'filing': {'id': 1}}).result(timeout=2)
+        assert not queue.is_connected
+        queue.publish_json({'filing': {'id': 2}}).result(timeout=2)
+        assert FakeStan.connections == 2
+        assert FakeStan.published[-1] == (subject, {'filing': {'id': 2}})
+    finally:
+        queue.shutdown()
     assert queue.is_closed
 
 
+async def _subscribe(app, cb):
+    """Return a STAN client of its own, subscribed to the filer subject."""
+    nats = NATS()
+    stan = STAN()
+    await nats.connect(servers=app.config.get('NATS_SERVERS').split(','), io_loop=asyncio.get_event_loop())
+    await stan.connect(cluster_id=app.config.get('NATS_CLUSTER_ID'), client_id='test_subscriber', nats=nats)
+    await stan.subscribe(subject=app.config.get('NATS_FILER_SUBJECT'),
+                         queue='colin_queue',
+                         durable_name='colin_queue',
+                         cb=cb)
+    return nats, stan
+
+
 @integration_nats
-# @pytest.mark.asyncio
-async def test_queue_flask_teardown(app_ctx):
+def test_queue_connect_to_nats(app_ctx, stan_server):
     """Assert that the service can connect to the STAN Queue."""
     queue = QueueService(app_ctx)
-    queue.teardown(exception=None)
+
+    # sanity check
+    assert not queue.is_connected
+
+    # test
+    queue.publish_json({'colinFiling': {'id': 1234}}).result(timeout=5)
+    assert queue.is_connected
+
+    queue.shutdown()
     assert queue.is_closed
 
 
@@ -87,8 +162,7 @@ async def test_async_publish_colin_filing(app_ctx, stan_server):
     msgs = []
     this_loop = asyncio.get_event_loop()
     future = asyncio.Future(loop=this_loop)
-    queue = QueueService(app_ctx, this_loop)
-    await queue.connect()
+    queue = QueueService(app_ctx)
 
     async def cb(msg):
         nonlocal msgs
@@ -97,21 +171,20 @@ async def test_async_publish_colin_filing(app_ctx, stan_server):
         if len(msgs) == 5:
             future.set_result(True)
 
-    await queue.stan.subscribe(subject=queue.subject,
-                               queue='colin_queue',
-                               durable_name='colin_queue',
-                               cb=cb)
+    nats, stan = await _subscribe(app_ctx, cb)
 
     # TEST - add some messages to the queue
     for i in range(0, 5):
         payload = {'colinFiling': {'id': 1234 + i, }}
-        await queue.async_publish_json(payload=payload)
+        await queue.publish_json_to_subject(payload=payload, subject=queue.subject)
     try:
         await asyncio.wait_for(future, 2, loop=this_loop)
     except Exception as err:
         print(err)
 
-    # await queue.close()
+    queue.shutdown()
+    await stan.close()
+    await nats.close()
 
     # CHECK the colinFilings were retrieved from the queue
     assert len(msgs) == 5
@@ -122,48 +195,6 @@ async def test_async_publish_colin_filing(app_ctx, stan_server):
                                           'colinFiling/id')
 
 
-# @integration_nats
-# @pytest.mark.asyncio
-# async def test_publish_colin_filing(app_ctx, stan_server, event_loop):
-#     """Assert that payment tokens can be retrieved and decoded from the Queue."""
-#     # SETUP
-#     msgs = []
-#     # this_loop = asyncio.get_event_loop()
-#     this_loop = event_loop
-#     future = asyncio.Future(loop=this_loop)
-#     queue = QueueService(app_ctx, this_loop)
-#     await queue.connect()
-
-#     async def cb(msg):
-#         nonlocal msgs
-#         nonlocal future
-#         msgs.append(msg)
-#         if len(msgs) == 5:
-#             future.set_result(True)
-
-#     await queue.stan.subscribe(subject=queue.subject,
-#                                queue='colin_queue',
-#                                durable_name='colin_queue',
-#                                cb=cb)
-
-#     # TEST - add some messages to the queue
-#     for i in range(0, 5):
-#         payload = {'colinFiling': {'id': 1234 + i, }}
-#         queue.publish_json(payload=payload)
-#     try:
-#         await asyncio.wait_for(future, 2, loop=this_loop)
-#     except Exception as err:
-#         print(err)
-
-#     # CHECK the colinFilings were retrieved from the queue
-#     assert len(msgs) == 5
-#     for i in range(0, 5):
-#         m = msgs[i]
-#         assert 'colinFiling' in m.data.decode('utf-8')
-#         assert 1234 + i == dpath.util.get(json.loads(m.data.decode('utf-8')),
-#                                           'colinFiling/id')
-
-
 @pytest.mark.asyncio
 async def test_error_callback(caplog):
     """Assert the on_error callback logs a warning."""
@@ -197,32 +228,28 @@ async def test_on_close_callback(caplog):
         assert error_msg in caplog.text
 
 
-@pytest.mark.asyncio
 @integration_nats
-async def test_on_reconnect_callback(caplog, app_ctx, stan_server):
+def test_on_reconnect_callback(caplog, app_ctx, stan_server):
     """Assert the reconnect callback logs a warning."""
     error_msg = 'Reconnected to NATS'
     with caplog.at_level(logging.WARNING):
         queue = QueueService(app_ctx)
-        await queue.connect()
-        await queue.on_reconnect()
+        queue.publish_json({'colinFiling': {'id': 1234}}).result(timeout=5)
+        asyncio.run_coroutine_threadsafe(queue.on_reconnect(), queue.loop).result(timeout=5)
 
         assert error_msg in caplog.text
         assert queue.nats.connected_url.netloc in caplog.text
-        await queue.close()
+        queue.shutdown()
 
 
 @integration_nats
-# @pytest.mark.asyncio
 def test_publish_colin_filing_managed(app_ctx, stan_server):
     """Assert that payment tokens can be retrieved and decoded from the Queue."""
     # SETUP
     msgs = []
     this_loop = asyncio.get_event_loop()
-    # this_loop = event_loop
     future = asyncio.Future(loop=this_loop)
-    queue = QueueService(app_ctx, this_loop)
-    this_loop.run_until_complete(queue.connect())
+    queue = QueueService(app_ctx)
 
     async def cb(msg):
         nonlocal msgs
@@ -231,20 +258,19 @@ def test_publish_colin_filing_managed(app_ctx, stan_server):
         if len(msgs) == 5:
             future.set_result(True)
 
-    this_loop.run_until_complete(queue.stan.subscribe(subject=queue.subject,
-                                                      queue='colin_queue',
-                                                      durable_name='colin_queue',
-                                                      cb=cb))
+    nats, stan = this_loop.run_until_complete(_subscribe(app_ctx, cb))
 
-    # TEST - add some messages to the queue
-    for i in range(0, 5):
-        payload = {'colinFiling': {'id': 1234 + i, }}
-        queue.publish_json(payload=payload)
+    # TEST - add some messages to the queue, in a single batch
+    queue.publish_json_batch([{'colinFiling': {'id': 1234 + i, }} for i in range(0, 5)]).result(timeout=5)
     try:
         this_loop.run_until_complete(asyncio.wait_for(future, 2, loop=this_loop))
     except Exception as err:
         print(err)
 
+    queue.shutdown()
+    this_loop.run_until_complete(stan.close())
+    this_loop.run_until_complete(nats.close())
+
     # CHECK the colinFilings were retrieved from the queue
     assert len(msgs) == 5
     for i in range(0, 5):
@@ -87,3 +87,38 @@ def test_account_affiliation_integration(account, app_ctx):
 
     # @TODO change this next sprint when affiliation service is updated.
     assert r == HTTPStatus.OK
+
+
+def test_bearer_token_cache(app, requests_mock):
+    """Assert that the service token is cached until it is about to expire, or is rejected."""
+    from unittest.mock import patch
+
+    with app.app_context(), patch.dict(current_app.config, {'ACCOUNT_SVC_AUTH_URL': 'http://auth.test/token',
+                                                            'ACCOUNT_SVC_ENTITY_URL': 'http://auth.test/entities'}):
+        AccountService.invalidate_bearer_token()
+        token_mock = requests_mock.post('http://auth.test/token', [
+            {'json': {'access_token': 'token1', 'expires_in': 300}},
+            {'json': {'access_token': 'token2', 'expires_in': 30}},
+            {'json': {'access_token': 'token3', 'expires_in': 300}},
+        ])
+
+        assert AccountService.get_bearer_token() == 'token1'
+        assert AccountService.get_bearer_token() == 'token1'
+        assert token_mock.call_count == 1
+
+        # a rejected token is replaced, and the request retried once
+        entity_mock = requests_mock.patch('http://auth.test/entities/BC1234567', [
+            {'status_code': HTTPStatus.UNAUTHORIZED},
+            {'status_code': HTTPStatus.OK},
+        ])
+        assert AccountService.update_entity('BC1234567', 'name', 'BC') == HTTPStatus.OK
+        assert entity_mock.call_count == 2
+        assert entity_mock.last_request.headers['Authorization'] == 'Bearer token2'
+        assert token_mock.call_count == 2
+
+        # token2 expires within the refresh margin, so it is refreshed on the next call
+        assert AccountService.get_bearer_token() == 'token3'
+        assert AccountService.get_bearer_token() == 'token3'
+        assert token_mock.call_count == 3
+
+        AccountService.invalidate_bearer_token()
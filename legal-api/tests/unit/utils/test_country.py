@@ -0,0 +1,61 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests to ensure the country normalisation is working as expected."""
+import timeit
+
+import pycountry
+import pytest
+
+from legal_api.utils.country import get_country
+
+
+@pytest.mark.parametrize('country,alpha_2,name', [
+    ('CA', 'CA', 'Canada'),
+    ('ca', 'CA', 'Canada'),
+    ('CAN', 'CA', 'Canada'),
+    ('Canada', 'CA', 'Canada'),
+    (' canada ', 'CA', 'Canada'),
+    ('US', 'US', 'United States'),
+    ('United States of America', 'US', 'United States'),
+    ('Bolivia', 'BO', 'Bolivia, Plurinational State of'),
+    ('Curacao', 'CW', 'Curaçao'),
+    ('Niger', 'NE', 'Niger'),
+])
+def test_get_country(country, alpha_2, name):
+    """Assert that exact codes and names are resolved from the index."""
+    match = get_country(country)
+    assert match.alpha_2 == alpha_2
+    assert match.name == name
+
+
+def test_get_country_fuzzy():
+    """Assert that anything else falls back to the fuzzy search."""
+    assert get_country('Britain').alpha_2 == pycountry.countries.search_fuzzy('Britain')[0].alpha_2
+
+
+def test_get_country_not_found():
+    """Assert that an unknown country raises a LookupError, like search_fuzzy."""
+    with pytest.raises(LookupError):
+        get_country('not a country')
+
+
+@pytest.mark.slow
+def test_get_country_benchmark():
+    """Assert that the index is much faster than the fuzzy search for the countries found on addresses."""
+    countries = ['CA', 'US', 'Canada', 'United States', 'GB', 'FR'] * 5
+
+    fuzzy = timeit.timeit(lambda: [pycountry.countries.search_fuzzy(c)[0] for c in countries], number=1)
+    indexed = timeit.timeit(lambda: [get_country(c) for c in countries], number=1)
+
+    assert indexed * 100 < fuzzy
@@ -75,6 +75,8 @@ class _Config():  # pylint: disable=too-few-public-methods
     # variables
     LEGISLATIVE_TIMEZONE = os.getenv('LEGISLATIVE_TIMEZONE', 'America/Vancouver')
     TEMPLATE_PATH = os.getenv('TEMPLATE_PATH', None)
+    # seconds to wait on each attachment request, they wait on the report generation
+    ATTACHMENT_REQUEST_TIMEOUT = int(os.getenv('ATTACHMENT_REQUEST_TIMEOUT', '60'))
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
@@ -16,6 +16,7 @@ from __future__ import annotations
 
 import base64
 import re
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from pathlib import Path
 
@@ -39,46 +40,42 @@ FILING_TYPE_CONVERTER = {
     'correction': 'CRCTN'
 }
 
+# shared by the attachment requests, so the connections to the apis are pooled and reused
+_session = requests.Session()  # pylint: disable=invalid-name
+
 
 def _get_pdfs(status: str, token: str, business: dict, filing: Filing, filing_date_time: str) -> list:
     # pylint: disable=too-many-locals, too-many-branches
-    """Get the pdfs for the incorporation output."""
-    pdfs = []
+    """Get the pdfs for the incorporation output.
+
+    The documents are independent of each other, so they are requested concurrently and attached in order.
+    """
     headers = {
         'Accept': 'application/pdf',
         'Authorization': f'Bearer {token}'
     }
+    filing_url = f'{current_app.config.get("LEGAL_API_URL")}/businesses/{business["identifier"]}/filings/{filing.id}'
     if filing.filing_type == 'correction':
         original_filing_type = filing.filing_json['filing']['correction']['correctedFilingType']
+    attachments = []
     if status == Filing.Status.PAID.value:
         # add filing pdf
-        filing_pdf = requests.get(
-            f'{current_app.config.get("LEGAL_API_URL")}/businesses/{business["identifier"]}/filings/{filing.id}',
-            headers=headers
-        )
-        if filing_pdf.status_code != HTTPStatus.OK:
-            logger.error('Failed to get pdf for filing: %s', filing.id)
-            capture_message(f'Email Queue: filing id={filing.id}, error=pdf generation', level='error')
+        if filing.filing_type == 'correction':
+            file_name = original_filing_type[0].upper() + \
+                        ' '.join(re.findall('[a-zA-Z][^A-Z]*', original_filing_type[1:]))
+            file_name = f'{file_name} (Corrected)'
         else:
-            filing_pdf_encoded = base64.b64encode(filing_pdf.content)
-            if filing.filing_type == 'correction':
-                file_name = original_filing_type[0].upper() + \
-                            ' '.join(re.findall('[a-zA-Z][^A-Z]*', original_filing_type[1:]))
-                file_name = f'{file_name} (Corrected)'
-            else:
-                file_name = filing.filing_type[0].upper() + \
-                    ' '.join(re.findall('[a-zA-Z][^A-Z]*', filing.filing_type[1:]))
-                if ar_date := filing.filing_json['filing'].get('annualReport', {}).get('annualReportDate'):
-                    file_name = f'{ar_date[:4]} {file_name}'
-
-            pdfs.append(
-                {
-                    'fileName': f'{file_name}.pdf',
-                    'fileBytes': filing_pdf_encoded.decode('utf-8'),
-                    'fileUrl': '',
-                    'attachOrder': '1'
-                }
-            )
+            file_name = filing.filing_type[0].upper() + \
+                ' '.join(re.findall('[a-zA-Z][^A-Z]*', filing.filing_type[1:]))
+            if ar_date := filing.filing_json['filing'].get('annualReport', {}).get('annualReportDate'):
+                file_name = f'{ar_date[:4]} {file_name}'
+        attachments.append({
+            'name': 'pdf',
+            'request': {'method': 'GET', 'url': filing_url},
+            'successStatus': HTTPStatus.OK,
+            'fileName': f'{file_name}.pdf',
+            'attachOrder': '1'
+        })
         # add receipt pdf
         if filing.filing_type == 'incorporationApplication' or (filing.filing_type == 'correction' and
                                                                 original_filing_type == 'incorporationApplication'):
@@ -86,73 +83,73 @@ def _get_pdfs(status: str, token: str, business: dict, filing: Filing, filing_da
                 'legalName', 'Numbered Company')
         else:
             corp_name = business.get('legalName')
-
-        receipt = requests.post(
-            f'{current_app.config.get("PAY_API_URL")}/{filing.payment_token}/receipts',
-            json={
-                'corpName': corp_name,
-                'filingDateTime': filing_date_time
-            },
-            headers=headers
-        )
-        if receipt.status_code != HTTPStatus.CREATED:
-            logger.error('Failed to get receipt pdf for filing: %s', filing.id)
-            capture_message(f'Email Queue: filing id={filing.id}, error=receipt generation', level='error')
-        else:
-            receipt_encoded = base64.b64encode(receipt.content)
-            pdfs.append(
-                {
-                    'fileName': 'Receipt.pdf',
-                    'fileBytes': receipt_encoded.decode('utf-8'),
-                    'fileUrl': '',
-                    'attachOrder': '2'
+        attachments.append({
+            'name': 'receipt',
+            'request': {
+                'method': 'POST',
+                'url': f'{current_app.config.get("PAY_API_URL")}/{filing.payment_token}/receipts',
+                'json': {
+                    'corpName': corp_name,
+                    'filingDateTime': filing_date_time
                 }
-            )
+            },
+            'successStatus': HTTPStatus.CREATED,
+            'fileName': 'Receipt.pdf',
+            'attachOrder': '2'
+        })
     if status == Filing.Status.COMPLETED.value:
         # add notice of articles
-        noa = requests.get(
-            f'{current_app.config.get("LEGAL_API_URL")}/businesses/{business["identifier"]}/filings/{filing.id}'
-            '?type=noa',
-            headers=headers
-        )
-        if noa.status_code != HTTPStatus.OK:
-            logger.error('Failed to get noa pdf for filing: %s', filing.id)
-            capture_message(f'Email Queue: filing id={filing.id}, error=noa generation', level='error')
-        else:
-            noa_encoded = base64.b64encode(noa.content)
-            pdfs.append(
-                {
-                    'fileName': 'Notice of Articles.pdf',
-                    'fileBytes': noa_encoded.decode('utf-8'),
-                    'fileUrl': '',
-                    'attachOrder': '1'
-                }
-            )
+        attachments.append({
+            'name': 'noa',
+            'request': {'method': 'GET', 'url': f'{filing_url}?type=noa'},
+            'successStatus': HTTPStatus.OK,
+            'fileName': 'Notice of Articles.pdf',
+            'attachOrder': '1'
+        })
 
         if filing.filing_type == 'incorporationApplication' or (filing.filing_type == 'correction' and
                                                                 original_filing_type == 'incorporationApplication' and
                                                                 get_additional_info(filing).get('nameChange', False)):
             # add certificate
-            certificate = requests.get(
-                f'{current_app.config.get("LEGAL_API_URL")}/businesses/{business["identifier"]}/filings/{filing.id}'
-                '?type=certificate',
-                headers=headers
-            )
-            if certificate.status_code != HTTPStatus.OK:
-                logger.error('Failed to get certificate pdf for filing: %s', filing.id)
-                capture_message(f'Email Queue: filing id={filing.id}, error=certificate generation', level='error')
+            attachments.append({
+                'name': 'certificate',
+                'request': {'method': 'GET', 'url': f'{filing_url}?type=certificate'},
+                'successStatus': HTTPStatus.OK,
+                'fileName': 'Incorporation Certificate (Corrected).pdf' if filing.filing_type == 'correction'
+                            else 'Incorporation Certificate.pdf',
+                'attachOrder': '2'
+            })
+
+    if not attachments:
+        return []
+
+    timeout = current_app.config.get('ATTACHMENT_REQUEST_TIMEOUT')
+
+    # a request that raises, eg. on a timeout, fails the email as before, so it is retried
+    with ThreadPoolExecutor(max_workers=len(attachments)) as executor:
+        responses = list(executor.map(
+            lambda attachment: _session.request(headers=headers, timeout=timeout, **attachment['request']),
+            attachments
+        ))
+
+    pdfs = []
+    for attachment, response in zip(attachments, responses):
+        if response.status_code != attachment['successStatus']:
+            if attachment['name'] == 'pdf':
+                logger.error('Failed to get pdf for filing: %s', filing.id)
             else:
-                certificate_encoded = base64.b64encode(certificate.content)
-                file_name = 'Incorporation Certificate (Corrected).pdf' if filing.filing_type == 'correction' \
-                    else 'Incorporation Certificate.pdf'
-                pdfs.append(
-                    {
-                        'fileName': file_name,
-                        'fileBytes': certificate_encoded.decode('utf-8'),
-                        'fileUrl': '',
-                        'attachOrder': '2'
-                    }
-                )
+                logger.error('Failed to get %s pdf for filing: %s', attachment['name'], filing.id)
+            capture_message(f'Email Queue: filing id={filing.id}, error={attachment["name"]} generation',
+                            level='error')
+        else:
+            pdfs.append(
+                {
+                    'fileName': attachment['fileName'],
+                    'fileBytes': base64.b64encode(response.content).decode('utf-8'),
+                    'fileUrl': '',
+                    'attachOrder': attachment['attachOrder']
+                }
+            )
     return pdfs
 
 
@@ -72,6 +72,9 @@ def send_email(email: dict, token: str):
         }
     )
     if resp.status_code != HTTPStatus.OK:
+        if resp.status_code == HTTPStatus.UNAUTHORIZED:
+            # get a new service token when the msg is reprocessed
+            AccountService.invalidate_bearer_token(token)
         # this should log the error and put the email msg back on the queue
         raise EmailException('Unsuccessful response when sending email.')
 
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """The Unit Tests for the Incorporation email processor."""
-from unittest.mock import patch
+import threading
+import time
+from unittest.mock import Mock, patch
 
 import pytest
+import requests
 from legal_api.models import Business
 
 from entity_emailer.email_processors import filing_notification
@@ -117,3 +120,65 @@ def test_maintenance_notification(app, session, status, filing_type):
             assert mock_get_recipients.call_args[0][0] == status
             assert mock_get_recipients.call_args[0][1] == filing.filing_json
             assert mock_get_recipients.call_args[0][2] == token
+
+
+def _mock_request(filing_id, failing_url_suffix=None, error=None, barrier=None):
+    """Return a mock of the session request, where the first document is the slowest and so completes last.
+
+    The requests wait on the barrier, if given, so they only go through if they are in flight at the same time.
+    """
+    def _request(method, url, **kwargs):
+        if barrier:
+            barrier.wait()
+        if url.endswith(str(filing_id)) or url.endswith('?type=noa'):
+            time.sleep(0.2)
+        status_code = 201 if method == 'POST' else 200
+        if failing_url_suffix and url.endswith(failing_url_suffix):
+            if error:
+                raise error
+            status_code = 500
+        return Mock(status_code=status_code, content=url.encode('utf-8'))
+    return _request
+
+
+@pytest.mark.parametrize(['status', 'file_names', 'failing_url_suffix', 'error'], [
+    ('PAID', ['Incorporation Application.pdf', 'Receipt.pdf'], '/receipts', None),
+    ('PAID', ['Incorporation Application.pdf', 'Receipt.pdf'], '/receipts', requests.exceptions.Timeout()),
+    ('COMPLETED', ['Notice of Articles.pdf', 'Incorporation Certificate.pdf'], '?type=noa', None),
+    ('COMPLETED', ['Notice of Articles.pdf', 'Incorporation Certificate.pdf'], '?type=noa',
+     requests.exceptions.ConnectionError()),
+])
+def test_get_pdfs(app, session, status, file_names, failing_url_suffix, error):
+    """Assert that the attachments are requested concurrently and kept in order.
+
+    The attachments that fail are skipped, and a request that raises fails the email, so it is retried.
+    """
+    filing = prep_incorp_filing(session, 'BC1234567', '1', status)
+    business = {'identifier': 'BC1234567'}
+
+    # both requests have to be in flight at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    with patch.object(filing_notification._session, 'request',
+                      side_effect=_mock_request(filing.id, barrier=barrier)) as mock_request:
+        pdfs = filing_notification._get_pdfs(status, 'token', business, filing, 'date')
+        assert not barrier.broken
+        assert [pdf['fileName'] for pdf in pdfs] == file_names
+        assert [pdf['attachOrder'] for pdf in pdfs] == ['1', '2']
+        assert mock_request.call_count == 2
+        for call in mock_request.call_args_list:
+            assert call[1]['headers']['Authorization'] == 'Bearer token'
+            assert call[1]['timeout']
+
+    with patch.object(filing_notification._session, 'request',
+                      side_effect=_mock_request(filing.id, failing_url_suffix, error)), \
+            patch.object(filing_notification, 'capture_message') as mock_capture:
+        if error:
+            with pytest.raises(type(error)):
+                filing_notification._get_pdfs(status, 'token', business, filing, 'date')
+            mock_capture.assert_not_called()
+        else:
+            pdfs = filing_notification._get_pdfs(status, 'token', business, filing, 'date')
+            # only the attachment that did not fail is kept
+            assert [pdf['fileName'] for pdf in pdfs] == \
+                (file_names[1:] if status == 'COMPLETED' else file_names[:1])
+            assert mock_capture.call_count == 1
@@ -17,14 +17,16 @@
 """s2i based launch script to run the service."""
 import asyncio
 
-from entity_filer.worker import APP_CONFIG, cb_subscription_handler, qsm
+from entity_filer.worker import APP_CONFIG, cb_lane_handler, cb_subscription_handler, outbox, qsm
 
 if __name__ == '__main__':
 
     event_loop = asyncio.get_event_loop()
     event_loop.run_until_complete(qsm.run(loop=event_loop,
                                           config=APP_CONFIG,
-                                          callback=cb_subscription_handler))
+                                          callback=cb_lane_handler if APP_CONFIG.FILER_LANES > 1
+                                          else cb_subscription_handler))
+    outbox.start()
     try:
         event_loop.run_forever()
     finally:
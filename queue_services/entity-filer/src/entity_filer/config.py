@@ -98,6 +98,27 @@ class _Config():  # pylint: disable=too-few-public-methods
         'durable_name': os.getenv('NATS_QUEUE', 'error') + '_durable',
     }
 
+    # filings processed in parallel, 1 processes them one at a time
+    FILER_LANES = int(os.getenv('FILER_LANES', '1'))
+    if FILER_LANES > 1:
+        SUBSCRIPTION_OPTIONS['manual_acks'] = True
+        SUBSCRIPTION_OPTIONS['max_inflight'] = int(os.getenv('FILER_MAX_INFLIGHT', str(FILER_LANES * 2)))
+        SUBSCRIPTION_OPTIONS['ack_wait'] = int(os.getenv('FILER_ACK_WAIT', '300'))
+    # deliveries of a failing filing before it is given up on, and no longer holds its lane
+    FILER_MAX_ATTEMPTS = int(os.getenv('FILER_MAX_ATTEMPTS', '5'))
+
+    # side effects of the filings carried out at a time, and their retries
+    OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', '4'))
+    OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', '10'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+    OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', '5'))
+    OUTBOX_MAX_RETRY_DELAY = int(os.getenv('OUTBOX_MAX_RETRY_DELAY', '3600'))
+
+    if FILER_LANES > 1:
+        # a connection for each lane and outbox thread, and for the threads of the msgs without a lane
+        # and of the lane lookups
+        SQLALCHEMY_ENGINE_OPTIONS = {'pool_size': FILER_LANES + OUTBOX_CONCURRENCY + 2}
+
     ENTITY_EVENT_PUBLISH_OPTIONS = {
         'subject': os.getenv('NATS_ENTITY_EVENT_SUBJECT', 'entity.events'),
     }
@@ -16,10 +16,9 @@ from contextlib import suppress
 from typing import Dict
 
 import dpath
-import sentry_sdk
 from legal_api.models import Business, Filing
 
-from entity_filer.filing_processors.filing_components import aliases, business_info, business_profile, filings, shares
+from entity_filer.filing_processors.filing_components import aliases, business_info, filings, shares
 
 
 def process(business: Business, filing_submission: Filing, filing: Dict):
@@ -46,20 +45,7 @@ def process(business: Business, filing_submission: Filing, filing: Dict):
 
 
 def post_process(business: Business, filing: Filing):
-    """Post processing activities for incorporations.
-
-    THIS SHOULD NOT ALTER THE MODEL
-    """
-    with suppress(IndexError, KeyError, TypeError):
-        if err := business_profile.update_business_profile(
-            business,
-            filing.json['filing']['alteration']['contactPoint']
-        ):
-            sentry_sdk.capture_message(
-                f'Queue Error: Update Business for filing:{filing.id},error:{err}',
-                level='error')
-
-    # Alter the business name, if any
+    """Apply the name change of the alteration, if any."""
     with suppress(IndexError, KeyError, TypeError):
         business_json = dpath.util.get(filing.filing_json, '/filing/alteration/nameRequest')
         business_info.set_legal_name(business.identifier, business, business_json)
@@ -16,8 +16,8 @@ from __future__ import annotations
 
 from typing import Dict
 
-import pycountry
 from legal_api.models import Address, Business, Office, Party, PartyRole, ShareClass, ShareSeries
+from legal_api.utils.country import get_country
 
 from entity_filer.filing_processors.filing_components import (
     aliases,
@@ -51,7 +51,7 @@ def create_address(address_info: Dict, address_type: str) -> Address:
                       street_additional=address_info.get('streetAddressAdditional'),
                       city=address_info.get('addressCity'),
                       region=address_info.get('addressRegion'),
-                      country=pycountry.countries.search_fuzzy(address_info.get('addressCountry'))[0].alpha_2,
+                      country=get_country(address_info.get('addressCountry')).alpha_2,
                       postal_code=address_info.get('postalCode'),
                       delivery_instructions=address_info.get('deliveryInstructions'),
                       address_type=db_address_type
@@ -65,7 +65,7 @@ def update_address(address: Address, new_info: dict) -> Address:
     address.street_additional = new_info.get('streetAddressAdditional')
     address.city = new_info.get('addressCity')
     address.region = new_info.get('addressRegion')
-    address.country = pycountry.countries.search_fuzzy(new_info.get('addressCountry'))[0].alpha_2
+    address.country = get_country(new_info.get('addressCountry')).alpha_2
     address.postal_code = new_info.get('postalCode')
     address.delivery_instructions = new_info.get('deliveryInstructions')
 
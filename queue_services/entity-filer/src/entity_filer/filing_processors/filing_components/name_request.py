@@ -16,7 +16,6 @@ import json
 from http import HTTPStatus
 
 import requests
-import sentry_sdk
 from entity_queue_common.service_utils import QueueException
 from flask import current_app
 from legal_api.models import Business, Filing, RegistrationBootstrap
@@ -25,33 +24,48 @@ from legal_api.services.utils import get_str
 
 
 def consume_nr(business: Business, filing: Filing, nr_num_path='/filing/incorporationApplication/nameRequest/nrNumber'):
-    """Update the nr to a consumed state."""
-    try:
-        nr_num = get_str(filing.filing_json, nr_num_path)
-        # skip this if none (nrNumber will not be available for numbered company)
-        if nr_num:
-            bootstrap = RegistrationBootstrap.find_by_identifier(filing.temp_reg)
-            namex_svc_url = current_app.config.get('NAMEX_API')
-            token = AccountService.get_bearer_token()
+    """Update the nr to a consumed state.
+
+    An nr already consumed by the business, ie. by an earlier attempt, is left as it is.
+    Raises a QueueException if the nr is not consumed, so it can be retried.
+    """
+    nr_num = get_str(filing.filing_json, nr_num_path)
+    # skip this if none (nrNumber will not be available for numbered company)
+    if nr_num:
+        bootstrap = RegistrationBootstrap.find_by_identifier(filing.temp_reg)
+        namex_svc_url = current_app.config.get('NAMEX_API')
+        token = AccountService.get_bearer_token()
 
-            # Create an entity record
-            data = json.dumps({'consume': {'corpNum': business.identifier}})
-            rv = requests.patch(
-                url=''.join([namex_svc_url, nr_num]),
-                headers={**AccountService.CONTENT_TYPE_JSON,
-                         'Authorization': AccountService.BEARER + token},
-                data=data,
-                timeout=AccountService.timeout
-            )
-            if not rv.status_code == HTTPStatus.OK:
-                raise QueueException
+        # Create an entity record
+        data = json.dumps({'consume': {'corpNum': business.identifier}})
+        rv = requests.patch(
+            url=''.join([namex_svc_url, nr_num]),
+            headers={**AccountService.CONTENT_TYPE_JSON,
+                     'Authorization': AccountService.BEARER + token},
+            data=data,
+            timeout=AccountService.timeout
+        )
+        if not rv.status_code == HTTPStatus.OK and not is_consumed_by(nr_num, business, token):
+            raise QueueException(f'Unable to consume nr:{nr_num} for filing:{filing.id}, status:{rv.status_code}')
 
-            # remove the NR from the account
+        # remove the NR from the account, only filings by a temp reg have it affiliated to their account
+        if bootstrap:
             AccountService.delete_affiliation(bootstrap.account, nr_num)
-    except KeyError:
-        pass  # return
-    except Exception:  # pylint: disable=broad-except; note out any exception, but don't fail the call
-        sentry_sdk.capture_message(f'Queue Error: Consume NR error for filing:{filing.id}', level='error')
+
+
+def is_consumed_by(nr_num: str, business: Business, token: str) -> bool:
+    """Return whether the nr has been consumed by the business."""
+    try:
+        rv = requests.get(
+            url=''.join([current_app.config.get('NAMEX_API'), nr_num]),
+            headers={**AccountService.CONTENT_TYPE_JSON,
+                     'Authorization': AccountService.BEARER + token},
+            timeout=AccountService.timeout
+        )
+        nr_json = rv.json() if rv.status_code == HTTPStatus.OK else {}
+    except (requests.exceptions.RequestException, ValueError):
+        return False
+    return nr_json.get('state') == 'CONSUMED' and nr_json.get('corpNum') == business.identifier
 
 
 def has_new_nr_for_correction(filing: dict):
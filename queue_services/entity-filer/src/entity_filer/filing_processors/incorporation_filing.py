@@ -13,18 +13,16 @@
 # limitations under the License.
 """File processing rules and actions for the incorporation of a business."""
 import copy
-from contextlib import suppress
 from http import HTTPStatus
 from typing import Dict
 
 import requests
-import sentry_sdk
 from entity_queue_common.service_utils import QueueException
 from flask import current_app
-from legal_api.models import Business, Filing, RegistrationBootstrap
+from legal_api.models import Business, Filing, OutboxMessage, RegistrationBootstrap
 from legal_api.services.bootstrap import AccountService
 
-from entity_filer.filing_processors.filing_components import aliases, business_info, business_profile, shares
+from entity_filer.filing_processors.filing_components import aliases, business_info, shares
 from entity_filer.filing_processors.filing_components.offices import update_offices
 from entity_filer.filing_processors.filing_components.parties import update_parties
 
@@ -50,46 +48,57 @@ def get_next_corp_num(legal_type: str):
     return None
 
 
-def update_affiliation(business: Business, filing: Filing):
-    """Create an affiliation for the business and remove the bootstrap."""
-    try:
-        bootstrap = RegistrationBootstrap.find_by_identifier(filing.temp_reg)
-
-        rv = AccountService.create_affiliation(
-            account=bootstrap.account,
-            business_registration=business.identifier,
-            business_name=business.legal_name,
-            corp_type_code=business.legal_type
-        )
-
-        if rv not in (HTTPStatus.OK, HTTPStatus.CREATED):
-            deaffiliation = AccountService.delete_affiliation(bootstrap.account, business.identifier)
-            sentry_sdk.capture_message(
-                f'Queue Error: Unable to affiliate business:{business.identifier} for filing:{filing.id}',
-                level='error'
-            )
-        else:
-            # flip the registration
-            # recreate the bootstrap, but point to the new business in the name
-            old_bs_affiliation = AccountService.delete_affiliation(bootstrap.account, bootstrap.identifier)
-            new_bs_affiliation = AccountService.create_affiliation(
-                account=bootstrap.account,
-                business_registration=bootstrap.identifier,
-                business_name=business.identifier,
-                corp_type_code='TMP'
-            )
-            reaffiliate = bool(new_bs_affiliation in (HTTPStatus.OK, HTTPStatus.CREATED)
-                               and old_bs_affiliation == HTTPStatus.OK)
-
-        if rv not in (HTTPStatus.OK, HTTPStatus.CREATED) \
-                or ('deaffiliation' in locals() and deaffiliation != HTTPStatus.OK)\
-                or ('reaffiliate' in locals() and not reaffiliate):
-            raise QueueException
-    except Exception as err:  # pylint: disable=broad-except; note out any exception, but don't fail the call
-        sentry_sdk.capture_message(
-            f'Queue Error: Affiliation error for filing:{filing.id}, with err:{err}',
-            level='error'
-        )
+def update_affiliation(business: Business, filing: Filing, message: OutboxMessage):
+    """Create an affiliation for the business and replace the affiliation of the bootstrap.
+
+    Each step is recorded on the outbox message once carried out, so a retry resumes after the last one,
+    and checks the affiliations first, so a step that failed part way through can be carried out again.
+    Raises a QueueException if a step fails, so the affiliation can be retried.
+    """
+    bootstrap = RegistrationBootstrap.find_by_identifier(filing.temp_reg)
+
+    if 'affiliate' not in message.completed_steps:
+        _affiliate(bootstrap.account, business.identifier, business.legal_name, business.legal_type,
+                   f'Unable to affiliate business:{business.identifier} for filing:{filing.id}')
+        message.record_step('affiliate')
+
+    # flip the registration
+    # recreate the bootstrap, but point to the new business in the name
+    if 'deaffiliateBootstrap' not in message.completed_steps:
+        rv = AccountService.delete_affiliation(bootstrap.account, bootstrap.identifier)
+        if rv != HTTPStatus.OK and \
+                AccountService.get_affiliation(bootstrap.account, bootstrap.identifier) != HTTPStatus.NOT_FOUND:
+            raise QueueException(f'Unable to deaffiliate bootstrap:{bootstrap.identifier} for filing:{filing.id}')
+        message.record_step('deaffiliateBootstrap')
+
+    if 'reaffiliateBootstrap' not in message.completed_steps:
+        _affiliate(bootstrap.account, bootstrap.identifier, business.identifier, 'TMP',
+                   f'Unable to reaffiliate bootstrap:{bootstrap.identifier} for filing:{filing.id}')
+        message.record_step('reaffiliateBootstrap')
+
+
+def _affiliate(account: int, identifier: str, name: str, corp_type_code: str, error: str):
+    """Affiliate the identifier to the account, unless it already is.
+
+    A failed affiliation is only removed if the identifier is not affiliated, so one made earlier is kept.
+    """
+    rv = AccountService.create_affiliation(
+        account=account,
+        business_registration=identifier,
+        business_name=name,
+        corp_type_code=corp_type_code
+    )
+    if rv in (HTTPStatus.OK, HTTPStatus.CREATED):
+        return
+
+    affiliation = AccountService.get_affiliation(account, identifier)
+    if affiliation == HTTPStatus.OK:
+        return
+    deaffiliation = None
+    if affiliation == HTTPStatus.NOT_FOUND:
+        # remove the entity record the failed affiliation may have left behind
+        deaffiliation = AccountService.delete_affiliation(account, identifier)
+    raise QueueException(f'{error}, affiliation:{affiliation}, deaffiliation:{deaffiliation}')
 
 
 def process(business: Business, filing: Dict, filing_rec: Filing):
@@ -139,18 +148,3 @@ def process(business: Business, filing: Dict, filing_rec: Filing):
         ia_json['filing']['business']['foundingDate'] = business.founding_date.isoformat()
         filing_rec._filing_json = ia_json  # pylint: disable=protected-access; bypass to update filing data
     return business, filing_rec
-
-
-def post_process(business: Business, filing: Filing):
-    """Post processing activities for incorporations.
-
-    THIS SHOULD NOT ALTER THE MODEL
-    """
-    with suppress(IndexError, KeyError, TypeError):
-        if err := business_profile.update_business_profile(
-            business,
-            filing.json['filing']['incorporationApplication']['contactPoint']
-        ):
-            sentry_sdk.capture_message(
-                f'Queue Error: Update Business for filing:{filing.id}, error:{err}',
-                level='error')
@@ -0,0 +1,150 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Processes queue messages concurrently, in lanes.
+
+Each message is assigned to a lane by its key, and each lane processes its messages one at a time,
+in the order they were received, on a thread of its own. So messages with the same key are processed
+strictly in order, while messages with different keys can be processed in parallel.
+
+A message that fails is left unacknowledged, and its lane is blocked until it is redelivered and
+processed: the messages received on the lane in the meantime are held, and processed in order after it.
+A message that fails max_attempts times is given up on, which releases its lane. Messages without a key
+have no order to keep, so they are processed outside of the lanes and never block one.
+"""
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from entity_queue_common.service_utils import logger
+
+
+class LaneDispatcher:  # pylint: disable=too-many-instance-attributes
+    """Hands the messages over to their lanes, and acknowledges them once processed."""
+
+    def __init__(self, *,
+                 lanes: int,
+                 handler: Callable[[object], bool],
+                 lane_key: Callable[[object], Optional[str]],
+                 ack: Callable[[object], Awaitable],
+                 give_up: Callable[[object], Awaitable] = None,
+                 max_attempts: int = 5):
+        """Initialize the dispatcher.
+
+        :param lanes: the number of lanes, and of the threads processing them
+        :param handler: processes a message on a lane thread, returning True if the message can be acknowledged
+        :param lane_key: returns the key of a message, messages with the same key are processed in order
+        :param ack: acknowledges a message
+        :param give_up: reports and acknowledges a message that is given up on, defaults to ack
+        :param max_attempts: the number of times a message is processed before it is given up on
+        """
+        self.lanes = lanes
+        self.max_attempts = max_attempts
+        self._handler = handler
+        self._lane_key = lane_key
+        self._ack = ack
+        self._give_up = give_up or ack
+        self._attempts: Dict[object, int] = {}
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._unlaned: Set[asyncio.Future] = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._key_executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        """Start processing the lanes, on the running loop."""
+        # a thread for each lane, and one for the messages without a key
+        self._executor = ThreadPoolExecutor(max_workers=self.lanes + 1, thread_name_prefix='lane')
+        self._key_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lane-key')
+        self._queues = [asyncio.Queue() for _ in range(self.lanes)]
+        self._tasks = [asyncio.ensure_future(self._run_lane(queue)) for queue in self._queues]
+
+    async def close(self):
+        """Stop processing the lanes, the messages not yet processed are left unacknowledged."""
+        tasks = [*self._tasks, *self._unlaned]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        for executor in (self._executor, self._key_executor):
+            if executor:
+                executor.shutdown(wait=True)
+        self._executor = None
+        self._key_executor = None
+
+    def lane(self, key: Optional[str]) -> int:
+        """Return the lane of the key."""
+        if key is None:
+            return 0
+        return zlib.crc32(str(key).encode('utf-8')) % self.lanes
+
+    async def dispatch(self, msg):
+        """Queue the message on its lane, or process it right away if it has no key."""
+        if not self._tasks:
+            self.start()
+        key = await asyncio.get_event_loop().run_in_executor(self._key_executor, self._lane_key, msg)
+        if key is None:
+            task = asyncio.ensure_future(self._process(msg))
+            self._unlaned.add(task)
+            task.add_done_callback(self._unlaned.discard)
+        else:
+            await self._queues[self.lane(key)].put(msg)
+
+    async def _run_lane(self, queue: asyncio.Queue):
+        """Process the messages of the lane, one at a time, holding them while the lane is blocked."""
+        blocked_on = None  # the sequence of the failed message the lane waits to be redelivered
+        held = {}  # the messages received while blocked, by sequence, in the order received
+        while True:
+            if blocked_on is None and held:
+                msg = held.pop(next(iter(held)))
+                from_queue = False
+            else:
+                msg = await queue.get()
+                from_queue = True
+            try:
+                sequence = getattr(msg, 'sequence', None)
+                if blocked_on is not None and sequence != blocked_on:
+                    held[sequence] = msg  # a redelivered copy of a held message keeps its place
+                    continue
+                blocked_on = None if await self._process(msg) else sequence
+            except Exception:  # pylint: disable=broad-except; a lane must keep on processing its messages
+                logger.error('Lane Error: failed to process message seq:%s',
+                             getattr(msg, 'sequence', None), exc_info=True)
+            finally:
+                if from_queue:
+                    queue.task_done()
+
+    async def _process(self, msg) -> bool:
+        """Process the message, and return whether it is done with, ie. acknowledged or given up on."""
+        sequence = getattr(msg, 'sequence', None)
+        try:
+            if await asyncio.get_event_loop().run_in_executor(self._executor, self._handler, msg):
+                self._attempts.pop(sequence, None)
+                await self._ack(msg)
+                return True
+        except Exception:  # pylint: disable=broad-except; the message is retried when redelivered
+            logger.error('Lane Error: failed to process message seq:%s', sequence, exc_info=True)
+
+        attempts = self._attempts[sequence] = self._attempts.get(sequence, 0) + 1
+        if attempts < self.max_attempts:
+            logger.warning('Lane Error: message seq:%s failed attempt %s, holding its lane until it is redelivered',
+                           sequence, attempts)
+            return False
+        del self._attempts[sequence]
+        logger.error('Lane Error: gave up on message seq:%s after %s attempts', sequence, attempts)
+        try:
+            await self._give_up(msg)
+        except Exception:  # pylint: disable=broad-except; the message is given up on again when redelivered
+            logger.error('Lane Error: failed to give up on message seq:%s', sequence, exc_info=True)
+        return True
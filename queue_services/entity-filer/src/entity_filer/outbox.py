@@ -0,0 +1,201 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Carries out the side effects of the filings, recorded in the outbox.
+
+The calls to other services that a filing needs (name requests, auth, emails and events) are
+added to the outbox in the same transaction as the filing, so they are recorded if and only if
+the filing is committed. The dispatcher then carries them out after the commit, a few at a time,
+and retries the failed ones with an exponential backoff, until they succeed or run out of attempts
+and are reported for human review.
+"""
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+from entity_queue_common.service_utils import logger
+from flask import Flask
+from legal_api.models import Business, Filing, OutboxMessage, db
+from sentry_sdk import capture_message
+
+
+class Action(Enum):
+    """Render an Enum of the side effects of a filing."""
+
+    CONSUME_NR = 'consumeNr'
+    PUBLISH_EMAIL = 'publishEmail'
+    PUBLISH_EVENT = 'publishEvent'
+    UPDATE_AFFILIATION = 'updateAffiliation'
+    UPDATE_BUSINESS_PROFILE = 'updateBusinessProfile'
+    UPDATE_ENTITY = 'updateEntity'
+
+
+Handler = Callable[[Business, Filing, OutboxMessage], None]
+
+
+def add_message(action: Action, filing: Filing, business: Business = None, payload: dict = None, key: str = None):
+    """Add the side effect of the filing to the session, so it is committed with the filing.
+
+    The idempotency key is made of the filing, the action and the key, which tells apart
+    several side effects of the same action for a filing.
+    """
+    OutboxMessage(idempotency_key=':'.join(filter(None, [str(filing.id), action.value, key])),
+                  action=action.value,
+                  filing_id=filing.id,
+                  business_id=business.id if business else None,
+                  payload=payload).save_to_session()
+
+
+class OutboxDispatcher:  # pylint: disable=too-many-instance-attributes
+    """Carries out the pending outbox messages, retrying the failed ones."""
+
+    def __init__(self, *,
+                 app: Flask,
+                 handlers: Dict[Action, Handler],
+                 concurrency: int = 4,
+                 batch_size: int = 20,
+                 poll_interval: float = 10,
+                 max_attempts: int = 8,
+                 retry_delay: float = 5,
+                 max_retry_delay: float = 3600,
+                 lease: int = 300):
+        """Initialize the dispatcher.
+
+        :param app: the app the messages are carried out in the context of
+        :param handlers: carries out the messages of each action, raising an exception if it failed
+        :param concurrency: the number of filings whose messages are carried out at a time
+        :param batch_size: the number of messages claimed at a time
+        :param poll_interval: the seconds between checks for due messages, when not notified of new ones
+        :param max_attempts: the number of attempts after which a message is given up on
+        :param retry_delay: the seconds before the first retry, doubled for each retry after it
+        :param max_retry_delay: the most seconds between retries
+        :param lease: the seconds a claimed message is not claimed again, in case this process stops
+        """
+        self._app = app
+        self._handlers = {action.value: handler for action, handler in handlers.items()}
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease = lease
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        """Start carrying out the messages, on the current loop."""
+        self._loop = asyncio.get_event_loop()
+        self._wakeup = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='outbox')
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        """Stop carrying out the messages, the claimed ones are retried once their lease runs out."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def notify(self):
+        """Wake the dispatcher up to carry out newly committed messages, this can be called from any thread."""
+        if self._task and self._loop:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def retry_in(self, attempts: int) -> Optional[float]:
+        """Return the seconds until the next attempt of a message after the given failed attempts, or None if done."""
+        if attempts >= self.max_attempts:
+            return None
+        return min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+
+    async def _run(self):
+        """Drain the outbox whenever notified, or every poll_interval."""
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:  # pylint: disable=broad-except; the dispatcher must keep on running
+                logger.error('Outbox Error: failed to drain the outbox', exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> int:
+        """Carry out the due messages until there are none left, and return the number carried out.
+
+        The messages of a filing are carried out one at a time, in the order they were added,
+        and up to concurrency filings at a time.
+        """
+        loop = asyncio.get_event_loop()
+        executor = self._executor or ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='outbox')
+        completed = 0
+        try:
+            while claimed := await loop.run_in_executor(executor, self._claim):
+                by_filing = itertools.groupby(sorted(claimed), key=lambda message: message[0])
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(executor, self._process, [message_id for _, message_id in messages])
+                    for _, messages in by_filing
+                ])
+                completed += sum(results)
+        finally:
+            if executor is not self._executor:
+                executor.shutdown(wait=False)
+        return completed
+
+    def _claim(self) -> List[tuple]:
+        """Claim the due messages."""
+        with self._app.app_context():
+            return OutboxMessage.claim_due(self.batch_size, self.lease)
+
+    def _process(self, message_ids: List[int]) -> int:
+        """Carry out the messages of a filing in turn, and return the number carried out.
+
+        Once a message fails, the filing's later messages are released rather than carried out,
+        so they wait for the failed message to be retried.
+        """
+        completed = 0
+        with self._app.app_context():
+            for index, message_id in enumerate(message_ids):
+                message = OutboxMessage.find_by_id(message_id)
+                try:
+                    self._handlers[message.action](Business.find_by_internal_id(message.business_id),
+                                                   Filing.find_by_id(message.filing_id),
+                                                   message)
+                except Exception as err:  # pylint: disable=broad-except; any failure is retried
+                    db.session.rollback()
+                    self._record_failure(message, err)
+                    OutboxMessage.release(message_ids[index + 1:])
+                    break
+                message.record_success()
+                completed += 1
+        return completed
+
+    def _record_failure(self, message: OutboxMessage, err: Exception):
+        """Schedule the retry of the failed message, or give up on it once it is out of attempts."""
+        retry_in = self.retry_in(message.attempts + 1)
+        message.record_failure(repr(err), retry_in)
+        if retry_in is None:
+            capture_message(f'Queue Error: Outbox {message.action} for filing:{message.filing_id} failed '
+                            f'after {message.attempts} attempts, with error:{err}', level='error')
+            logger.error('Outbox Error: gave up on message:%s', message.idempotency_key, exc_info=err)
+        else:
+            logger.warning('Outbox Error: message:%s failed attempt %s, retrying in %ss, error:%s',
+                           message.idempotency_key, message.attempts, retry_in, err)
@@ -24,11 +24,27 @@ If these constraints change, the use of Flask-SQLAlchemy would need to change.
 Flask-SQLAlchemy currently allows the base model to be changed, or reworking
 the model to a standalone SQLAlchemy usage with an async engine would need
 to be pursued.
+
+When FILER_LANES is more than 1, the entry-point is **cb_lane_handler** instead.
+The messages are acknowledged manually, up to SUBSCRIPTION_OPTIONS['max_inflight'] are
+received at a time, and each is handed over to a lane by its business, or temp reg.
+Each lane runs on its own thread, with its own event loop, app context and DB session,
+so filings of the same business are processed in order, and the other filings in parallel.
+A message is only acknowledged once its filing is processed, ie. committed. A message left
+unacknowledged blocks its lane until it is redelivered and processed, so the later filings
+of its business are not processed before it, and is reported and acknowledged once it has
+failed FILER_MAX_ATTEMPTS times. Messages without a filing are processed outside of the lanes.
+
+The calls to other services that a filing needs are not made while processing it, but are added
+to the outbox with the filing, and carried out by the **outbox** dispatcher once it is committed.
 """
+import asyncio
 import json
 import os
 import uuid
-from typing import Dict
+from contextlib import suppress
+from http import HTTPStatus
+from typing import Dict, Optional
 
 import nats
 from entity_queue_common.messages import publish_email_message
@@ -36,7 +52,8 @@ from entity_queue_common.service import QueueServiceManager
 from entity_queue_common.service_utils import FilingException, QueueException, logger
 from flask import Flask
 from legal_api import db
-from legal_api.models import Business, Filing
+from legal_api.models import Business, Filing, OutboxMessage
+from legal_api.services import VersionedBusinessDetailsService
 from legal_api.services.bootstrap import AccountService
 from legal_api.utils.datetime import datetime
 from sentry_sdk import capture_message
@@ -44,6 +61,8 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy_continuum import versioning_manager
 
 from entity_filer import config
+from entity_filer.lanes import LaneDispatcher
+from entity_filer.outbox import Action, OutboxDispatcher, add_message
 from entity_filer.filing_processors import (
     alteration,
     annual_report,
@@ -55,7 +74,7 @@ from entity_filer.filing_processors import (
     transition,
     voluntary_dissolution,
 )
-from entity_filer.filing_processors.filing_components import name_request
+from entity_filer.filing_processors.filing_components import business_profile, name_request
 
 
 qsm = QueueServiceManager()  # pylint: disable=invalid-name
@@ -79,39 +98,52 @@ def get_filing_types(legal_filings: dict):
     return filing_types
 
 
-async def publish_event(business: Business, filing: Filing):
-    """Publish the filing message onto the NATS filing subject."""
-    try:
-        payload = {
-            'specversion': '1.x-wip',
-            'type': 'bc.registry.business.' + filing.filing_type,
-            'source': ''.join([
-                APP_CONFIG.LEGAL_API_URL,
-                '/business/',
-                business.identifier,
-                '/filing/',
-                str(filing.id)]),
-            'id': str(uuid.uuid4()),
-            'time': datetime.utcnow().isoformat(),
-            'datacontenttype': 'application/json',
-            'identifier': business.identifier,
-            'data': {
-                'filing': {
-                    'header': {'filingId': filing.id,
-                               'effectiveDate': filing.effective_date.isoformat()
-                               },
-                    'business': {'identifier': business.identifier},
-                    'legalFilings': get_filing_types(filing.filing_json)
-                }
+async def publish_event(business: Business, filing: Filing, event_id: str = None):
+    """Publish the filing message onto the NATS filing subject.
+
+    The event_id lets the subscribers tell a retried event apart from a new one.
+    """
+    payload = {
+        'specversion': '1.x-wip',
+        'type': 'bc.registry.business.' + filing.filing_type,
+        'source': ''.join([
+            APP_CONFIG.LEGAL_API_URL,
+            '/business/',
+            business.identifier,
+            '/filing/',
+            str(filing.id)]),
+        'id': event_id or str(uuid.uuid4()),
+        'time': datetime.utcnow().isoformat(),
+        'datacontenttype': 'application/json',
+        'identifier': business.identifier,
+        'data': {
+            'filing': {
+                'header': {'filingId': filing.id,
+                           'effectiveDate': filing.effective_date.isoformat()
+                           },
+                'business': {'identifier': business.identifier},
+                'legalFilings': get_filing_types(filing.filing_json)
             }
         }
-        if filing.temp_reg:
-            payload['tempidentifier'] = filing.temp_reg
-        subject = APP_CONFIG.ENTITY_EVENT_PUBLISH_OPTIONS['subject']
-        await qsm.service.publish(subject, payload)
-    except Exception as err:  # pylint: disable=broad-except; we don't want to fail out the filing, so ignore all.
-        capture_message('Queue Publish Event Error: filing.id=' + str(filing.id) + str(err), level='error')
-        logger.error('Queue Publish Event Error: filing.id=%s', filing.id, exc_info=True)
+    }
+    if filing.temp_reg:
+        payload['tempidentifier'] = filing.temp_reg
+    subject = APP_CONFIG.ENTITY_EVENT_PUBLISH_OPTIONS['subject']
+    await qsm.service.publish(subject, payload)
+
+
+def save_revision_snapshot(business: Business, filing: Filing):
+    """Add the point-in-time revision of the filing to the session, so it is committed with the filing.
+
+    It is written in a savepoint, so a database error here is rolled back without aborting the filing's transaction.
+    """
+    try:
+        with db.session.begin_nested():
+            VersionedBusinessDetailsService.save_revision_snapshot(filing, business)
+    except Exception as err:  # pylint: disable=broad-except; rebuilt on read, so don't fail the filing
+        capture_message(f'Queue Error: Failed to save revision snapshot for filing:{filing.id}, error:{err}',
+                        level='error')
+        logger.error('Queue Error: Failed to save revision snapshot for filing.id=%s', filing.id, exc_info=True)
 
 
 async def process_filing(filing_msg: Dict, flask_app: Flask):  # pylint: disable=too-many-branches,too-many-statements
@@ -168,65 +200,106 @@ async def process_filing(filing_msg: Dict, flask_app: Flask):  # pylint: disable
             filing_submission.transaction_id = transaction.id
             filing_submission.set_processed()
 
+            is_alteration = any('alteration' in x for x in legal_filings)
+            is_incorporation = any('incorporationApplication' in x for x in legal_filings)
+            is_correction = any('correction' in x for x in legal_filings)
+            if is_alteration:
+                has_new_nr = name_request.has_new_nr_for_alteration(business, filing_submission.filing_json)
+                alteration.post_process(business, filing_submission)
+
             db.session.add(business)
             db.session.add(filing_submission)
-            db.session.commit()
-
-            # post filing changes to other services
-            if any('alteration' in x for x in legal_filings):
-                if name_request.has_new_nr_for_alteration(business, filing_submission.filing_json):
-                    name_request.consume_nr(business, filing_submission, '/filing/alteration/nameRequest/nrNumber')
-                alteration.post_process(business, filing_submission)
-                db.session.add(business)
-                db.session.commit()
-                AccountService.update_entity(
-                    business_registration=business.identifier,
-                    business_name=business.legal_name,
-                    corp_type_code=business.legal_type
-                )
-
-            if any('incorporationApplication' in x for x in legal_filings):
-                if any('correction' in x for x in legal_filings):
+            db.session.flush()
+            if is_incorporation and not is_correction:
+                filing_submission.business_id = business.id
+
+            # post filing changes to other services, once committed
+            if is_alteration:
+                if has_new_nr:
+                    add_message(Action.CONSUME_NR, filing_submission, business,
+                                {'nrPath': '/filing/alteration/nameRequest/nrNumber'})
+                add_business_profile_message(business, filing_submission, 'alteration')
+                add_message(Action.UPDATE_ENTITY, filing_submission, business)
+
+            if is_incorporation:
+                if is_correction:
                     if name_request.has_new_nr_for_correction(filing_submission.filing_json):
-                        name_request.consume_nr(business, filing_submission)
+                        add_message(Action.CONSUME_NR, filing_submission, business)
                 else:
-                    filing_submission.business_id = business.id
-                    db.session.add(filing_submission)
-                    db.session.commit()
-                    incorporation_filing.update_affiliation(business, filing_submission)
-                    name_request.consume_nr(business, filing_submission)
-                    incorporation_filing.post_process(business, filing_submission)
-                    try:
-                        await publish_email_message(
-                            qsm, APP_CONFIG.EMAIL_PUBLISH_OPTIONS['subject'], filing_submission, 'mras')
-                    except Exception as err:  # pylint: disable=broad-except, unused-variable # noqa F841;
-                        # mark any failure for human review
-                        capture_message(
-                            f'Queue Error: Failed to place email for filing:{filing_submission.id}'
-                            f'on Queue with error:{err}',
-                            level='error'
-                        )
-
-            try:
-                await publish_email_message(
-                    qsm, APP_CONFIG.EMAIL_PUBLISH_OPTIONS['subject'], filing_submission, filing_submission.status)
-            except Exception as err:  # pylint: disable=broad-except, unused-variable # noqa F841;
-                # mark any failure for human review
-                capture_message(
-                    f'Queue Error: Failed to place email for filing:{filing_submission.id}'
-                    f'on Queue with error:{err}',
-                    level='error'
-                )
-
-            try:
-                await publish_event(business, filing_submission)
-            except Exception as err:  # pylint: disable=broad-except, unused-variable # noqa F841;
-                # mark any failure for human review
-                capture_message(
-                    f'Queue Error: Failed to publish event for filing:{filing_submission.id}'
-                    f'on Queue with error:{err}',
-                    level='error'
-                )
+                    add_message(Action.UPDATE_AFFILIATION, filing_submission, business)
+                    add_message(Action.CONSUME_NR, filing_submission, business)
+                    add_business_profile_message(business, filing_submission, 'incorporationApplication')
+                    add_message(Action.PUBLISH_EMAIL, filing_submission, business, {'option': 'mras'}, 'mras')
+
+            add_message(Action.PUBLISH_EMAIL, filing_submission, business,
+                        {'option': filing_submission.status}, filing_submission.status)
+            add_message(Action.PUBLISH_EVENT, filing_submission, business)
+
+            save_revision_snapshot(business, filing_submission)
+            db.session.commit()
+            outbox.notify()
+
+
+def add_business_profile_message(business: Business, filing: Filing, filing_type: str):
+    """Add the update of the business profile to the outbox, if the filing has a contact point."""
+    with suppress(KeyError, TypeError):
+        add_message(Action.UPDATE_BUSINESS_PROFILE, filing, business,
+                    {'contactPoint': filing.filing_json['filing'][filing_type]['contactPoint']})
+
+
+def consume_nr(business: Business, filing: Filing, message: OutboxMessage):
+    """Consume the name request of the filing."""
+    if message.payload and (nr_path := message.payload.get('nrPath')):
+        name_request.consume_nr(business, filing, nr_path)
+    else:
+        name_request.consume_nr(business, filing)
+
+
+def update_affiliation(business: Business, filing: Filing, message: OutboxMessage):
+    """Affiliate the incorporated business to the account of its temp reg."""
+    incorporation_filing.update_affiliation(business, filing, message)
+
+
+def update_entity(business: Business, filing: Filing, message: OutboxMessage):  # pylint: disable=unused-argument
+    """Update the entity of the business in auth."""
+    rv = AccountService.update_entity(business_registration=business.identifier,
+                                      business_name=business.legal_name,
+                                      corp_type_code=business.legal_type)
+    if rv != HTTPStatus.OK:
+        raise QueueException(f'Unable to update entity:{business.identifier} for filing:{filing.id}, status:{rv}')
+
+
+def update_business_profile(business: Business, filing: Filing, message: OutboxMessage):
+    """Update the contact point of the business profile in auth."""
+    if err := business_profile.update_business_profile(business, message.payload['contactPoint']):
+        raise QueueException(f'Unable to update business profile for filing:{filing.id}, error:{err}')
+
+
+def publish_email(business: Business, filing: Filing, message: OutboxMessage):  # pylint: disable=unused-argument
+    """Publish the email message of the filing."""
+    asyncio.run(publish_email_message(qsm, APP_CONFIG.EMAIL_PUBLISH_OPTIONS['subject'], filing,
+                                      message.payload['option']))
+
+
+def publish_filing_event(business: Business, filing: Filing, message: OutboxMessage):
+    """Publish the event of the filing, with an id that stays the same across retries."""
+    asyncio.run(publish_event(business, filing, str(uuid.uuid5(uuid.NAMESPACE_URL, message.idempotency_key))))
+
+
+outbox = OutboxDispatcher(app=FLASK_APP,  # pylint: disable=invalid-name
+                          handlers={
+                              Action.CONSUME_NR: consume_nr,
+                              Action.PUBLISH_EMAIL: publish_email,
+                              Action.PUBLISH_EVENT: publish_filing_event,
+                              Action.UPDATE_AFFILIATION: update_affiliation,
+                              Action.UPDATE_BUSINESS_PROFILE: update_business_profile,
+                              Action.UPDATE_ENTITY: update_entity,
+                          },
+                          concurrency=APP_CONFIG.OUTBOX_CONCURRENCY,
+                          poll_interval=APP_CONFIG.OUTBOX_POLL_INTERVAL,
+                          max_attempts=APP_CONFIG.OUTBOX_MAX_ATTEMPTS,
+                          retry_delay=APP_CONFIG.OUTBOX_RETRY_DELAY,
+                          max_retry_delay=APP_CONFIG.OUTBOX_MAX_RETRY_DELAY)
 
 
 async def cb_subscription_handler(msg: nats.aio.client.Msg):
@@ -248,3 +321,53 @@ async def cb_subscription_handler(msg: nats.aio.client.Msg):
         # Catch Exception so that any error is still caught and the message is removed from the queue
         capture_message('Queue Error:' + json.dumps(filing_msg), level='error')
         logger.error('Queue Error: %s', json.dumps(filing_msg), exc_info=True)
+
+
+def get_lane_key(msg: nats.aio.client.Msg) -> Optional[str]:
+    """Return the business, or the temp reg, of the filing in the msg."""
+    try:
+        filing_msg = json.loads(msg.data.decode('utf-8'))
+        with FLASK_APP.app_context():
+            if filing := Filing.find_by_id(filing_msg['filing']['id']):
+                return str(filing.business_id) if filing.business_id else filing.temp_reg
+    except Exception:  # pylint: disable=broad-except; the msg is reported when it is processed
+        logger.debug('Unable to get the lane of msg seq:%s', msg.sequence, exc_info=True)
+    return None
+
+
+def process_lane_msg(msg: nats.aio.client.Msg) -> bool:
+    """Process the msg on a lane thread, returning True if it can be acknowledged.
+
+    Messages that cb_subscription_handler raises on are not acknowledged, so they get redelivered,
+    and the lane is held until then, up to FILER_MAX_ATTEMPTS times.
+    """
+    try:
+        asyncio.run(cb_subscription_handler(msg))
+    except (OperationalError, FilingException):
+        return False
+    return True
+
+
+async def ack_msg(msg: nats.aio.client.Msg):
+    """Acknowledge the msg."""
+    await qsm.service.sc.ack(msg)
+
+
+async def give_up_msg(msg: nats.aio.client.Msg):
+    """Report the msg that kept on failing, and acknowledge it so it no longer holds its lane."""
+    capture_message(f'Queue Error: gave up on msg seq:{msg.sequence} after {APP_CONFIG.FILER_MAX_ATTEMPTS} '
+                    f'attempts:{msg.data.decode("utf-8", errors="replace")}', level='error')
+    await ack_msg(msg)
+
+
+dispatcher = LaneDispatcher(lanes=APP_CONFIG.FILER_LANES,  # pylint: disable=invalid-name
+                            handler=process_lane_msg,
+                            lane_key=get_lane_key,
+                            ack=ack_msg,
+                            give_up=give_up_msg,
+                            max_attempts=APP_CONFIG.FILER_MAX_ATTEMPTS)
+
+
+async def cb_lane_handler(msg: nats.aio.client.Msg):
+    """Use Callback to hand the Queue Msg over to its lane, it is acknowledged once processed."""
+    await dispatcher.dispatch(msg)
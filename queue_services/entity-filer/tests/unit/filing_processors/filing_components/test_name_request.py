@@ -18,12 +18,13 @@ from datetime import datetime
 from unittest.mock import patch
 
 import pytest
+from entity_queue_common.service_utils import QueueException
 from legal_api.models import Filing
 from registry_schemas.example_data import INCORPORATION_FILING_TEMPLATE
 
 from entity_filer.filing_processors import incorporation_filing
 from entity_filer.filing_processors.filing_components import name_request
-from tests.unit import create_filing
+from tests.unit import create_business, create_filing
 
 
 @pytest.mark.parametrize('test_name,nr_number,expected_result', [
@@ -58,3 +59,26 @@ def test_has_new_nr_for_correction(app, session, test_name, nr_number, expected_
         correction_filing['filing']['correction'] = {}
         correction_filing['filing']['correction']['correctedFilingId'] = original_filing.id
         assert name_request.has_new_nr_for_correction(correction_filing) is expected_result
+
+
+@pytest.mark.parametrize('test_name,corp_num,consumed', [
+    ('Consumed by the business on an earlier attempt', 'BC1234567', True),
+    ('Consumed by another business', 'BC7654321', False),
+])
+def test_consume_nr_retried(app, session, requests_mock, test_name, corp_num, consumed):
+    """Assert that an nr already consumed by the business is not failed again when the consume is retried."""
+    filing = copy.deepcopy(INCORPORATION_FILING_TEMPLATE)
+    filing['filing']['incorporationApplication']['nameRequest']['nrNumber'] = 'NR 1234567'
+    business = create_business('BC1234567')
+    filing_rec = create_filing('123', filing, business.id)
+    nr_url = 'http://namex.test/requests/NR 1234567'
+    requests_mock.patch(nr_url, status_code=400)
+    requests_mock.get(nr_url, json={'nrNum': 'NR 1234567', 'state': 'CONSUMED', 'corpNum': corp_num})
+
+    with patch.dict(app.config, {'NAMEX_API': 'http://namex.test/requests/'}), \
+            patch.object(name_request.AccountService, 'get_bearer_token', return_value='token'):
+        if consumed:
+            name_request.consume_nr(business, filing_rec)
+        else:
+            with pytest.raises(QueueException):
+                name_request.consume_nr(business, filing_rec)
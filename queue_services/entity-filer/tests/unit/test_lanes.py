@@ -0,0 +1,182 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The Unit Tests for the lanes that process the filings concurrently."""
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+from entity_filer.lanes import LaneDispatcher
+
+
+Msg = namedtuple('Msg', ['sequence', 'key'])
+
+
+@pytest.mark.asyncio
+async def test_lanes_keep_order_by_key():
+    """Assert that messages with the same key are processed in order, and the others in parallel."""
+    processed = []
+    acked = []
+    threads = set()
+    lock = threading.Lock()
+
+    def handler(msg):
+        time.sleep(0.05)
+        with lock:
+            processed.append(msg)
+            threads.add(threading.get_ident())
+        return msg.key != 'fail'
+
+    async def ack(msg):
+        acked.append(msg)
+
+    dispatcher = LaneDispatcher(lanes=4, handler=handler, lane_key=lambda msg: msg.key, ack=ack)
+    keys = ['a', 'b', 'c', 'd'] * 5 + ['fail']
+    msgs = [Msg(sequence, key) for sequence, key in enumerate(keys)]
+
+    start = time.time()
+    for msg in msgs:
+        await dispatcher.dispatch(msg)
+    while len(processed) < len(msgs):
+        await asyncio.sleep(0.01)
+    elapsed = time.time() - start
+    await dispatcher.close()
+
+    for key in set(keys):
+        assert [msg.sequence for msg in processed if msg.key == key] == \
+            [msg.sequence for msg in msgs if msg.key == key]
+    # only the processed messages are acknowledged
+    assert sorted(acked) == sorted(msg for msg in msgs if msg.key != 'fail')
+    # the keys are spread over the lanes, so not processed one at a time
+    assert len({dispatcher.lane(key) for key in keys}) > 1
+    assert len(threads) > 1
+    assert elapsed < 0.05 * len(msgs)
+
+
+@pytest.mark.asyncio
+async def test_failed_message_blocks_its_lane():
+    """Assert that a failed message is not acked, and its lane waits for it to be redelivered and processed."""
+    processed = []
+    acked = []
+    failures = {0: 1, 2: 1}  # the number of times each message fails, by sequence
+
+    def handler(msg):
+        processed.append(msg.sequence)
+        if failures.get(msg.sequence):
+            failures[msg.sequence] -= 1
+            if msg.sequence == 0:
+                raise Exception('failed')
+            return False
+        return True
+
+    async def ack(msg):
+        acked.append(msg.sequence)
+
+    async def wait_for(condition):
+        for _ in range(500):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        assert condition()
+
+    dispatcher = LaneDispatcher(lanes=2, handler=handler, lane_key=lambda msg: msg.key, ack=ack)
+    other = next(key for key in 'bcdefgh' if dispatcher.lane(key) != dispatcher.lane('a'))
+    msgs = [Msg(0, 'a'), Msg(1, 'a'), Msg(2, 'a'), Msg(3, other)]
+    for msg in msgs:
+        await dispatcher.dispatch(msg)
+    await wait_for(lambda: acked == [3])
+    # the later message of the failed one's lane is held, while the other lane keeps on processing
+    assert processed == [0, 3] or processed == [3, 0]
+
+    # a redelivered copy of a held message does not get it processed out of order
+    await dispatcher.dispatch(msgs[1])
+    await dispatcher.dispatch(msgs[0])
+    await wait_for(lambda: len(acked) == 3)
+    # the held message after the redelivered one fails in turn, blocking the lane again
+    await asyncio.sleep(0.05)
+    assert acked == [3, 0, 1]
+
+    await dispatcher.dispatch(msgs[2])
+    await wait_for(lambda: len(acked) == 4)
+    await dispatcher.close()
+
+    assert acked == [3, 0, 1, 2]
+    assert [sequence for sequence in processed if sequence != 3] == [0, 0, 1, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_failing_message_is_given_up_on():
+    """Assert that a message failing max_attempts times is given up on, releasing its lane."""
+    acked = []
+    given_up = []
+
+    def handler(msg):
+        return msg.sequence != 0
+
+    async def ack(msg):
+        acked.append(msg.sequence)
+
+    async def give_up(msg):
+        given_up.append(msg.sequence)
+
+    dispatcher = LaneDispatcher(lanes=2, handler=handler, lane_key=lambda msg: msg.key, ack=ack,
+                                give_up=give_up, max_attempts=2)
+    msgs = [Msg(0, 'a'), Msg(1, 'a')]
+    for msg in msgs:
+        await dispatcher.dispatch(msg)
+    await asyncio.sleep(0.05)
+    assert acked == []
+
+    # redelivered, and failed again
+    await dispatcher.dispatch(msgs[0])
+    for _ in range(100):
+        if acked:
+            break
+        await asyncio.sleep(0.01)
+    await dispatcher.close()
+
+    assert given_up == [0]
+    assert acked == [1]
+
+
+@pytest.mark.asyncio
+async def test_messages_without_a_key_do_not_block_a_lane():
+    """Assert that messages without a key are processed outside of the lanes, looking the keys up off the loop."""
+    acked = []
+    key_threads = set()
+
+    def handler(msg):
+        return msg.key is not None
+
+    def lane_key(msg):
+        key_threads.add(threading.get_ident())
+        return msg.key
+
+    async def ack(msg):
+        acked.append(msg.sequence)
+
+    dispatcher = LaneDispatcher(lanes=2, handler=handler, lane_key=lane_key, ack=ack)
+    key = next(key for key in 'abcdefgh' if dispatcher.lane(key) == dispatcher.lane(None))
+    for msg in [Msg(0, None), Msg(1, key)]:
+        await dispatcher.dispatch(msg)
+    for _ in range(100):
+        if acked:
+            break
+        await asyncio.sleep(0.01)
+    await dispatcher.close()
+
+    assert acked == [1]
+    assert threading.get_ident() not in key_threads
@@ -0,0 +1,127 @@
+# Copyright © 2021 Province of British Columbia
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The Unit Tests for the outbox of the side effects of the filings."""
+import random
+
+import pytest
+from legal_api.models import OutboxMessage
+
+from entity_filer.outbox import Action, OutboxDispatcher, add_message
+from entity_filer.worker import process_filing
+from tests.unit import AR_FILING, create_business, create_filing
+
+
+def test_retry_in():
+    """Assert that the retries back off exponentially, up to the max delay, until out of attempts."""
+    dispatcher = OutboxDispatcher(app=None, handlers={}, max_attempts=4, retry_delay=5, max_retry_delay=12)
+
+    assert [dispatcher.retry_in(attempts) for attempts in range(1, 5)] == [5, 10, 12, None]
+
+
+@pytest.mark.asyncio
+async def test_process_filing_adds_outbox_messages(app, session, mocker):
+    """Assert that the side effects of a filing are added to the outbox, instead of being carried out."""
+    publish_email = mocker.patch('entity_filer.worker.publish_email_message')
+    publish_event = mocker.patch('entity_filer.worker.publish_event')
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('CP1234567', legal_type='CP')
+    filing_id = (create_filing(payment_id, AR_FILING, business.id)).id
+
+    await process_filing({'filing': {'id': filing_id}}, app)
+
+    messages = OutboxMessage.query.filter_by(filing_id=filing_id).order_by(OutboxMessage.id).all()
+    assert [(message.action, message.status) for message in messages] == [
+        (Action.PUBLISH_EMAIL.value, OutboxMessage.Status.PENDING.value),
+        (Action.PUBLISH_EVENT.value, OutboxMessage.Status.PENDING.value),
+    ]
+    assert messages[0].idempotency_key == f'{filing_id}:publishEmail:COMPLETED'
+    assert messages[0].payload == {'option': 'COMPLETED'}
+    publish_email.assert_not_called()
+    publish_event.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_outbox_dispatcher(app, session, mocker):
+    """Assert that the messages are carried out in order, and the failed ones retried until out of attempts."""
+    capture_message = mocker.patch('entity_filer.outbox.capture_message')
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('CP1234567', legal_type='CP')
+    filing = create_filing(payment_id, AR_FILING, business.id)
+    add_message(Action.PUBLISH_EMAIL, filing, business, {'option': 'COMPLETED'}, 'COMPLETED')
+    add_message(Action.PUBLISH_EVENT, filing, business)
+    session.commit()
+
+    calls = []
+
+    def publish_email(business, filing, message):
+        calls.append(message.action)
+
+    def publish_event(business, filing, message):
+        calls.append(message.action)
+        raise Exception('unavailable')
+
+    dispatcher = OutboxDispatcher(app=app,
+                                  handlers={Action.PUBLISH_EMAIL: publish_email, Action.PUBLISH_EVENT: publish_event},
+                                  concurrency=1,
+                                  max_attempts=3,
+                                  retry_delay=0)
+
+    assert await dispatcher.drain() == 1
+    assert calls == ['publishEmail', 'publishEvent', 'publishEvent', 'publishEvent']
+
+    messages = OutboxMessage.query.filter_by(filing_id=filing.id).order_by(OutboxMessage.id).all()
+    assert [(message.status, message.attempts) for message in messages] == [
+        (OutboxMessage.Status.COMPLETED.value, 1),
+        (OutboxMessage.Status.FAILED.value, 3),
+    ]
+    assert 'unavailable' in messages[1].last_error
+    capture_message.assert_called_once()
+
+    # nothing is left to carry out
+    assert await dispatcher.drain() == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_dispatcher_keeps_order_on_retry(app, session):
+    """Assert that the messages after a failed one wait for it to be retried."""
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('CP1234567', legal_type='CP')
+    filing = create_filing(payment_id, AR_FILING, business.id)
+    add_message(Action.PUBLISH_EMAIL, filing, business, {'option': 'COMPLETED'}, 'COMPLETED')
+    add_message(Action.PUBLISH_EVENT, filing, business)
+    session.commit()
+
+    calls = []
+
+    def publish_email(business, filing, message):
+        calls.append(message.action)
+        if calls.count(message.action) == 1:
+            raise Exception('unavailable')
+
+    def publish_event(business, filing, message):
+        calls.append(message.action)
+
+    dispatcher = OutboxDispatcher(app=app,
+                                  handlers={Action.PUBLISH_EMAIL: publish_email, Action.PUBLISH_EVENT: publish_event},
+                                  concurrency=1,
+                                  retry_delay=0)
+
+    assert await dispatcher.drain() == 2
+    assert calls == ['publishEmail', 'publishEmail', 'publishEvent']
+
+    messages = OutboxMessage.query.filter_by(filing_id=filing.id).order_by(OutboxMessage.id).all()
+    assert [(message.status, message.attempts) for message in messages] == [
+        (OutboxMessage.Status.COMPLETED.value, 2),
+        (OutboxMessage.Status.COMPLETED.value, 1),
+    ]
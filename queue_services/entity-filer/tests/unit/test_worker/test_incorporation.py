@@ -16,17 +16,19 @@ import asyncio
 import copy
 import datetime
 import random
+from http import HTTPStatus
 
 import pytest
 from entity_queue_common.messages import get_data_from_msg
+from entity_queue_common.service_utils import QueueException
 from entity_queue_common.service_utils import subscribe_to_queue
-from legal_api.models import Business, Filing, PartyRole
+from legal_api.models import Business, Filing, OutboxMessage, PartyRole
 from legal_api.services import RegistrationBootstrapService
 from registry_schemas.example_data import INCORPORATION_FILING_TEMPLATE
 
 from entity_filer.worker import process_filing
 from tests.pytest_marks import colin_api_integration, integration_affiliation, integration_namex_api
-from tests.unit import create_filing
+from tests.unit import create_business, create_filing
 
 
 @pytest.fixture(scope='function')
@@ -84,18 +86,108 @@ async def test_incorporation_filing(app, session, bootstrap):
     assert completing_party.appointment_date
 
 
-def test_update_affiliation_error(mocker):
-    """Assert that a message is posted to sentry if an error occurs."""
-    import sentry_sdk
+@pytest.mark.asyncio
+async def test_update_affiliation_error(app, session, mocker):
+    """Assert that a failed affiliation is recorded and retried, and reported once out of attempts."""
+    from entity_filer.filing_processors import incorporation_filing
+    from entity_filer.outbox import Action, OutboxDispatcher, add_message
+    from entity_filer.worker import update_affiliation
+
+    capture_message = mocker.patch('entity_filer.outbox.capture_message')
+    mocker.patch.object(incorporation_filing.RegistrationBootstrap, 'find_by_identifier')
+    mocker.patch.object(incorporation_filing.AccountService, 'create_affiliation',
+                        return_value=HTTPStatus.INTERNAL_SERVER_ERROR)
+    mocker.patch.object(incorporation_filing.AccountService, 'delete_affiliation', return_value=HTTPStatus.OK)
+    mocker.patch.object(incorporation_filing.AccountService, 'get_affiliation', return_value=HTTPStatus.NOT_FOUND)
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('BC1234567')
+    filing = create_filing(payment_id, INCORPORATION_FILING_TEMPLATE, business.id)
+    add_message(Action.UPDATE_AFFILIATION, filing, business)
+    session.commit()
+
+    dispatcher = OutboxDispatcher(app=app,
+                                  handlers={Action.UPDATE_AFFILIATION: update_affiliation},
+                                  concurrency=1,
+                                  max_attempts=2,
+                                  retry_delay=60)
+
+    assert await dispatcher.drain() == 0
+    message = OutboxMessage.query.filter_by(filing_id=filing.id).one()
+    assert message.status == OutboxMessage.Status.PENDING.value
+    assert message.attempts == 1
+    assert f'Unable to affiliate business:{business.identifier}' in message.last_error
+    assert message.next_attempt_at > datetime.datetime.now(datetime.timezone.utc)
+    capture_message.assert_not_called()
+
+    # the retry is not due yet
+    assert await dispatcher.drain() == 0
+    assert OutboxMessage.find_by_id(message.id).attempts == 1
+
+    message.next_attempt_at = datetime.datetime.utcnow()
+    message.save()
+    assert await dispatcher.drain() == 0
+    message = OutboxMessage.find_by_id(message.id)
+    assert message.status == OutboxMessage.Status.FAILED.value
+    assert message.attempts == 2
+    capture_message.assert_called_once()
+
+
+def test_update_affiliation_resumes_after_partial_success(app, session, mocker):
+    """Assert that a retried affiliation skips the steps already carried out, and never deaffiliates the business."""
     from entity_filer.filing_processors import incorporation_filing
-    filing = Filing(id=1)
-    mocker.patch('sentry_sdk.capture_message')
-    incorporation_filing.update_affiliation(None, filing)
-
-    sentry_sdk.capture_message.assert_called_once_with(
-        f"Queue Error: Affiliation error for filing:{filing.id}, with err:'NoneType' object has no attribute 'account'",
-        level='error'
-    )
+    from entity_filer.outbox import Action, add_message
+
+    bootstrap = mocker.patch.object(incorporation_filing.RegistrationBootstrap, 'find_by_identifier').return_value
+    bootstrap.account = 1
+    bootstrap.identifier = 'Tb31yQIuBw'
+    create_affiliation = mocker.patch.object(incorporation_filing.AccountService, 'create_affiliation',
+                                             side_effect=[HTTPStatus.OK, HTTPStatus.BAD_REQUEST, HTTPStatus.OK])
+    delete_affiliation = mocker.patch.object(incorporation_filing.AccountService, 'delete_affiliation',
+                                             return_value=HTTPStatus.OK)
+    mocker.patch.object(incorporation_filing.AccountService, 'get_affiliation', return_value=HTTPStatus.NOT_FOUND)
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('BC1234567')
+    filing = create_filing(payment_id, INCORPORATION_FILING_TEMPLATE, business.id)
+    add_message(Action.UPDATE_AFFILIATION, filing, business)
+    session.commit()
+    message = OutboxMessage.query.filter_by(filing_id=filing.id).one()
+
+    # the business is affiliated, but the bootstrap is not reaffiliated
+    with pytest.raises(QueueException):
+        incorporation_filing.update_affiliation(business, filing, message)
+    assert message.completed_steps == ['affiliate', 'deaffiliateBootstrap']
+
+    incorporation_filing.update_affiliation(business, filing, message)
+
+    assert message.completed_steps == ['affiliate', 'deaffiliateBootstrap', 'reaffiliateBootstrap']
+    assert [call.kwargs['business_registration'] for call in create_affiliation.call_args_list] == \
+        [business.identifier, bootstrap.identifier, bootstrap.identifier]
+    assert all(call.args == (bootstrap.account, bootstrap.identifier) for call in delete_affiliation.call_args_list)
+
+
+def test_update_affiliation_already_affiliated(app, session, mocker):
+    """Assert that a business already affiliated by an earlier attempt is not deaffiliated."""
+    from entity_filer.filing_processors import incorporation_filing
+    from entity_filer.outbox import Action, add_message
+
+    mocker.patch.object(incorporation_filing.RegistrationBootstrap, 'find_by_identifier')
+    mocker.patch.object(incorporation_filing.AccountService, 'create_affiliation',
+                        side_effect=[HTTPStatus.BAD_REQUEST, HTTPStatus.OK])
+    delete_affiliation = mocker.patch.object(incorporation_filing.AccountService, 'delete_affiliation',
+                                             return_value=HTTPStatus.OK)
+    mocker.patch.object(incorporation_filing.AccountService, 'get_affiliation', return_value=HTTPStatus.OK)
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    business = create_business('BC1234567')
+    filing = create_filing(payment_id, INCORPORATION_FILING_TEMPLATE, business.id)
+    add_message(Action.UPDATE_AFFILIATION, filing, business)
+    session.commit()
+    message = OutboxMessage.query.filter_by(filing_id=filing.id).one()
+
+    incorporation_filing.update_affiliation(business, filing, message)
+
+    assert message.completed_steps == ['affiliate', 'deaffiliateBootstrap', 'reaffiliateBootstrap']
+    assert delete_affiliation.call_count == 1  # only the bootstrap's affiliation is replaced
+    assert delete_affiliation.call_args.args[1] != business.identifier
 
 
 @pytest.mark.skip("AttributeError: can't set attribute")
@@ -133,6 +133,61 @@ async def test_process_coa_filing(app, session):
     compare_addresses(mailing_address, new_mailing_address)
 
 
+async def test_process_filing_saves_revision_snapshot(app, session):
+    """Assert that the revision of the filing is saved when it is completed."""
+    from legal_api.models import RevisionSnapshot
+    from legal_api.services import VersionedBusinessDetailsService
+
+    # vars
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    identifier = 'CP1234567'
+
+    # setup
+    business = create_business(identifier)
+    filing_id = (create_filing(payment_id, COA_FILING, business.id)).id
+    filing_msg = {'filing': {'id': filing_id}}
+
+    # TEST
+    await process_filing(filing_msg, app)
+
+    # check it out
+    filing = Filing.find_by_id(filing_id)
+    business = Business.find_by_internal_id(business.id)
+    snapshot = RevisionSnapshot.find(filing.id, filing.transaction_id)
+    assert snapshot
+    assert snapshot.filing_json['filing']['changeOfAddress'] == \
+        VersionedBusinessDetailsService.build_revision(filing, business)['filing']['changeOfAddress']
+    assert snapshot.company_details_json['offices'] == \
+        VersionedBusinessDetailsService.build_company_details_revision(filing, business)['offices']
+
+
+async def test_process_filing_survives_revision_snapshot_db_error(app, session):
+    """Assert that a database error while saving the revision snapshot doesn't lose the filing."""
+    from legal_api.models import db
+    from legal_api.services import VersionedBusinessDetailsService
+
+    # vars
+    payment_id = str(random.SystemRandom().getrandbits(0x58))
+    identifier = 'CP1234567'
+
+    # setup
+    business = create_business(identifier)
+    filing_id = (create_filing(payment_id, COA_FILING, business.id)).id
+    filing_msg = {'filing': {'id': filing_id}}
+
+    def failing_snapshot(filing, business):
+        db.session.execute('select * from no_such_table')
+
+    # TEST
+    with patch.object(VersionedBusinessDetailsService, 'save_revision_snapshot', side_effect=failing_snapshot):
+        await process_filing(filing_msg, app)
+
+    # check it out
+    filing = Filing.find_by_id(filing_id)
+    assert filing.status == Filing.Status.COMPLETED.value
+    assert filing.transaction_id
+
+
 async def test_process_cod_filing(app, session):
     """Assert that an AR filling can be applied to the model correctly."""
     # vars